@@ -0,0 +1,114 @@
+import asyncio
+import contextlib
+import math
+import os
+import time
+
+import metrics
+
+# Chat turns running at once, and turns allowed to wait for a slot beyond that
+MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "8"))
+MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+
+# Smoothing of the average turn time used for Retry-After
+SERVICE_TIME_ALPHA = 0.2
+
+
+class QueueFull(Exception):
+    """Raised when a turn is refused; retry_after is a suggested wait in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+# {session_id: [lock, holders]}; entries are dropped when nobody holds or waits
+session_locks = {}
+
+# {(session_id, message): future} of turns currently in flight
+inflight = {}
+
+state = {"admitted": 0, "running": 0, "service_time": 5.0}
+stats = {"admitted": 0, "deduplicated": 0, "rejected": 0}
+
+# (event loop, semaphore); rebuilt if a new loop is started (tests, benchmarks)
+_slots = (None, None)
+
+
+def slots() -> asyncio.Semaphore:
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(MAX_CONCURRENT))
+    return _slots[1]
+
+
+@contextlib.asynccontextmanager
+async def session_lock(session_id: str):
+    """Hold a session's turn lock, e.g. for a direct edit that must not land mid-turn"""
+    entry = session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            session_locks.pop(session_id, None)
+
+
+def retry_after() -> int:
+    """Seconds until a slot is likely free, from queue length and average turn time"""
+    waiting = max(0, state["admitted"] - MAX_CONCURRENT)
+    return max(1, math.ceil(state["service_time"] * (waiting + 1) / MAX_CONCURRENT))
+
+
+async def run(session_id: str, message: str, turn):
+    """Run `turn()` (a coroutine function) for a session, one turn at a time.
+
+    An identical message already in flight for the same session is not run
+    again; the caller gets that turn's result. Turns of one session run in
+    arrival order. Beyond MAX_CONCURRENT running plus MAX_QUEUE waiting turns,
+    QueueFull is raised instead of queueing.
+    """
+    key = (session_id, message.strip())
+    existing = inflight.get(key)
+    if existing is not None:
+        stats["deduplicated"] += 1
+        metrics.inc("schemaforge_chat_deduplicated_total")
+        return await asyncio.shield(existing)
+
+    if state["admitted"] >= MAX_CONCURRENT + MAX_QUEUE:
+        stats["rejected"] += 1
+        metrics.inc("schemaforge_chat_rejected_total")
+        raise QueueFull(retry_after())
+
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    state["admitted"] += 1
+    stats["admitted"] += 1
+    try:
+        # Session lock first, so a session's queued turns do not hold global slots
+        async with session_lock(session_id):
+            async with slots():
+                state["running"] += 1
+                start = time.perf_counter()
+                try:
+                    result = await turn()
+                finally:
+                    state["running"] -= 1
+                    elapsed = time.perf_counter() - start
+                    state["service_time"] += SERVICE_TIME_ALPHA * (elapsed - state["service_time"])
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark it retrieved, or asyncio warns when no duplicate was waiting
+        future.exception()
+        raise
+    finally:
+        inflight.pop(key, None)
+        state["admitted"] -= 1
@@ -9,14 +9,18 @@ from handlers import (
     handle_ask_clarification,
     handle_modify_schema,
     handle_finalize_schema,
-    get_current_schema,
     reset_schema
 )
 from diagram import schema_to_mermaid, print_diagram
+import token_budget
+import schema_check
+import llm_replay
+from llm_chat import with_schema_state_messages, schema_note_message
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# LLM_REPLAY_MODE=record|replay captures or serves a JSONL corpus
+client = llm_replay.groq_client(lambda: Groq(api_key=os.getenv("GROQ_API_KEY")))
 
 SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant. Your job is to help users design database schemas through conversation.
 
@@ -40,11 +44,24 @@ SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant.
 - Do NOT write function calls as text
 - Simply call the tools directly through the function calling mechanism
 - Never output raw JSON or function syntax in your text responses
+
+## Current schema:
+- Once a schema exists, the latest user message starts with "Current schema:" in a compact form
+- One table per line: Table(column TYPE PK NN UQ, ...) where PK = primary key, NN = not null, UQ = unique
+- Relationships: name: FromTable 1:N ToTable (1:1, 1:N, N:1, N:N)
+- Treat it as the source of truth over earlier messages
 """
 
+# Groq has no explicit context-cache API; it reuses cached prompt prefixes
+# automatically, so keep the system message + tools byte-identical per call
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
 # Conversation history
 messages = []
 
+# Key for token accounting of the CLI conversation
+SESSION_ID = "cli"
+
 
 def process_tool_call(tool_name: str, tool_args: dict) -> str:
     """Execute a tool and return the result"""
@@ -63,21 +80,36 @@ def process_tool_call(tool_name: str, tool_args: dict) -> str:
     return json.dumps(result)
 
 
+def complete():
+    """Next model reply for the conversation, with its tokens recorded"""
+    response = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=[SYSTEM_MESSAGE] + with_schema_state_messages(messages),
+        tools=TOOLS,
+        tool_choice="auto"
+    )
+    token_budget.record_groq(SESSION_ID, response)
+    return response
+
+
 def chat(user_input: str) -> str:
     """Process user input and return agent response"""
     global messages
     
+    # Refuse once the conversation used up its token budget
+    if token_budget.over_hard_budget(SESSION_ID):
+        return "⛔ This conversation has used up its token budget. Type 'reset' to start over."
+    
+    # Over the soft budget: keep the first message, the current schema and the recent turns
+    if token_budget.over_soft_budget(SESSION_ID):
+        token_budget.compact_history(SESSION_ID, messages, schema_note_message(), lambda m: m["role"] == "user")
+    
     # Add user message to history
     messages.append({"role": "user", "content": user_input})
     
     try:
         # Call the LLM
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "system", "content": SYSTEM_PROMPT}] + messages,
-            tools=TOOLS,
-            tool_choice="auto"
-        )
+        response = complete()
     except Exception as e:
         error_str = str(e)
         
@@ -96,8 +128,9 @@ def chat(user_input: str) -> str:
     
     assistant_message = response.choices[0].message
     
-    # Check if LLM wants to use a tool
-    if assistant_message.tool_calls:
+    # Check if LLM wants to use a tool; a rejected schema change goes back to it in this same turn
+    repairs = 0
+    while assistant_message.tool_calls:
         tool_call = assistant_message.tool_calls[0]
         tool_name = tool_call.function.name
         tool_args = json.loads(tool_call.function.arguments)
@@ -106,7 +139,20 @@ def chat(user_input: str) -> str:
         
         result = process_tool_call(tool_name, tool_args)
         result_dict = json.loads(result)
+        if not schema_check.needs_repair(tool_name, result_dict, repairs):
+            break
         
+        repairs += 1
+        print(f"🔁 Rejected, asking for a fix ({repairs}/{schema_check.REPAIR_ATTEMPTS})")
+        messages.append({"role": "assistant", "content": f"Called {tool_name} with {tool_call.function.arguments}"})
+        messages.append({"role": "user", "content": schema_check.repair_note(tool_name, result_dict)})
+        try:
+            assistant_message = complete().choices[0].message
+        except Exception:
+            # Show the rejected call's error instead
+            break
+    
+    if assistant_message.tool_calls:
         # Handle each tool type directly
         if tool_name == "ask_clarification":
             question = result_dict.get("question", "Could you provide more details?")
@@ -172,6 +218,7 @@ def reset_conversation():
     """Start a fresh conversation"""
     global messages
     messages = []
+    token_budget.reset_usage(SESSION_ID)
     reset_schema()
 
 
@@ -3,6 +3,7 @@ import json
 import re
 import os
 import time
+import uuid
 from dotenv import load_dotenv
 from groq import Groq
 from tools import TOOLS
@@ -14,11 +15,18 @@ from handlers import (
     get_current_schema,
     reset_schema
 )
-from diagram import schema_to_mermaid
+from diagram import schema_to_mermaid, schema_to_mermaid_parts, SPLIT_THRESHOLD
+import token_budget
+import llm_replay
+from llm_chat import with_schema_state_messages, schema_note_message
+from ddl_export import schema_to_ddl, DIALECTS
+import fk_inference
+import schema_check
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# LLM_REPLAY_MODE=record|replay captures or serves a JSONL corpus
+client = llm_replay.groq_client(lambda: Groq(api_key=os.getenv("GROQ_API_KEY")))
 
 SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant. Your job is to help users design database schemas through conversation.
 
@@ -42,8 +50,18 @@ SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant.
 - Do NOT write function calls as text
 - Simply call the tools directly through the function calling mechanism
 - Never output raw JSON or function syntax in your text responses
+
+## Current schema:
+- Once a schema exists, the latest user message starts with "Current schema:" in a compact form
+- One table per line: Table(column TYPE PK NN UQ, ...) where PK = primary key, NN = not null, UQ = unique
+- Relationships: name: FromTable 1:N ToTable (1:1, 1:N, N:1, N:N)
+- Treat it as the source of truth over earlier messages
 """
 
+# Groq has no explicit context-cache API; it reuses cached prompt prefixes
+# automatically, so keep the system message + tools byte-identical per call
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
 
 def process_tool_call(tool_name: str, tool_args: dict) -> str:
     """Execute a tool and return the result"""
@@ -62,19 +80,34 @@ def process_tool_call(tool_name: str, tool_args: dict) -> str:
     return json.dumps(result)
 
 
-def chat(user_input: str, messages: list) -> tuple[str, list]:
+def complete(messages: list, session_id: str):
+    """Next model reply for the conversation, with its tokens recorded"""
+    response = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=[SYSTEM_MESSAGE] + with_schema_state_messages(messages),
+        tools=TOOLS,
+        tool_choice="auto"
+    )
+    token_budget.record_groq(session_id, response)
+    return response
+
+
+def chat(user_input: str, messages: list, session_id: str = "streamlit") -> tuple[str, list]:
     """Process user input and return (response, options)"""
     
+    # Refuse once the conversation used up its token budget
+    if token_budget.over_hard_budget(session_id):
+        return "This conversation has used up its token budget. Reset it to start a new one.", []
+    
+    # Over the soft budget: keep the first message, the current schema and the recent turns
+    if token_budget.over_soft_budget(session_id):
+        token_budget.compact_history(session_id, messages, schema_note_message(), lambda m: m["role"] == "user")
+    
     messages.append({"role": "user", "content": user_input})
     options = []
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "system", "content": SYSTEM_PROMPT}] + messages,
-            tools=TOOLS,
-            tool_choice="auto"
-        )
+        response = complete(messages, session_id)
     except Exception as e:
         error_str = str(e)
         
@@ -96,14 +129,28 @@ def chat(user_input: str, messages: list) -> tuple[str, list]:
     
     assistant_message = response.choices[0].message
     
-    if assistant_message.tool_calls:
+    # A rejected schema change goes back to the model in this same turn
+    repairs = 0
+    while assistant_message.tool_calls:
         tool_call = assistant_message.tool_calls[0]
         tool_name = tool_call.function.name
         tool_args = json.loads(tool_call.function.arguments)
         
         result = process_tool_call(tool_name, tool_args)
         result_dict = json.loads(result)
+        if not schema_check.needs_repair(tool_name, result_dict, repairs):
+            break
         
+        repairs += 1
+        messages.append({"role": "assistant", "content": f"Called {tool_name} with {tool_call.function.arguments}"})
+        messages.append({"role": "user", "content": schema_check.repair_note(tool_name, result_dict)})
+        try:
+            assistant_message = complete(messages, session_id).choices[0].message
+        except Exception:
+            # Show the rejected call's error instead
+            break
+    
+    if assistant_message.tool_calls:
         if tool_name == "ask_clarification":
             question = result_dict.get("question", "Could you provide more details?")
             options = result_dict.get("options", [])
@@ -128,8 +175,14 @@ def chat(user_input: str, messages: list) -> tuple[str, list]:
                     for rel in relationships:
                         response_text += f"• {rel['from_entity']} → {rel['to_entity']} ({rel['type']})\n"
                 
+                # Entities left without relationships: link them locally or offer the links
+                linked, suggestions = fk_inference.connect_orphans()
+                if linked:
+                    response_text += "\n**Connected orphan entities:**\n"
+                    response_text += "".join(f"• {m}\n" for m in linked)
+                
                 response_text += "\nWould you like to modify anything?"
-                options = ["Yes, modify", "No, finalize"]
+                options = [fk_inference.option_text(s) for s in suggestions[:fk_inference.MAX_OPTIONS]] + ["Yes, modify", "No, finalize"]
             else:
                 response_text = f"Error: {result_dict.get('error', 'Unknown error')}"
             
@@ -163,7 +216,7 @@ def send_message(message: str):
     """Send a message and update state"""
     st.session_state.chat_history.append({"role": "user", "content": message})
     st.session_state.is_loading = True
-    response, options = chat(message, st.session_state.messages)
+    response, options = chat(message, st.session_state.messages, st.session_state.session_id)
     st.session_state.chat_history.append({"role": "assistant", "content": response})
     st.session_state.current_options = options
     st.session_state.is_loading = False
@@ -374,6 +427,8 @@ if "current_options" not in st.session_state:
     st.session_state.current_options = []
 if "is_loading" not in st.session_state:
     st.session_state.is_loading = False
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
 
 # ============== HEADER ==============
 
@@ -443,6 +498,7 @@ with col1:
         st.session_state.messages = []
         st.session_state.chat_history = []
         st.session_state.current_options = []
+        token_budget.reset_usage(st.session_state.session_id)
         reset_schema()
         st.rerun()
 
@@ -456,6 +512,16 @@ with col2:
     if schema:
         mermaid_code = schema_to_mermaid()
         
+        # Large schemas render as an overview plus one diagram per cluster
+        if len(schema.entities) > SPLIT_THRESHOLD:
+            parts = schema_to_mermaid_parts()
+            diagram_codes = [parts["overview"]] + [c["mermaid"] for c in parts["clusters"]]
+        else:
+            diagram_codes = [mermaid_code]
+        mermaid_blocks = "".join(
+            f'<div class="mermaid fade-in">\n{code}\n</div>' for code in diagram_codes
+        )
+        
         # Zoom slider
         zoom_level = st.slider("Zoom", min_value=50, max_value=200, value=100, step=10, format="%d%%", label_visibility="collapsed")
         
@@ -548,9 +614,7 @@ with col2:
             
             <div class="diagram-wrapper" id="diagram" style="display: none;">
                 <div class="diagram-inner">
-                    <div class="mermaid fade-in">
-                    {mermaid_code}
-                    </div>
+                    {mermaid_blocks}
                 </div>
             </div>
             
@@ -596,6 +660,15 @@ with col2:
             mime="application/json",
             use_container_width=True
         )
+        
+        dialect = st.selectbox("SQL dialect", DIALECTS, key="ddl_dialect")
+        st.download_button(
+            label="Download Schema (SQL)",
+            data=schema_to_ddl(dialect=dialect),
+            file_name=f"{schema.schema_name}_{dialect}.sql",
+            mime="application/sql",
+            use_container_width=True
+        )
     
     else:
         # Empty state with nice styling
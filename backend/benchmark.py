@@ -0,0 +1,400 @@
+"""End-to-end benchmarks with a deterministic stub LLM.
+
+Usage:
+    python benchmark.py                      # all benchmarks, results to bench_results.json
+    python benchmark.py --sizes 10,100 --out results.json
+    python benchmark.py --only handlers,diagrams
+
+The Gemini and Groq clients are replaced by stubs that replay scripted tool
+calls, so runs are network-free and repeatable. Results are written as JSON
+(one record per benchmark and size) so two commits can be compared.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import handlers
+from diagram import schema_to_mermaid
+from diagram_html import schema_to_interactive_html
+
+DEFAULT_SIZES = [10, 100, 500, 1000, 2000]
+CHAT_SIZES = [10, 50, 200]
+
+# Memory benchmark: 2,000 tables x 20 columns = 40,000 columns, several versions kept
+MEMORY_ATTRS_PER_ENTITY = 20
+VERSIONS_KEPT = 5
+
+TYPES = ["INT", "VARCHAR(255)", "TEXT", "DATE", "DATETIME", "BOOLEAN", "DECIMAL(10,2)"]
+REL_TYPES = ["one-to-many", "many-to-one", "one-to-one", "many-to-many"]
+
+
+# ============== FIXTURES ==============
+
+def make_schema_args(n_entities: int, seed: int = 0, attrs_per_entity: int = 8) -> dict:
+    """propose_schema arguments for a generated schema of n_entities tables"""
+    rng = random.Random(seed)
+    entities = []
+    relationships = []
+    for i in range(n_entities):
+        name = f"Entity{i}"
+        attributes = [{"name": f"entity{i}_id", "type": "INT", "primary_key": True, "nullable": False}]
+        for j in range(attrs_per_entity - 1):
+            attributes.append({
+                "name": f"field_{j}",
+                "type": rng.choice(TYPES),
+                "nullable": rng.random() < 0.5,
+                "unique": rng.random() < 0.1
+            })
+        entities.append({"name": name, "attributes": attributes})
+
+        # Mostly local links plus a few long-range ones, like real schemas
+        if i > 0:
+            for _ in range(rng.choice([1, 1, 2])):
+                target = max(0, i - rng.randint(1, 5)) if rng.random() < 0.8 else rng.randrange(i)
+                relationships.append({
+                    "name": f"rel_{i}_{target}",
+                    "from_entity": f"Entity{target}",
+                    "to_entity": name,
+                    "type": rng.choice(REL_TYPES)
+                })
+
+    return {"schema_name": f"Bench{n_entities}", "entities": entities, "relationships": relationships}
+
+
+def chat_script(n_entities: int) -> list:
+    """A realistic conversation: (user message, tool name, tool args) per turn.
+
+    The messages are phrased so fast_path does not take them: every turn has
+    to reach the stub, which replies in script order.
+    """
+    return [
+        ("I need a database for an online store", "ask_clarification",
+         {"question": "Do customers need accounts?", "options": ["yes", "no", "guest checkout"]}),
+        ("yes", "ask_clarification",
+         {"question": "Track inventory per warehouse?", "options": ["yes", "no"]}),
+        ("yes", "propose_schema", make_schema_args(n_entities)),
+        ("customers of Entity0 should also have a unique email", "modify_schema",
+         {"action": "add_attribute", "target_entity": "Entity0",
+          "data": {"name": "email", "type": "VARCHAR(255)", "unique": True}}),
+        ("remove the last table", "modify_schema",
+         {"action": "remove_entity", "data": {"name": f"Entity{n_entities - 1}"}}),
+        ("that covers everything, we are done", "finalize_schema",
+         {"confirmation_message": "Store schema finalized."}),
+    ]
+
+
+# ============== STUB CLIENTS ==============
+
+class StubGeminiClient:
+    """Stands in for genai.Client; replies with the next scripted tool call"""
+
+    def __init__(self, script: list, latency: float = 0.0):
+        self.script = script
+        self.turn = 0
+        self.latency = latency
+        self.last_tool = None
+        self.models = self
+
+    def generate_content(self, model, contents, config=None):
+        from google.genai import types
+
+        _, tool_name, tool_args = self.script[self.turn % len(self.script)]
+        self.turn += 1
+        self.last_tool = tool_name
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt_chars = sum(len(str(c)) for c in contents)
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(
+                role="model",
+                parts=[types.Part.from_function_call(name=tool_name, args=tool_args)]
+            ))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=len(json.dumps(tool_args)) // 4
+            )
+        )
+
+
+class StubGroqClient:
+    """Stands in for groq.Groq; replies with the next scripted tool call"""
+
+    def __init__(self, script: list, latency: float = 0.0):
+        self.script = script
+        self.turn = 0
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model, messages, tools=None, tool_choice=None):
+        _, tool_name, tool_args = self.script[self.turn % len(self.script)]
+        self.turn += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        arguments = json.dumps(tool_args)
+        tool_call = SimpleNamespace(function=SimpleNamespace(name=tool_name, arguments=arguments))
+        message = SimpleNamespace(content=None, tool_calls=[tool_call])
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message)],
+            usage=SimpleNamespace(prompt_tokens=prompt_chars // 4, completion_tokens=len(arguments) // 4,
+                                  prompt_tokens_details=None)
+        )
+
+
+# ============== TIMING ==============
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """Run func `repeat` times (after setup each time) and summarize in ms"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3)
+    }
+
+
+def repeat_for(size: int) -> int:
+    """Fewer repetitions for the big fixtures"""
+    if size <= 100:
+        return 20
+    if size <= 500:
+        return 7
+    return 3
+
+
+# ============== BENCHMARKS ==============
+
+def bench_handlers(sizes: list) -> list:
+    results = []
+    for size in sizes:
+        args = make_schema_args(size)
+        results.append({"name": "handle_propose_schema", "entities": size,
+                         **measure(lambda: handlers.handle_propose_schema(args), repeat_for(size))})
+
+        handlers.handle_propose_schema(args)
+        target = f"Entity{size // 2}"
+        add = {"action": "add_attribute", "target_entity": target,
+               "data": {"name": "bench_col", "type": "INT"}}
+        remove = {"action": "remove_attribute", "target_entity": target, "data": {"name": "bench_col"}}
+
+        def modify_pair():
+            handlers.handle_modify_schema(add)
+            handlers.handle_modify_schema(remove)
+
+        stats = measure(modify_pair, repeat_for(size) * 5)
+        results.append({"name": "handle_modify_schema (add+remove attribute)", "entities": size, **stats})
+    return results
+
+
+def bench_diagrams(sizes: list) -> list:
+    results = []
+    for size in sizes:
+        handlers.handle_propose_schema(make_schema_args(size))
+        results.append({"name": "schema_to_mermaid", "entities": size,
+                        **measure(schema_to_mermaid, repeat_for(size))})
+        results.append({"name": "schema_to_interactive_html", "entities": size,
+                        **measure(schema_to_interactive_html, repeat_for(size))})
+    return results
+
+
+def bench_memory(sizes: list) -> list:
+    """Memory held by VERSIONS_KEPT copies of a schema: Pydantic models vs CompactSchema"""
+    import gc
+    import tracemalloc
+    from models import Schema
+    from compact_schema import CompactSchema
+
+    results = []
+    for size in sizes:
+        schema = Schema(**make_schema_args(size, attrs_per_entity=MEMORY_ATTRS_PER_ENTITY))
+        builders = [
+            ("memory: Schema.model_copy(deep=True)", lambda: schema.model_copy(deep=True)),
+            ("memory: CompactSchema", lambda: CompactSchema(schema)),
+        ]
+        for name, build in builders:
+            gc.collect()
+            tracemalloc.start()
+            versions = [build() for _ in range(VERSIONS_KEPT)]
+            held, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del versions
+            results.append({"name": name, "entities": size, "attributes": size * MEMORY_ATTRS_PER_ENTITY,
+                            "versions": VERSIONS_KEPT, "bytes": held, "bytes_per_version": held // VERSIONS_KEPT})
+
+        compact = CompactSchema(schema)
+        results.append({"name": "CompactSchema(schema)", "entities": size,
+                        **measure(lambda: CompactSchema(schema), repeat_for(size))})
+        results.append({"name": "CompactSchema.to_schema()", "entities": size,
+                        **measure(compact.to_schema, repeat_for(size))})
+    return results
+
+
+def bench_main_chat(sizes: list) -> list:
+    """Drive main.chat through the scripted conversation with a stub Gemini"""
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-stub")
+    try:
+        import main
+        import layout
+        import token_budget
+    except ImportError as e:
+        print(f"Skipping main.chat benchmark: {e}")
+        return []
+
+    results = []
+    for size in sizes:
+        script = chat_script(size)
+        turn_samples = {}
+
+        def run_conversation():
+            stub = main.gemini.client = StubGeminiClient(script)
+            main.conversations.clear()
+            layout.reset_layout("bench")
+            token_budget.reset_usage("bench")
+            token_budget.tenant_totals.pop("bench", None)
+            handlers.reset_schema()
+            for message, _, _ in script:
+                stub.last_tool = None
+                start = time.perf_counter()
+                asyncio.run(main.chat(main.ChatRequest(message=message, session_id="bench"), x_api_key=None))
+                # Keyed by what ran: a turn fast_path answered never reached the stub
+                executed = stub.last_tool or "fast path"
+                turn_samples.setdefault(executed, []).append((time.perf_counter() - start) * 1000)
+
+        results.append({"name": "main.chat (full conversation)", "entities": size,
+                        **measure(run_conversation, max(3, repeat_for(size) // 2))})
+        for tool_name, samples in turn_samples.items():
+            results.append({"name": f"main.chat turn: {tool_name}", "entities": size,
+                            "runs": len(samples), "median_ms": round(statistics.median(samples), 3)})
+    return results
+
+
+def bench_agent_chat(sizes: list) -> list:
+    """Drive agent.chat (Groq) through the same conversation with a stub Groq"""
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-stub")
+    try:
+        import agent
+    except ImportError as e:
+        print(f"Skipping agent.chat benchmark: {e}")
+        return []
+
+    results = []
+    for size in sizes:
+        script = chat_script(size)
+
+        def run_conversation():
+            agent.client = StubGroqClient(script)
+            agent.reset_conversation()
+            # agent.chat prints tool use and the final diagram; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                for message, _, _ in script:
+                    agent.chat(message)
+
+        results.append({"name": "agent.chat (full conversation)", "entities": size,
+                        **measure(run_conversation, max(3, repeat_for(size) // 2))})
+    return results
+
+
+def bench_load_test(sizes: list) -> list:
+    """Synthetic data generation and the derived join queries on it"""
+    try:
+        import load_bench
+        from validation import PROPOSE_ADAPTER
+    except ImportError as e:
+        print(f"Skipping load test benchmark: {e}")
+        return []
+
+    results = []
+    for size in sizes:
+        schema = PROPOSE_ADAPTER.validate_python(make_schema_args(size))
+        rows = max(100, 200_000 // size)
+        results.append({"name": f"load_bench.generate_database ({rows} rows/table)", "entities": size,
+                        **measure(lambda: load_bench.generate_database(schema, rows)[0].close(), 3)})
+
+        connection, _ = load_bench.generate_database(schema, rows)
+        queries = load_bench.derive_queries(connection, schema)
+        for result in load_bench.benchmark_queries(connection, queries, repeat_for(size)):
+            if "error" not in result:
+                results.append({"name": f"query: {result['name']}", "entities": size,
+                                "median_ms": result["median_ms"], "full_scans": len(result["full_scans"])})
+        connection.close()
+    return results
+
+
+BENCHMARKS = {
+    "handlers": bench_handlers,
+    "diagrams": bench_diagrams,
+    "memory": bench_memory,
+    "chat": bench_main_chat,
+    "agent": bench_agent_chat,
+    "load": bench_load_test,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="SchemaForge benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Entity counts for handler/diagram benchmarks")
+    parser.add_argument("--chat-sizes", default=",".join(map(str, CHAT_SIZES)),
+                        help="Entity counts proposed during the chat scripts")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma-separated benchmark groups")
+    parser.add_argument("--out", default="bench_results.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    chat_sizes = [int(s) for s in args.chat_sizes.split(",") if s]
+
+    results = []
+    for group in args.only.split(","):
+        group_sizes = chat_sizes if group in ("chat", "agent") else sizes
+        print(f"Running {group} ...")
+        for record in BENCHMARKS[group](group_sizes):
+            record["group"] = group
+            if "bytes" in record:
+                print(f"  {record['name']:<48} {record['entities']:>5} entities  {record['bytes_per_version'] / 1e6:>10.2f} MB per version")
+            else:
+                print(f"  {record['name']:<48} {record['entities']:>5} entities  median {record['median_ms']:>10.3f} ms")
+            results.append(record)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {os.path.abspath(args.out)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
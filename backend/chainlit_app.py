@@ -2,8 +2,8 @@ import chainlit as cl
 import json
 import re
 import os
-import asyncio
 import base64
+from functools import partial
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
@@ -15,15 +15,23 @@ from handlers import (
     get_current_schema,
     reset_schema
 )
-from diagram import schema_to_mermaid
+from diagram import schema_to_mermaid, schema_to_mermaid_parts, SPLIT_THRESHOLD
 from diagram_html import schema_to_interactive_html
+from layout import layout_positions, reset_layout
+import speculative
+import token_budget
+import fast_path
+from validation import to_native
+import llm_replay
+from llm_chat import GeminiChat, user_content, local_response, schema_note
+from ddl_export import schema_to_ddl
+import schema_check
+import fk_inference
 
 load_dotenv()
 
-# Configure Gemini client
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-
-MODEL_ID = "gemini-2.5-flash"
+# Configure Gemini client (LLM_REPLAY_MODE=record|replay captures or serves a JSONL corpus)
+client = llm_replay.gemini_client(lambda: genai.Client(api_key=os.getenv("GEMINI_API_KEY")))
 
 SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant. Your job is to help users design database schemas through conversation.
 
@@ -45,6 +53,12 @@ SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant.
 ## Important:
 - Always use the provided functions to interact
 - Options must be SHORT like: "yes", "no", "students", "one-to-many"
+
+## Current schema:
+- Once a schema exists, the latest user message starts with "Current schema:" in a compact form
+- One table per line: Table(column TYPE PK NN UQ, ...) where PK = primary key, NN = not null, UQ = unique
+- Relationships: name: FromTable 1:N ToTable (1:1, 1:N, N:1, N:N)
+- Treat it as the source of truth over earlier messages
 """
 
 # Define tools for Gemini
@@ -174,6 +188,10 @@ def process_tool_call(tool_name: str, tool_args: dict) -> str:
     return json.dumps(result)
 
 
+# Model calls with this front end's prompt and tools (prompt cache, router)
+gemini = GeminiChat(client, SYSTEM_PROMPT, GEMINI_TOOLS)
+
+
 def clean_options(options: list) -> list:
     if not options:
         return []
@@ -201,27 +219,40 @@ async def get_response(user_input: str, history: list) -> tuple[str, list, bool]
     options = []
     is_schema_proposed = False
     
+    session_id = cl.user_session.get("id")
+    
+    # Refuse sessions that used up their token budget
+    if token_budget.over_hard_budget(session_id):
+        return "⛔ This conversation has used up its token budget. Start a new chat to continue.", [], False
+    
+    # Over the soft budget: keep the first message, the current schema and the recent turns
+    if token_budget.over_soft_budget(session_id):
+        token_budget.compact_history(session_id, history, schema_note(), lambda c: c.role == "user")
+    
     # Add user message to history
-    history.append(types.Content(role="user", parts=[types.Part.from_text(text=user_input)]))
+    history.append(user_content(user_input))
     
     try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=history,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=GEMINI_TOOLS
-            )
-        )
+        # Simple edits ("add created_at DATETIME to Order") are parsed locally
+        command = fast_path.try_fast_path(user_input, get_current_schema())
+        if command:
+            speculative.cancel(session_id)
+            response = local_response(*command)
+        else:
+            # Use the prefetched reply if the user picked a suggested option
+            response = await speculative.take(session_id, user_input, len(history) - 1)
+            if response is None:
+                response = await gemini.complete(session_id, history)
         
         # Check response
-        if response.candidates and response.candidates[0].content.parts:
+        repairs = 0
+        while response.candidates and response.candidates[0].content.parts:
             for part in response.candidates[0].content.parts:
                 # Check for function call
                 if part.function_call:
                     func_call = part.function_call
                     tool_name = func_call.name
-                    tool_args = dict(func_call.args)
+                    tool_args = to_native(func_call.args)
                     
                     print(f"🔧 Tool called: {tool_name}")
                     
@@ -231,10 +262,21 @@ async def get_response(user_input: str, history: list) -> tuple[str, list, bool]
                     # Add assistant response to history
                     history.append(types.Content(role="model", parts=[part]))
                     
+                    # A rejected schema change goes back to the model before the user sees it
+                    if schema_check.needs_repair(tool_name, result_dict, repairs):
+                        repairs += 1
+                        history.append(user_content(schema_check.repair_note(tool_name, result_dict)))
+                        response = await gemini.complete(session_id, history)
+                        break
+                    
                     if tool_name == "ask_clarification":
                         question = result_dict.get("question", "Could you provide more details?")
                         raw_options = result_dict.get("options", [])
                         options = clean_options(raw_options)
+                        speculative.start(
+                            session_id, history, options, partial(gemini.generate_speculative, session_id, session_id), user_content,
+                            extra_tokens=len(SYSTEM_PROMPT) // 4
+                        )
                         return question, options, False
                     
                     elif tool_name == "propose_schema":
@@ -254,8 +296,14 @@ async def get_response(user_input: str, history: list) -> tuple[str, list, bool]
                                 for rel in relationships:
                                     response_text += f"- {rel['from_entity']} → {rel['to_entity']} ({rel['type']})\n"
                             
+                            # Entities left without relationships: link them locally or offer the links
+                            linked, suggestions = fk_inference.connect_orphans()
+                            if linked:
+                                response_text += "\n**Connected orphan entities:**\n"
+                                response_text += "".join(f"- {m}\n" for m in linked)
+                            
                             response_text += "\nWould you like to modify anything?"
-                            options = ["Modify", "Finalize"]
+                            options = [fk_inference.option_text(s) for s in suggestions[:fk_inference.MAX_OPTIONS]] + ["Modify", "Finalize"]
                             is_schema_proposed = True
                         else:
                             response_text = f"❌ Error: {result_dict.get('error', 'Unknown error')}"
@@ -280,6 +328,8 @@ async def get_response(user_input: str, history: list) -> tuple[str, list, bool]
                 elif part.text:
                     history.append(types.Content(role="model", parts=[part]))
                     return part.text, [], False
+            else:
+                break
         
         return "How can I help you design your database?", [], False
         
@@ -297,12 +347,23 @@ async def get_response(user_input: str, history: list) -> tuple[str, list, bool]
         return f"Sorry, I encountered an error: {str(e)[:100]}", [], False
 
 
+def mermaid_preview(schema) -> str:
+    """Mermaid preview markdown, split per cluster for large schemas"""
+    if len(schema.entities) <= SPLIT_THRESHOLD:
+        return f"```mermaid\n{schema_to_mermaid()}\n```"
+    
+    parts = schema_to_mermaid_parts()
+    blocks = [f"**Overview:**\n```mermaid\n{parts['overview']}\n```"]
+    for cluster in parts["clusters"]:
+        blocks.append(f"**{cluster['name']}:**\n```mermaid\n{cluster['mermaid']}\n```")
+    return "\n\n".join(blocks)
+
+
 async def show_schema_diagram():
     """Show the current schema diagram embedded"""
     schema = get_current_schema()
     if schema:
-        html_content = schema_to_interactive_html()
-        mermaid_code = schema_to_mermaid()
+        html_content = schema_to_interactive_html(saved_positions=layout_positions(cl.user_session.get("id"), schema))
         
         # Save HTML temporarily and create data URL
         html_base64 = base64.b64encode(html_content.encode()).decode()
@@ -310,7 +371,7 @@ async def show_schema_diagram():
         
         # Create an embedded viewer message
         await cl.Message(
-            content=f"📊 **Schema Diagram**\n\n[🔗 Open Interactive Diagram]({data_url})\n\n**Preview:**\n```mermaid\n{mermaid_code}\n```"
+            content=f"📊 **Schema Diagram**\n\n[🔗 Open Interactive Diagram]({data_url})\n\n**Preview:**\n{mermaid_preview(schema)}"
         ).send()
         
         # Also provide download
@@ -328,9 +389,8 @@ async def show_final_schema():
     """Show final schema with embedded diagram and downloads"""
     schema = get_current_schema()
     if schema:
-        html_content = schema_to_interactive_html()
+        html_content = schema_to_interactive_html(saved_positions=layout_positions(cl.user_session.get("id"), schema))
         schema_json = schema.model_dump_json(indent=2)
-        mermaid_code = schema_to_mermaid()
         
         # Create data URL for diagram
         html_base64 = base64.b64encode(html_content.encode()).decode()
@@ -351,14 +411,22 @@ async def show_final_schema():
             content=schema_json.encode('utf-8'),
             display="inline"
         )
+        sql_files = [
+            cl.File(
+                name=f"{schema.schema_name}_{dialect}.sql",
+                content=schema_to_ddl(dialect=dialect).encode('utf-8'),
+                display="inline"
+            )
+            for dialect in ("postgresql", "mysql", "sqlite")
+        ]
         
         await cl.Message(
             content="📥 **Downloads:**",
-            elements=[html_file, json_file]
+            elements=[html_file, json_file, *sql_files]
         ).send()
         
         await cl.Message(
-            content=f"**Diagram Preview:**\n```mermaid\n{mermaid_code}\n```"
+            content=f"**Diagram Preview:**\n{mermaid_preview(schema)}"
         ).send()
 
 async def ask_user_choice(options: list) -> str:
@@ -395,6 +463,9 @@ async def start():
     # Initialize empty history
     cl.user_session.set("history", [])
     reset_schema()
+    reset_layout(cl.user_session.get("id"))
+    speculative.cancel(cl.user_session.get("id"))
+    token_budget.reset_usage(cl.user_session.get("id"))
     
     await cl.Message(
         content="👋 Welcome to **SchemaForge**!\n\nI'll help you design database schemas through conversation.\n\n**Just tell me what system you want to build**, for example:\n- \"A system for managing a school\"\n- \"An e-commerce database\"\n- \"A library management system\""
@@ -0,0 +1,101 @@
+import sys
+from array import array
+from models import Schema, Entity, Attribute, Relationship
+
+# Flag bits packed into one byte per attribute
+PRIMARY_KEY = 1
+NULLABLE = 2
+UNIQUE = 4
+
+
+class CompactSchema:
+    """Columnar, read-only copy of a Schema.
+
+    Attributes of all entities live in flat columns: names (interned), type
+    codes into the schema's own type table and one flag byte each; entity i owns the slice
+    offsets[i]:offsets[i + 1]. Relationships keep their names plus entity
+    names and type codes. Pydantic objects are only built on demand by
+    entity() and to_schema().
+    """
+
+    __slots__ = ("schema_name", "types", "entity_names", "offsets", "attr_names", "attr_types", "attr_flags",
+                 "rel_names", "rel_from", "rel_to", "rel_types")
+
+    def __init__(self, schema: Schema):
+        self.schema_name = schema.schema_name
+        # Distinct type strings of this schema ("INT" is stored once); dropped with it
+        self.types = []
+        codes = {}
+
+        def intern_type(sql_type: str) -> int:
+            code = codes.get(sql_type)
+            if code is None:
+                code = codes[sql_type] = len(self.types)
+                self.types.append(sys.intern(sql_type))
+            return code
+
+        self.entity_names = [sys.intern(e.name) for e in schema.entities]
+        self.offsets = array("I", [0])
+        self.attr_names = []
+        self.attr_types = array("I")
+        self.attr_flags = bytearray()
+        for entity in schema.entities:
+            for a in entity.attributes:
+                self.attr_names.append(sys.intern(a.name))
+                self.attr_types.append(intern_type(a.type))
+                self.attr_flags.append(
+                    (PRIMARY_KEY if a.primary_key else 0) | (NULLABLE if a.nullable else 0) | (UNIQUE if a.unique else 0)
+                )
+            self.offsets.append(len(self.attr_names))
+
+        self.rel_names = [sys.intern(r.name) for r in schema.relationships]
+        self.rel_from = [sys.intern(r.from_entity) for r in schema.relationships]
+        self.rel_to = [sys.intern(r.to_entity) for r in schema.relationships]
+        self.rel_types = array("I", (intern_type(r.type) for r in schema.relationships))
+
+    def __len__(self) -> int:
+        return len(self.entity_names)
+
+    def attribute_count(self) -> int:
+        return len(self.attr_names)
+
+    def attribute(self, i: int) -> Attribute:
+        flags = self.attr_flags[i]
+        return Attribute.model_construct(
+            name=self.attr_names[i],
+            type=self.types[self.attr_types[i]],
+            primary_key=bool(flags & PRIMARY_KEY),
+            nullable=bool(flags & NULLABLE),
+            unique=bool(flags & UNIQUE)
+        )
+
+    def entity(self, index: int) -> Entity:
+        """Pydantic view of one entity"""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return Entity.model_construct(
+            name=self.entity_names[index],
+            attributes=[self.attribute(i) for i in range(start, end)]
+        )
+
+    def relationship(self, i: int) -> Relationship:
+        return Relationship.model_construct(
+            name=self.rel_names[i],
+            from_entity=self.rel_from[i],
+            to_entity=self.rel_to[i],
+            type=self.types[self.rel_types[i]]
+        )
+
+    def to_schema(self) -> Schema:
+        """Full Pydantic view (a fresh, mutable Schema); the data was validated on the way in"""
+        return Schema.model_construct(
+            schema_name=self.schema_name,
+            entities=[self.entity(i) for i in range(len(self.entity_names))],
+            relationships=[self.relationship(i) for i in range(len(self.rel_names))]
+        )
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this object (shared interned strings excluded)"""
+        size = sys.getsizeof(self.entity_names) + sys.getsizeof(self.attr_names) + sys.getsizeof(self.rel_names)
+        size += sys.getsizeof(self.rel_from) + sys.getsizeof(self.rel_to) + sys.getsizeof(self.types)
+        size += sum(sys.getsizeof(c) for c in (self.offsets, self.attr_types, self.attr_flags, self.rel_types))
+        return size
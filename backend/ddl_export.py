@@ -0,0 +1,406 @@
+import re
+import sys
+import time
+from functools import lru_cache
+
+from models import Schema
+import metrics
+
+DIALECTS = ("postgresql", "mysql", "sqlite")
+
+# Longest identifier all three dialects accept (PostgreSQL truncates at 63)
+MAX_IDENTIFIER = 63
+
+# Per-dialect rewrites of a base type (the part before any "(...)"); a value
+# without "(" keeps the original arguments, e.g. NVARCHAR(40) -> VARCHAR(40)
+TYPE_MAP = {
+    "postgresql": {
+        "DATETIME": "TIMESTAMP", "TINYINT": "SMALLINT", "MEDIUMINT": "INTEGER", "DOUBLE": "DOUBLE PRECISION",
+        "FLOAT": "DOUBLE PRECISION", "BLOB": "BYTEA", "LONGBLOB": "BYTEA", "LONGTEXT": "TEXT",
+        "MEDIUMTEXT": "TEXT", "TINYTEXT": "TEXT", "NVARCHAR": "VARCHAR", "BOOL": "BOOLEAN", "BIT": "BOOLEAN",
+        "STRING": "TEXT", "INT UNSIGNED": "BIGINT", "BIGINT UNSIGNED": "NUMERIC(20)", "ENUM": "TEXT"
+    },
+    "mysql": {
+        "SERIAL": "INT AUTO_INCREMENT", "BIGSERIAL": "BIGINT AUTO_INCREMENT", "SMALLSERIAL": "SMALLINT AUTO_INCREMENT",
+        "UUID": "CHAR(36)", "JSONB": "JSON", "BYTEA": "BLOB", "TIMESTAMPTZ": "TIMESTAMP",
+        "TIMESTAMP WITH TIME ZONE": "TIMESTAMP", "TIMESTAMP WITHOUT TIME ZONE": "TIMESTAMP",
+        "DOUBLE PRECISION": "DOUBLE", "MONEY": "DECIMAL(19,4)", "NVARCHAR": "VARCHAR", "STRING": "TEXT",
+        "CHARACTER VARYING": "VARCHAR", "INTERVAL": "VARCHAR(64)", "INET": "VARCHAR(45)"
+    },
+    "sqlite": {
+        "SERIAL": "INTEGER", "BIGSERIAL": "INTEGER", "SMALLSERIAL": "INTEGER", "UUID": "TEXT", "JSONB": "TEXT",
+        "JSON": "TEXT", "TIMESTAMPTZ": "TIMESTAMP", "TIMESTAMP WITH TIME ZONE": "TIMESTAMP", "STRING": "TEXT",
+        "ENUM": "TEXT", "MONEY": "NUMERIC"
+    }
+}
+
+# Types a foreign key column takes when the referenced key is auto-generated
+KEY_TYPES = {"SERIAL": "INTEGER", "BIGSERIAL": "BIGINT", "SMALLSERIAL": "SMALLINT"}
+AUTO_TYPES = {"BIGINT": "BIGSERIAL", "SMALLINT": "SMALLSERIAL"}
+AUTO_WORDS_RE = re.compile(r"\s+(?:AUTO_INCREMENT|AUTOINCREMENT|IDENTITY(?:\(.*?\))?|GENERATED\b.*)$", re.I)
+BASE_TYPE_RE = re.compile(r"([^(\[]*?)\s*(\(.*\))?\s*(\[\])?$", re.S)
+
+# Streamed output is sent in pieces of about this many characters
+STREAM_CHUNK = 64 * 1024
+
+# Generated DDL for the current schema, per dialect, dropped when the version changes
+_cache = {"version": None, "schema_id": None, "ddl": {}}
+
+
+@lru_cache(maxsize=4096)
+def snake(name: str) -> str:
+    """OrderItem / "Order Item" -> order_item"""
+    name = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name.strip())
+    return re.sub(r"\W+", "_", name).strip("_").lower() or "t"
+
+
+def constraint_name(*parts: str) -> str:
+    return "_".join(snake(p) for p in parts)[:MAX_IDENTIFIER]
+
+
+def quote(name: str, dialect: str) -> str:
+    if dialect == "mysql":
+        return "`" + name.replace("`", "``") + "`"
+    return '"' + name.replace('"', '""') + '"'
+
+
+def key_type(sql_type: str) -> str:
+    """Type of a column referencing a key of this type (SERIAL -> INTEGER)"""
+    sql_type = AUTO_WORDS_RE.sub("", sql_type.strip())
+    return KEY_TYPES.get(sql_type.upper(), sql_type)
+
+
+@lru_cache(maxsize=1024)
+def map_type(sql_type: str, dialect: str, indexed: bool = False) -> str:
+    """Translate a free-form model type to one the dialect accepts"""
+    # "INT AUTO_INCREMENT" style types become each dialect's auto-numbered integer
+    if AUTO_WORDS_RE.search(sql_type):
+        base = AUTO_WORDS_RE.sub("", sql_type.strip()).upper()
+        if dialect == "postgresql":
+            return AUTO_TYPES.get(base, "SERIAL")
+        return "INTEGER" if dialect == "sqlite" else f"{base} AUTO_INCREMENT"
+
+    match = BASE_TYPE_RE.match(sql_type.strip())
+    if match is None:
+        return sql_type
+    base, args, array = match.group(1).upper(), match.group(2) or "", match.group(3)
+    if array:
+        # Only PostgreSQL has array columns
+        return sql_type if dialect == "postgresql" else ("JSON" if dialect == "mysql" else "TEXT")
+
+    target = TYPE_MAP[dialect].get(base)
+    mapped = (target if "(" in target else target + args) if target else base + args
+    if dialect == "mysql":
+        # MySQL needs a length on VARCHAR, and cannot index TEXT/BLOB without one
+        if mapped == "VARCHAR":
+            mapped = "VARCHAR(255)"
+        elif indexed and mapped in ("TEXT", "BLOB"):
+            mapped = "VARCHAR(255)" if mapped == "TEXT" else "VARBINARY(255)"
+    return mapped or "TEXT"
+
+
+def find_entity(entities: dict, name: str):
+    return entities.get(name) or entities.get(name.lower())
+
+
+def plan_tables(schema: Schema) -> tuple:
+    """Dialect-independent table plans with materialized FK columns and junction tables.
+
+    Returns (tables, notes). Each table is {"name", "columns", "primary_key",
+    "foreign_keys", "unique"} (junction tables also name their "relationship");
+    notes are (relationship name, problem) for relationships that could not
+    be turned into constraints.
+    """
+    tables = []
+    by_name = {}
+    for entity in schema.entities:
+        table = {
+            "name": entity.name,
+            "columns": [
+                {"name": a.name, "type": a.type, "nullable": a.nullable and not a.primary_key, "unique": a.unique}
+                for a in entity.attributes
+            ],
+            "primary_key": [a.name for a in entity.attributes if a.primary_key],
+            "foreign_keys": [],
+            "unique": [],
+            "claimed": set()
+        }
+        tables.append(table)
+        by_name[entity.name] = table
+        by_name.setdefault(entity.name.lower(), table)
+
+    notes = []
+
+    def add_reference(child: dict, parent: dict, rel, prefix: str = None, unique: bool = False, nullable: bool = False):
+        """Give `child` columns referencing `parent`'s primary key; return them"""
+        columns = {c["name"].lower(): c for c in child["columns"]}
+        parent_types = {c["name"]: c["type"] for c in parent["columns"]}
+        names = []
+        for pk in parent["primary_key"]:
+            if prefix:
+                name = f"{prefix}_{pk}"
+            elif child is parent:
+                # A self reference (manager -> User) is named after the relationship
+                name = f"{snake(rel.name)}_{pk}"
+            elif pk.lower().startswith(snake(parent["name"])):
+                name = pk
+            else:
+                name = f"{snake(parent['name'])}_{pk}"
+            # Reuse a column the model already added (user_id), unless another key took it
+            existing = columns.get(name.lower())
+            if existing is not None and name.lower() in child["claimed"]:
+                name = f"{snake(rel.name)}_{pk}"
+                existing = columns.get(name.lower())
+            if existing is None:
+                existing = {"name": name, "type": key_type(parent_types[pk]), "nullable": nullable, "unique": False}
+                child["columns"].append(existing)
+                columns[name.lower()] = existing
+            child["claimed"].add(existing["name"].lower())
+            names.append(existing["name"])
+
+        child["foreign_keys"].append({
+            "name": constraint_name("fk", child["name"], *names),
+            "columns": names,
+            "parent": parent["name"],
+            "ref_columns": list(parent["primary_key"])
+        })
+        if unique and names != child["primary_key"]:
+            if len(names) == 1:
+                columns[names[0].lower()]["unique"] = True
+            else:
+                child["unique"].append(names)
+        return names
+
+    for rel in schema.relationships:
+        source = find_entity(by_name, rel.from_entity)
+        target = find_entity(by_name, rel.to_entity)
+        if source is None or target is None:
+            notes.append((rel.name, f"unknown entity {rel.from_entity if source is None else rel.to_entity}"))
+            continue
+        kind = rel.type.lower().replace("_", "-").replace(" ", "-")
+
+        if kind == "many-to-many":
+            if not source["primary_key"] or not target["primary_key"]:
+                notes.append((rel.name, "both entities need a primary key for a junction table"))
+                continue
+            name = f"{snake(source['name'])}_{snake(target['name'])}"
+            if find_entity(by_name, name) is not None:
+                name = snake(rel.name)
+            if find_entity(by_name, name) is not None:
+                notes.append((rel.name, f"junction table {name} already exists"))
+                continue
+            junction = {"name": name, "columns": [], "primary_key": [], "foreign_keys": [], "unique": [],
+                        "claimed": set(), "relationship": rel.name}
+            tables.append(junction)
+            by_name[name] = junction
+            left = add_reference(junction, source, rel)
+            # A self many-to-many (User follows User) needs distinct column names
+            right = add_reference(junction, target, rel, prefix=snake(rel.name) if source is target else None)
+            junction["primary_key"] = left + right
+            for column in junction["columns"]:
+                column["nullable"] = False
+            continue
+
+        # The "many" side holds the key; for one-to-one, the target does
+        parent, child = (target, source) if kind == "many-to-one" else (source, target)
+        if not parent["primary_key"]:
+            notes.append((rel.name, f"{parent['name']} has no primary key to reference"))
+            continue
+        add_reference(child, parent, rel, unique=kind == "one-to-one", nullable=child is parent)
+
+    return tables, notes
+
+
+def topological_order(tables: list) -> tuple:
+    """Tables with every parent before its children; returns (ordered, deferred FK set).
+
+    Kahn's algorithm, stable in schema order. Foreign keys inside a cycle
+    cannot be created inline and are returned as (table name, fk name) to be
+    added with ALTER TABLE once every table exists.
+    """
+    by_name = {t["name"]: t for t in tables}
+    children = {name: [] for name in by_name}
+    pending = {name: 0 for name in by_name}
+    for table in tables:
+        for parent in {fk["parent"] for fk in table["foreign_keys"]}:
+            if parent != table["name"]:
+                children[parent].append(table["name"])
+                pending[table["name"]] += 1
+
+    ready = [t["name"] for t in tables if pending[t["name"]] == 0]
+    queued = set(ready)
+    ordered = []
+    position = 0
+    scan = 0
+    while len(ordered) < len(tables):
+        if position == len(ready):
+            # Only cycles are left: break the first one at its earliest table
+            while tables[scan]["name"] in queued:
+                scan += 1
+            ready.append(tables[scan]["name"])
+            queued.add(tables[scan]["name"])
+        name = ready[position]
+        position += 1
+        ordered.append(by_name[name])
+        for child in children[name]:
+            pending[child] -= 1
+            if pending[child] == 0 and child not in queued:
+                ready.append(child)
+                queued.add(child)
+
+    seen = set()
+    deferred = set()
+    for table in ordered:
+        for fk in table["foreign_keys"]:
+            if fk["parent"] != table["name"] and fk["parent"] not in seen:
+                deferred.add((table["name"], fk["name"]))
+        seen.add(table["name"])
+    return ordered, deferred
+
+
+def foreign_key_sql(fk: dict, dialect: str) -> str:
+    columns = ", ".join(quote(c, dialect) for c in fk["columns"])
+    ref_columns = ", ".join(quote(c, dialect) for c in fk["ref_columns"])
+    return (f"CONSTRAINT {quote(fk['name'], dialect)} FOREIGN KEY ({columns}) "
+            f"REFERENCES {quote(fk['parent'], dialect)} ({ref_columns})")
+
+
+def create_table_sql(table: dict, dialect: str, deferred: set) -> str:
+    indexed = {c.lower() for c in table["primary_key"]}
+    indexed.update(c.lower() for u in table["unique"] for c in u)
+    indexed.update(c.lower() for fk in table["foreign_keys"] for c in fk["columns"])
+
+    lines = []
+    for column in table["columns"]:
+        sql_type = map_type(column["type"], dialect, column["unique"] or column["name"].lower() in indexed)
+        line = f"{quote(column['name'], dialect)} {sql_type}"
+        if not column["nullable"]:
+            line += " NOT NULL"
+        if column["unique"]:
+            line += " UNIQUE"
+        lines.append(line)
+    if table["primary_key"]:
+        lines.append(f"PRIMARY KEY ({', '.join(quote(c, dialect) for c in table['primary_key'])})")
+    for columns in table["unique"]:
+        lines.append(f"UNIQUE ({', '.join(quote(c, dialect) for c in columns)})")
+    for fk in table["foreign_keys"]:
+        if (table["name"], fk["name"]) not in deferred:
+            lines.append(foreign_key_sql(fk, dialect))
+
+    body = ",\n    ".join(lines)
+    return f"CREATE TABLE {quote(table['name'], dialect)} (\n    {body}\n);\n"
+
+
+def iter_ddl(schema: Schema, dialect: str = "postgresql", with_indexes: bool = True):
+    """Yield the DDL for a schema one statement at a time, recommended indexes last"""
+    if dialect not in DIALECTS:
+        raise ValueError(f"Unknown dialect {dialect!r}, expected one of {', '.join(DIALECTS)}")
+
+    tables, notes = plan_tables(schema)
+    ordered, deferred = topological_order(tables)
+    # SQLite does not check references at CREATE time and has no ADD CONSTRAINT
+    if dialect == "sqlite":
+        deferred = set()
+
+    yield f"-- {schema.schema_name} ({dialect})\n"
+    for rel_name, problem in notes:
+        yield f"-- Skipped: Relationship {rel_name}: {problem}\n"
+    if dialect == "sqlite":
+        yield "PRAGMA foreign_keys = ON;\n"
+    yield "\n"
+    for table in ordered:
+        yield create_table_sql(table, dialect, deferred) + "\n"
+    for table in ordered:
+        for fk in table["foreign_keys"]:
+            if (table["name"], fk["name"]) in deferred:
+                yield f"ALTER TABLE {quote(table['name'], dialect)} ADD {foreign_key_sql(fk, dialect)};\n"
+
+    if with_indexes:
+        # Imported here: index_advisor builds on this module
+        from index_advisor import recommend_for_tables, index_sql
+
+        recommendations = recommend_for_tables(tables)
+        if recommendations:
+            yield "\n-- Recommended indexes\n"
+        table = None
+        for rec in recommendations:
+            cost = rec["write_cost"]
+            if rec["table"] != table:
+                table = rec["table"]
+                before, after = cost["table_btrees_per_insert"]
+                yield f"-- {table}: B-trees written per insert {before} -> {after}\n"
+            yield f"-- {'; '.join(rec['reasons'])}\n"
+            yield f"-- cost: {cost['bytes_per_row']} bytes/row, +{cost['btrees_per_insert']} B-tree per insert\n"
+            yield index_sql(rec, dialect)
+
+
+def cache_version() -> tuple:
+    """Cached DDL is stale when the schema or the declared access patterns change"""
+    # Imported here: handlers uses this module (through schema_check) at import time
+    from handlers import get_schema_version
+    import index_advisor
+
+    return get_schema_version(), index_advisor.patterns_version
+
+
+def schema_to_ddl(schema: Schema = None, dialect: str = "postgresql") -> str:
+    """DDL for a schema (default: the current schema, cached per version and dialect)"""
+    from handlers import get_current_schema
+
+    if schema is not None and schema is not get_current_schema():
+        return "".join(iter_ddl(schema, dialect))
+
+    schema = get_current_schema()
+    if schema is None:
+        return ""
+    version = cache_version()
+    if _cache["version"] != version or _cache["schema_id"] != id(schema):
+        _cache.update(version=version, schema_id=id(schema), ddl={})
+    ddl = _cache["ddl"].get(dialect)
+    metrics.inc("schemaforge_ddl_exports_total", dialect=dialect, cache="hit" if ddl is not None else "miss")
+    if ddl is None:
+        ddl = _cache["ddl"][dialect] = "".join(iter_ddl(schema, dialect))
+    return ddl
+
+
+def stream_ddl(dialect: str = "postgresql"):
+    """DDL of the current schema as chunks: cached text, or generated while it streams and then cached"""
+    from handlers import get_current_schema
+
+    schema = get_current_schema()
+    if schema is None:
+        return
+    version = cache_version()
+    if _cache["version"] == version and _cache["schema_id"] == id(schema) and dialect in _cache["ddl"]:
+        metrics.inc("schemaforge_ddl_exports_total", dialect=dialect, cache="hit")
+        yield _cache["ddl"][dialect]
+        return
+
+    metrics.inc("schemaforge_ddl_exports_total", dialect=dialect, cache="miss")
+    parts = []
+    pending = []
+    size = 0
+    for part in iter_ddl(schema, dialect):
+        parts.append(part)
+        pending.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK:
+            yield "".join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield "".join(pending)
+    # Only keep it if the schema did not change while streaming
+    if cache_version() == version and get_current_schema() is schema:
+        if _cache["version"] != version or _cache["schema_id"] != id(schema):
+            _cache.update(version=version, schema_id=id(schema), ddl={})
+        _cache["ddl"][dialect] = "".join(parts)
+
+
+# Usage: python ddl_export.py schema.json [postgresql|mysql|sqlite]
+if __name__ == "__main__":
+    with open(sys.argv[1]) as f:
+        schema = Schema.model_validate_json(f.read())
+    start = time.perf_counter()
+    print(schema_to_ddl(schema, sys.argv[2] if len(sys.argv) > 2 else "postgresql"))
+    print(f"-- generated in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
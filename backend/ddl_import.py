@@ -0,0 +1,454 @@
+import codecs
+import re
+import sys
+import time
+
+from handlers import handle_propose_schema
+
+# Characters read per step; memory is bounded by this plus the longest statement
+CHUNK_SIZE = 1 << 20
+
+# One SQL statement up to its ";", skipping over quoted strings, comments and
+# PostgreSQL $tag$ bodies. Possessive quantifiers keep a statement cut off at
+# a chunk boundary from backtracking; it simply fails to match until the
+# rest has been read. Standard strings only escape a quote by doubling it;
+# a backslash escapes in E'' strings, and in every string of a MySQL dump.
+STATEMENT_PATTERN = r"""
+    (?:
+        [^;'"`/\-$eE]++
+      | (?<!\w)[eE]'(?:[^'\\]|\\.|'')*+'
+      | [eE]
+      | {string}
+      | `[^`]*+`
+      | --[^\n]*+(?:\n|$)
+      | /\*.*?\*/
+      | \$(\w*)\$.*?\$\1\$
+      | /(?!\*)
+      | -(?!-)
+      | \$(?!\w*\$)
+    )*+;
+"""
+STATEMENT_RE = re.compile(STATEMENT_PATTERN.replace("{string}", r"""'(?:[^']|'')*+' | "(?:[^"]|"")*+" """),
+                          re.S | re.X)
+MYSQL_STATEMENT_RE = re.compile(
+    STATEMENT_PATTERN.replace("{string}", r"""'(?:[^'\\]|\\.|'')*+' | "(?:[^"\\]|\\.|"")*+" """), re.S | re.X
+)
+
+# MySQL dumps give themselves away early: backquotes, ENGINE= or /*!40101 ... */ hints
+MYSQL_HINT_RE = re.compile(r"`|\bENGINE\s*=|/\*!\d", re.I)
+
+# pg_dump table data: COPY ... FROM stdin; then raw rows up to a line holding only \.
+COPY_FROM_STDIN_RE = re.compile(r"copy\b[^;]*?\bfrom\s+stdin\b", re.I | re.S)
+COPY_END_RE = re.compile(r"^\\\.\r?$", re.M)
+
+# A possibly quoted, possibly schema-qualified name: public."Order Items"
+IDENTIFIER = r'(?:[`"\[][^`"\]]+[`"\]]|[\w$]+)'
+QUALIFIED_NAME = rf"{IDENTIFIER}(?:\s*\.\s*{IDENTIFIER})*"
+IDENTIFIER_PART_RE = re.compile(r'[`"\[]([^`"\]]+)[`"\]]|([\w$]+)')
+
+LEADING_COMMENTS_RE = re.compile(r"(?:\s+|--[^\n]*\n?|/\*.*?\*/)*", re.S)
+INTERESTING_RE = re.compile(r"(?:create|alter)\b", re.I)
+
+CREATE_TABLE_RE = re.compile(
+    r"create\s+(?:(?:global\s+|local\s+)?(?:temporary|temp|unlogged)\s+)?table\s+(?:if\s+not\s+exists\s+)?"
+    rf"({QUALIFIED_NAME})\s*\(", re.I
+)
+CREATE_UNIQUE_INDEX_RE = re.compile(
+    r"create\s+unique\s+index\s+(?:concurrently\s+)?(?:if\s+not\s+exists\s+)?[^(]*?\s+on\s+(?:only\s+)?"
+    r"([^\s(]+)\s*(?:using\s+\w+\s*)?\(([^)]*)\)", re.I
+)
+ALTER_TABLE_RE = re.compile(
+    rf"alter\s+table\s+(?:if\s+exists\s+)?(?:only\s+)?({QUALIFIED_NAME})\s+(.*)$",
+    re.I | re.S
+)
+
+FOREIGN_KEY_RE = re.compile(
+    r"foreign\s+key\s*(?:[`\"\[]?\w+[`\"\]]?\s*)?\(([^)]*)\)\s*references\s+([^\s(]+)\s*(?:\(([^)]*)\))?", re.I
+)
+PRIMARY_KEY_RE = re.compile(r"primary\s+key\s*(?:\w+\s*)?\(([^)]*)\)", re.I)
+UNIQUE_RE = re.compile(r"unique\s*(?:key|index)?\s*(?:[`\"\[]?\w+[`\"\]]?\s*)?\(([^)]*)\)", re.I)
+INLINE_REFERENCES_RE = re.compile(r"\breferences\s+([^\s(]+)\s*(?:\(([^)]*)\))?", re.I)
+ALTER_ADD_RE = re.compile(r"add\s+", re.I)
+ALTER_CONSTRAINT_RE = re.compile(r"(?:constraint\s+\S+\s+)?(?:primary\s+key|foreign\s+key|unique)", re.I)
+
+# Table body text up to a top-level "," or ")": quoted strings and names,
+# and parentheses nested up to two deep. Anything else (deeper nesting, an
+# unterminated quote) is left to the token scan with BODY_TOKEN_RE.
+QUOTED = r"""'[^']*'|"[^"]*"|`[^`]*`"""
+BALANCED = rf"""(?:[^'"`(),]++|{QUOTED}|\((?:[^'"`()]++|{QUOTED}|\((?:[^'"`()]++|{QUOTED})*+\))*+\))*+"""
+ITEM_RE = re.compile(BALANCED)
+TABLE_BODY_RE = re.compile(rf"\(({BALANCED}(?:,{BALANCED})*+)\)")
+
+# The quoted strings and names (an unterminated one runs to the end) and the
+# punctuation that matters; plain text in between is skipped
+BODY_TOKEN_RE = re.compile(r"""'[^']*'?|"[^"]*"?|`[^`]*`?|[(),]""")
+
+# A column item: its name, then the type and constraints
+COLUMN_RE = re.compile(r"(?:[`\"\[]([^`\"\]]+)[`\"\]]|([\w$]+))\s*(.*)$", re.S)
+CHARACTER_SET_RE = re.compile(r"\bcharacter\s+set\b", re.I)
+TYPE_TOKEN_RE = re.compile(r"\([^)]*\)|\[\]|[^\s(]+")
+TYPE_PAREN_RE = re.compile(r"\s*\(\s*")
+UNIQUE_WORD_RE = re.compile(r"\bunique\b")
+
+# Table items that are neither columns nor constraints we use
+SKIPPED_ITEMS = ("key", "index", "fulltext", "spatial", "check", "exclude", "period", "like")
+
+# What a table item is, after an optional CONSTRAINT name; a column when nothing matches
+ITEM_KIND_RE = re.compile(
+    r"(constraint\s+([`\"\[]?[\w$]+[`\"\]]?)\s+)?"
+    r"(?:(?P<primary>primary\s+key\b)|(?P<foreign>foreign\s+key\b)|(?P<unique>unique\b)|(?P<skipped>(?:%s)(?=\s|$)))?"
+    % "|".join(SKIPPED_ITEMS), re.I
+)
+
+# Words that end a column's type and start its constraints
+COLUMN_KEYWORDS = {
+    "not", "null", "default", "primary", "unique", "references", "check", "constraint", "auto_increment",
+    "autoincrement", "collate", "generated", "comment", "identity", "on", "charset", "as",
+    "storage", "compression", "encode", "distkey", "sortkey"
+}
+
+# A column's type: words and parenthesized parts up to the first constraint keyword
+# (a "(" that is never closed is stepped over)
+TYPE_RE = re.compile(
+    r"(?:\s*(?:\([^)]*\)|\[\]|(?!(?:%s)(?=[\s(]|$))[^\s(]+|\())*" % "|".join(sorted(COLUMN_KEYWORDS)), re.I
+)
+
+
+def iter_statements(chunks, mysql: bool = None):
+    """Yield complete SQL statements from an iterable of text chunks.
+
+    mysql turns on backslash escapes in every string (default: guessed from
+    the first chunk). COPY ... FROM stdin data is skipped. Raises ValueError
+    when the input ends inside a string, quoted name, comment or COPY block,
+    rather than dropping everything after the point where it went wrong.
+    """
+    statement_re = None
+    buffer = ""
+    line = 1
+    in_copy = False
+    for chunk in chunks:
+        if statement_re is None:
+            if mysql is None:
+                mysql = bool(MYSQL_HINT_RE.search(chunk))
+            statement_re = MYSQL_STATEMENT_RE if mysql else STATEMENT_RE
+        buffer = buffer + chunk if buffer else chunk
+        pos = 0
+        while True:
+            if in_copy:
+                end = COPY_END_RE.search(buffer, pos)
+                if end is None:
+                    # Keep only the last, possibly partial, row
+                    pos = max(pos, buffer.rfind("\n") + 1)
+                    break
+                in_copy = False
+                pos = end.end()
+            match = statement_re.match(buffer, pos)
+            if match is None:
+                break
+            statement = buffer[pos:match.end() - 1]
+            yield statement
+            start = LEADING_COMMENTS_RE.match(statement).end()
+            in_copy = bool(COPY_FROM_STDIN_RE.match(statement, start))
+            pos = match.end()
+        line += buffer.count("\n", 0, pos)
+        buffer = buffer[pos:]
+
+    if in_copy:
+        raise ValueError(f"COPY data starting near line {line} has no closing \\. line")
+    if buffer.strip():
+        if statement_re is None or statement_re.match(buffer + ";") is None:
+            line += buffer.count("\n", 0, len(buffer) - len(buffer.lstrip()))
+            raise ValueError(f"Unterminated string, quoted name or comment in the statement starting near line {line}")
+        yield buffer
+
+
+def unquote_identifier(name: str) -> str:
+    """Last part of a possibly schema-qualified, quoted identifier"""
+    parts = IDENTIFIER_PART_RE.findall(name)
+    if not parts:
+        return name.strip()
+    quoted, plain = parts[-1]
+    return quoted or plain
+
+
+def split_columns(text: str) -> list:
+    return [unquote_identifier(c.split()[0]) for c in text.split(",") if c.strip()]
+
+
+def split_items(body: str) -> list:
+    """Split a CREATE TABLE body on top-level commas"""
+    items = []
+    pos = 0
+    while True:
+        end = ITEM_RE.match(body, pos).end()
+        if end < len(body) and body[end] != ",":
+            end = item_end(body, pos)
+        items.append(body[pos:end].strip())
+        if end >= len(body):
+            break
+        pos = end + 1
+    return [item for item in items if item]
+
+
+def item_end(body: str, pos: int) -> int:
+    """Index of the next top-level comma from `pos` (or the end), token by token"""
+    depth = 0
+    for token in BODY_TOKEN_RE.finditer(body, pos):
+        ch = token.group()
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            return token.start()
+    return len(body)
+
+
+def table_body(statement: str, start: int) -> str:
+    """Text between the parenthesis at `start` and its matching close"""
+    match = TABLE_BODY_RE.match(statement, start)
+    if match:
+        return match.group(1)
+    depth = 0
+    for token in BODY_TOKEN_RE.finditer(statement, start):
+        ch = token.group()
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return statement[start + 1:token.start()]
+    return statement[start + 1:]
+
+
+def parse_column(item: str):
+    """Return (attribute dict, inline foreign key or None), or None for a non-column item"""
+    match = COLUMN_RE.match(item)
+    if match is None:
+        return None
+    name = match.group(1) or match.group(2)
+    rest = match.group(3)
+    # Plain substring tests first: most columns need none of the regexes they guard
+    lowered = rest.lower()
+    if "character" in lowered:
+        rest = CHARACTER_SET_RE.sub("charset", rest)
+        lowered = rest.lower()
+
+    # The type runs until the first constraint keyword (parentheses included)
+    pos = TYPE_RE.match(rest).end()
+    sql_type = TYPE_PAREN_RE.sub("(", " ".join(TYPE_TOKEN_RE.findall(rest, 0, pos))).replace(" )", ")").upper() or "TEXT"
+    constraints = lowered[pos:]
+
+    primary_key = "primary key" in constraints
+    attribute = {
+        "name": name,
+        "type": sql_type,
+        "primary_key": primary_key,
+        "nullable": not primary_key and "not null" not in constraints,
+        "unique": "unique" in constraints and bool(UNIQUE_WORD_RE.search(constraints))
+    }
+    reference = INLINE_REFERENCES_RE.search(rest) if "references" in lowered else None
+    foreign_key = None
+    if reference:
+        foreign_key = {"columns": [name], "table": unquote_identifier(reference.group(1)),
+                       "ref_columns": split_columns(reference.group(2) or ""), "name": None}
+    return attribute, foreign_key
+
+
+class DDLImporter:
+    """Builds propose_schema arguments from CREATE/ALTER TABLE statements fed in order"""
+
+    def __init__(self):
+        self.tables = {}
+        self.foreign_keys = []
+        self.statements = 0
+
+    def table(self, name: str):
+        return self.tables.get(name.lower())
+
+    def add_statement(self, statement: str):
+        self.statements += 1
+        start = LEADING_COMMENTS_RE.match(statement).end()
+        if not INTERESTING_RE.match(statement, start):
+            return
+        statement = statement[start:]
+
+        match = CREATE_TABLE_RE.match(statement)
+        if match:
+            self.create_table(unquote_identifier(match.group(1)), table_body(statement, match.end() - 1))
+            return
+        match = CREATE_UNIQUE_INDEX_RE.match(statement)
+        if match:
+            self.add_unique(unquote_identifier(match.group(1)), split_columns(match.group(2)))
+            return
+        match = ALTER_TABLE_RE.match(statement)
+        if match:
+            self.alter_table(unquote_identifier(match.group(1)), match.group(2))
+
+    def create_table(self, name: str, body: str):
+        table = {"name": name, "attributes": {}, "primary_key": [], "unique": []}
+        self.tables[name.lower()] = table
+        for item in split_items(body):
+            self.add_item(table, item)
+
+    def add_item(self, table: dict, item: str):
+        kind = ITEM_KIND_RE.match(item)
+        constraint = kind.group(1)
+        if constraint:
+            item = item[kind.end(1):]
+        if kind.lastgroup == "primary":
+            match = PRIMARY_KEY_RE.match(item)
+            if match:
+                self.set_primary_key(table, split_columns(match.group(1)))
+        elif kind.lastgroup == "foreign":
+            match = FOREIGN_KEY_RE.match(item)
+            if match:
+                self.foreign_keys.append({"child": table["name"], "columns": split_columns(match.group(1)),
+                                          "table": unquote_identifier(match.group(2)),
+                                          "ref_columns": split_columns(match.group(3) or ""),
+                                          "name": unquote_identifier(kind.group(2)) if constraint else None})
+        elif kind.lastgroup == "unique":
+            match = UNIQUE_RE.match(item)
+            if match:
+                self.add_unique(table["name"], split_columns(match.group(1)))
+        elif kind.lastgroup == "skipped":
+            return
+        elif constraint is None:
+            parsed = parse_column(item)
+            if parsed:
+                attribute, foreign_key = parsed
+                table["attributes"][attribute["name"].lower()] = attribute
+                if attribute["primary_key"]:
+                    table["primary_key"] = [attribute["name"]]
+                if foreign_key:
+                    foreign_key["child"] = table["name"]
+                    self.foreign_keys.append(foreign_key)
+
+    def set_primary_key(self, table: dict, columns: list):
+        table["primary_key"] = columns
+        for column in columns:
+            attribute = table["attributes"].get(column.lower())
+            if attribute:
+                attribute["primary_key"] = True
+                attribute["nullable"] = False
+
+    def add_unique(self, table_name: str, columns: list):
+        table = self.table(table_name)
+        if table is None:
+            return
+        table["unique"].append([c.lower() for c in columns])
+        if len(columns) == 1:
+            attribute = table["attributes"].get(columns[0].lower())
+            if attribute:
+                attribute["unique"] = True
+
+    def alter_table(self, name: str, actions: str):
+        table = self.table(name)
+        if table is None:
+            return
+        for action in split_items(actions):
+            add = ALTER_ADD_RE.match(action)
+            if add:
+                action = action[add.end():]
+            if ALTER_CONSTRAINT_RE.match(action):
+                self.add_item(table, action)
+
+    def is_unique(self, table: dict, columns: list) -> bool:
+        """Whether these columns are unique in the table (PK, UNIQUE, or a unique index)"""
+        wanted = sorted(c.lower() for c in columns)
+        if wanted == sorted(c.lower() for c in table["primary_key"]):
+            return True
+        if any(sorted(u) == wanted for u in table["unique"]):
+            return True
+        return len(columns) == 1 and table["attributes"].get(wanted[0], {}).get("unique", False)
+
+    def unique_foreign_keys(self) -> list:
+        """Foreign keys with resolved tables, one per (child, columns, parent).
+
+        A key declared inline and again with ALTER TABLE ... ADD CONSTRAINT is
+        kept once, under the constraint's name.
+        """
+        keys = {}
+        for fk in self.foreign_keys:
+            child = self.table(fk["child"])
+            parent = self.table(fk["table"])
+            if child is None or parent is None:
+                continue
+            key = (child["name"].lower(), tuple(c.lower() for c in fk["columns"]), parent["name"].lower())
+            if key not in keys or (fk["name"] and not keys[key][0]["name"]):
+                keys[key] = (fk, child, parent)
+        return list(keys.values())
+
+    def relationships(self) -> list:
+        """One relationship per foreign key: parent -> child, 1:1 when the FK columns are unique"""
+        relationships = []
+        names = set()
+        for fk, child, parent in self.unique_foreign_keys():
+            name = fk["name"] or f"{child['name']}_{'_'.join(fk['columns'])}_fk"
+            if name in names:
+                name = f"{child['name']}_{name}"
+            names.add(name)
+            relationships.append({
+                "name": name,
+                "from_entity": parent["name"],
+                "to_entity": child["name"],
+                "type": "one-to-one" if self.is_unique(child, fk["columns"]) else "one-to-many"
+            })
+        return relationships
+
+    def schema_args(self, schema_name: str) -> dict:
+        """Arguments for handle_propose_schema"""
+        return {
+            "schema_name": schema_name,
+            "entities": [
+                {"name": table["name"], "attributes": list(table["attributes"].values())}
+                for table in self.tables.values()
+            ],
+            "relationships": self.relationships()
+        }
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE):
+    """Text chunks of a dump file; undecodable bytes are replaced, not fatal"""
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def decode_chunks(byte_chunks):
+    """Text chunks from byte chunks (e.g. an HTTP body), UTF-8 safe across boundaries"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in byte_chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def parse_ddl(chunks, schema_name: str = "ImportedSchema", mysql: bool = None) -> dict:
+    """propose_schema arguments from a stream of DDL text chunks (ValueError on unterminated input)"""
+    importer = DDLImporter()
+    for statement in iter_statements(chunks, mysql):
+        importer.add_statement(statement)
+    return importer.schema_args(schema_name)
+
+
+def import_ddl(chunks, schema_name: str = "ImportedSchema") -> dict:
+    """Parse DDL and load it as the current schema (no LLM involved)"""
+    # An existing database is taken as it is, tables without a primary key included
+    return handle_propose_schema(parse_ddl(chunks, schema_name), check=False)
+
+
+# Usage: python ddl_import.py dump.sql [SchemaName]
+if __name__ == "__main__":
+    path = sys.argv[1]
+    name = sys.argv[2] if len(sys.argv) > 2 else "ImportedSchema"
+    start = time.perf_counter()
+    try:
+        result = import_ddl(read_chunks(path), name)
+    except ValueError as e:
+        sys.exit(f"Could not parse {path}: {e}")
+    elapsed = time.perf_counter() - start
+    print(result.get("message") or result.get("error"))
+    print(f"Imported in {elapsed:.2f}s")
@@ -1,8 +1,13 @@
 from handlers import get_current_schema
+from partition import partition_schema, MAX_CLUSTER_SIZE
+from metrics import timed
 
 # Words that conflict with Mermaid syntax
 RESERVED_WORDS = ["class", "entity", "relationship"]
 
+# Above this many tables, previews switch to one diagram per cluster
+SPLIT_THRESHOLD = 80
+
 
 def safe_name(name: str) -> str:
     """Make entity names safe for Mermaid"""
@@ -11,64 +16,159 @@ def safe_name(name: str) -> str:
     return name
 
 
-def schema_to_mermaid() -> str:
-    """Convert current schema to Mermaid ERD syntax"""
-    
-    schema = get_current_schema()
-    
+def entity_to_mermaid(entity) -> list:
+    """Convert one entity to Mermaid lines"""
+    lines = [f"    {safe_name(entity.name)} {{"]
+    for attr in entity.attributes:
+        # Determine key type
+        key_marker = ""
+        if attr.primary_key:
+            key_marker = "PK"
+        elif attr.unique:
+            key_marker = "UK"
+
+        # Clean up type for display (remove special characters)
+        display_type = attr.type.replace("(", "").replace(")", "").replace(",", "").replace(" ", "")
+
+        if key_marker:
+            lines.append(f"        {display_type} {attr.name} {key_marker}")
+        else:
+            lines.append(f"        {display_type} {attr.name}")
+    lines.append("    }")
+    return lines
+
+
+def relationship_to_mermaid(rel) -> str:
+    """Convert one relationship to a Mermaid line"""
+    from_entity = safe_name(rel.from_entity)
+    to_entity = safe_name(rel.to_entity)
+
+    # Convert relationship type to Mermaid syntax
+    if rel.type == "one-to-one":
+        connector = "||--||"
+    elif rel.type == "one-to-many":
+        connector = "||--o{"
+    elif rel.type == "many-to-one":
+        connector = "}o--||"
+    elif rel.type == "many-to-many":
+        connector = "}o--o{"
+    else:
+        connector = "||--||"
+
+    # Clean relationship name (no spaces)
+    rel_name = rel.name.replace(" ", "_")
+
+    return f"    {from_entity} {connector} {to_entity} : {rel_name}"
+
+
+@timed("render_mermaid")
+def schema_to_mermaid(schema=None) -> str:
+    """Convert a schema (default: current schema) to Mermaid ERD syntax"""
+
+    if schema is None:
+        schema = get_current_schema()
+
     if schema is None:
         return "No schema to display."
-    
+
     lines = ["erDiagram"]
-    
+
     # Add entities with their attributes
     for entity in schema.entities:
-        entity_name = safe_name(entity.name)
-        lines.append(f"    {entity_name} {{")
-        for attr in entity.attributes:
-            # Determine key type
-            key_marker = ""
-            if attr.primary_key:
-                key_marker = "PK"
-            elif attr.unique:
-                key_marker = "UK"
-            
-            # Clean up type for display (remove special characters)
-            display_type = attr.type.replace("(", "").replace(")", "").replace(",", "").replace(" ", "")
-            
-            if key_marker:
-                lines.append(f"        {display_type} {attr.name} {key_marker}")
-            else:
-                lines.append(f"        {display_type} {attr.name}")
-        lines.append("    }")
-    
+        lines.extend(entity_to_mermaid(entity))
+
     lines.append("")
-    
+
     # Add relationships
     for rel in schema.relationships:
-        from_entity = safe_name(rel.from_entity)
-        to_entity = safe_name(rel.to_entity)
-        
-        # Convert relationship type to Mermaid syntax
-        if rel.type == "one-to-one":
-            connector = "||--||"
-        elif rel.type == "one-to-many":
-            connector = "||--o{"
-        elif rel.type == "many-to-one":
-            connector = "}o--||"
-        elif rel.type == "many-to-many":
-            connector = "}o--o{"
-        else:
-            connector = "||--||"
-        
-        # Clean relationship name (no spaces)
-        rel_name = rel.name.replace(" ", "_")
-        
-        lines.append(f"    {from_entity} {connector} {to_entity} : {rel_name}")
-    
+        lines.append(relationship_to_mermaid(rel))
+
     return "\n".join(lines)
 
 
+def cluster_label(index: int, names: list) -> str:
+    """Name a cluster after its first table"""
+    return f"Group{index + 1}_{safe_name(names[0])}"
+
+
+@timed("render_mermaid_parts")
+def schema_to_mermaid_parts(schema=None, max_tables: int = MAX_CLUSTER_SIZE) -> dict:
+    """Split a large schema into one bounded Mermaid diagram per cluster.
+
+    Returns {"overview": str, "clusters": [{"name", "entities", "mermaid"}]}.
+    Relationships that leave a cluster are kept in both diagrams, with the
+    foreign table drawn as a bare stub box and a comment naming its cluster.
+    """
+    if schema is None:
+        schema = get_current_schema()
+
+    if schema is None:
+        return {"overview": "No schema to display.", "clusters": []}
+
+    clusters = partition_schema(schema, max_tables)
+    cluster_of = {}
+    for i, names in enumerate(clusters):
+        for name in names:
+            cluster_of[name] = i
+
+    entities_by_name = {e.name: e for e in schema.entities}
+    rels_by_cluster = [[] for _ in clusters]
+    cross_links = {}
+
+    for rel in schema.relationships:
+        from_cluster = cluster_of.get(rel.from_entity)
+        to_cluster = cluster_of.get(rel.to_entity)
+        if from_cluster is not None:
+            rels_by_cluster[from_cluster].append(rel)
+        if to_cluster is not None and to_cluster != from_cluster:
+            rels_by_cluster[to_cluster].append(rel)
+        if from_cluster is not None and to_cluster is not None and from_cluster != to_cluster:
+            key = (min(from_cluster, to_cluster), max(from_cluster, to_cluster))
+            cross_links[key] = cross_links.get(key, 0) + 1
+
+    parts = []
+    for i, names in enumerate(clusters):
+        lines = ["erDiagram"]
+        for name in names:
+            lines.extend(entity_to_mermaid(entities_by_name[name]))
+
+        # Stubs for tables that live in another cluster
+        local = set(names)
+        stubs = {}
+        for rel in rels_by_cluster[i]:
+            for other in (rel.from_entity, rel.to_entity):
+                if other not in local:
+                    stubs[other] = True
+        for stub in stubs:
+            home = cluster_of.get(stub)
+            if home is not None:
+                lines.append(f"    %% {stub} is defined in {cluster_label(home, clusters[home])}")
+            # A bare entity name: an empty box, the columns are drawn in its own cluster
+            lines.append(f"    {safe_name(stub)}")
+
+        lines.append("")
+        for rel in rels_by_cluster[i]:
+            lines.append(relationship_to_mermaid(rel))
+
+        parts.append({
+            "name": cluster_label(i, names),
+            "entities": names,
+            "mermaid": "\n".join(lines)
+        })
+
+    # Overview: one box per cluster, edges labelled with the number of links
+    lines = ["erDiagram"]
+    for part in parts:
+        lines.append(f"    {part['name']} {{")
+        lines.append(f"        int tables \"{len(part['entities'])}\"")
+        lines.append("    }")
+    lines.append("")
+    for (a, b), count in cross_links.items():
+        lines.append(f"    {parts[a]['name']} }}o--o{{ {parts[b]['name']} : {count}_links")
+
+    return {"overview": "\n".join(lines), "clusters": parts}
+
+
 def print_diagram():
     """Print the Mermaid diagram to console"""
     print("\n" + "=" * 50)
@@ -76,4 +176,4 @@ def print_diagram():
     print("=" * 50)
     print("\nCopy this to https://mermaid.live to view:\n")
     print(schema_to_mermaid())
-    print("\n" + "=" * 50)
\ No newline at end of file
+    print("\n" + "=" * 50)
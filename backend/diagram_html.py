@@ -1,4 +1,6 @@
 from handlers import get_current_schema
+from routing import route_relationships
+from metrics import span, timed
 
 # Dark theme color schemes with orange accent
 COLORS = [
@@ -35,14 +37,33 @@ def get_entity_positions(entities: list) -> dict:
     return positions
 
 
-def generate_entity_svg(entity, position: dict, index: int) -> str:
-    """Generate SVG for a single entity (draggable)"""
+def entity_height(entity) -> int:
+    """Height of an entity box in the diagram"""
+    return 54 + len(entity.attributes) * 32
+
+
+def index_badge(marks: dict, box_width: int) -> str:
+    """Header badge counting the recommended index columns, with every reason as its tooltip"""
+    if not marks:
+        return ""
+    lines = "&#10;".join(f"{column}: {'; '.join(reasons)}" for column, reasons in marks.items())
+    return f'''<text x="{box_width - 14}" y="30" text-anchor="end" font-size="11" fill="#ffffff" opacity="0.85"
+              font-family="Inter, system-ui, sans-serif">⚡{len(marks)}<title>Recommended indexes&#10;{lines}</title></text>'''
+
+
+def generate_entity_svg(entity, position: dict, index: int, marks: dict = None) -> str:
+    """Generate SVG for a single entity (draggable).
+
+    marks ({lower-cased column: reasons}, see index_advisor.overlay) flags
+    the recommended index columns; foreign key columns that only exist in
+    the DDL are counted in the header badge.
+    """
+    marks = marks or {}
     x = position["x"]
     y = position["y"]
     color = position["color"]
     
-    attr_count = len(entity.attributes)
-    box_height = 54 + attr_count * 32
+    box_height = entity_height(entity)
     box_width = 240
     header_height = 48
     
@@ -67,6 +88,8 @@ def generate_entity_svg(entity, position: dict, index: int) -> str:
               text-anchor="middle" fill="{color['text']}" 
               font-weight="700" font-size="15" font-family="Inter, system-ui, sans-serif">{entity.name}</text>
         
+        {index_badge(marks, box_width)}
+
         <!-- Divider line -->
         <line x1="0" y1="{header_height}" x2="{box_width}" y2="{header_height}" 
               stroke="{color['bg']}" stroke-width="1" opacity="0.3"/>
@@ -79,6 +102,9 @@ def generate_entity_svg(entity, position: dict, index: int) -> str:
             key_icon = f'''<text x="16" y="{attr_y}" font-size="12" fill="#ff6b2c">🔑</text>'''
         elif attr.unique:
             key_icon = f'''<text x="16" y="{attr_y}" font-size="12" fill="#8b5cf6">◆</text>'''
+        elif attr.name.lower() in marks:
+            reasons = "&#10;".join(marks[attr.name.lower()])
+            key_icon = f'''<text x="15" y="{attr_y}" font-size="12" fill="#f59e0b">⚡<title>{reasons}</title></text>'''
         else:
             key_icon = f'''<circle cx="20" cy="{attr_y - 4}" r="4" fill="{color['bg']}" opacity="0.6"/>'''
         
@@ -93,33 +119,22 @@ def generate_entity_svg(entity, position: dict, index: int) -> str:
     return svg, box_width, box_height
 
 
-def generate_relationship_svg(rel, positions: dict, entity_heights: dict) -> str:
-    """Generate SVG for a relationship line"""
-    from_pos = positions.get(rel.from_entity)
-    to_pos = positions.get(rel.to_entity)
-    
-    if not from_pos or not to_pos:
+def generate_relationship_svg(rel, route: dict) -> str:
+    """Generate SVG for a routed relationship line"""
+    if not route:
         return ""
     
-    box_width = 240
-    
-    from_x = from_pos["x"] + box_width / 2
-    from_y = from_pos["y"] + entity_heights.get(rel.from_entity, 100)
-    
-    to_x = to_pos["x"] + box_width / 2
-    to_y = to_pos["y"]
+    points = route["points"]
+    label_x, label_y = route["label"]
     
-    if abs(from_pos["y"] - to_pos["y"]) < 50:
-        if from_pos["x"] < to_pos["x"]:
-            from_x = from_pos["x"] + box_width
-            to_x = to_pos["x"]
-        else:
-            from_x = from_pos["x"]
-            to_x = to_pos["x"] + box_width
-        from_y = from_pos["y"] + entity_heights.get(rel.from_entity, 100) / 2
-        to_y = to_pos["y"] + entity_heights.get(rel.to_entity, 100) / 2
+    # Cardinality badges sit 20px out along the first and last segment
+    def badge(a, b):
+        dx = (b[0] > a[0]) - (b[0] < a[0])
+        dy = (b[1] > a[1]) - (b[1] < a[1])
+        return a[0] + dx * 20, a[1] + dy * 20
     
-    mid_y = (from_y + to_y) / 2
+    from_cx, from_cy = badge(points[0], points[1])
+    to_cx, to_cy = badge(points[-1], points[-2])
     
     if rel.type == "one-to-one":
         from_symbol, to_symbol = "1", "1"
@@ -131,54 +146,72 @@ def generate_relationship_svg(rel, positions: dict, entity_heights: dict) -> str
         from_symbol, to_symbol = "∞", "∞"
     
     color = "#ff6b2c"
+    path = "M " + " L ".join(f"{x} {y}" for x, y in points)
     
     svg = f'''
     <g class="relationship" data-from="{rel.from_entity}" data-to="{rel.to_entity}">
         <!-- Connection line -->
-        <path class="rel-path" d="M {from_x} {from_y} C {from_x} {mid_y}, {to_x} {mid_y}, {to_x} {to_y}" 
+        <path class="rel-path" d="{path}" 
               stroke="{color}" stroke-width="2" fill="none" 
               stroke-dasharray="6,4" opacity="0.7"/>
         
         <!-- Relationship label -->
-        <rect x="{(from_x + to_x) / 2 - 45}" y="{mid_y - 14}" 
+        <rect x="{label_x - 45}" y="{label_y - 14}" 
               width="90" height="28" rx="14" fill="#1a1a25" stroke="{color}" stroke-width="1"/>
-        <text x="{(from_x + to_x) / 2}" y="{mid_y + 5}" 
+        <text x="{label_x}" y="{label_y + 5}" 
               text-anchor="middle" font-size="11" fill="{color}" font-weight="600" 
               font-family="Inter, system-ui, sans-serif">{rel.name}</text>
         
         <!-- Cardinality symbols -->
-        <circle cx="{from_x}" cy="{from_y + 20}" r="14" fill="#1a1a25" stroke="{color}" stroke-width="1"/>
-        <text x="{from_x}" y="{from_y + 25}" text-anchor="middle" 
+        <circle cx="{from_cx}" cy="{from_cy}" r="14" fill="#1a1a25" stroke="{color}" stroke-width="1"/>
+        <text x="{from_cx}" y="{from_cy + 5}" text-anchor="middle" 
               font-size="13" fill="{color}" font-weight="600">{from_symbol}</text>
         
-        <circle cx="{to_x}" cy="{to_y - 20}" r="14" fill="#1a1a25" stroke="{color}" stroke-width="1"/>
-        <text x="{to_x}" y="{to_y - 15}" text-anchor="middle" 
+        <circle cx="{to_cx}" cy="{to_cy}" r="14" fill="#1a1a25" stroke="{color}" stroke-width="1"/>
+        <text x="{to_cx}" y="{to_cy + 5}" text-anchor="middle" 
               font-size="13" fill="{color}" font-weight="600">{to_symbol}</text>
     </g>
     '''
     return svg
 
 
-def schema_to_interactive_html() -> str:
-    """Convert current schema to interactive HTML with zoom/pan and draggable entities"""
-    schema = get_current_schema()
+@timed("render_html")
+def schema_to_interactive_html(schema=None, saved_positions=None, indexes=None) -> str:
+    """Convert a schema (default: current schema) to interactive HTML with zoom/pan and draggable entities.
+
+    saved_positions ({name: {"x", "y"}}) overrides the default grid layout.
+    indexes (index_advisor.overlay output) marks the recommended index columns.
+    """
+    if schema is None:
+        schema = get_current_schema()
     
     if schema is None:
         return "<p>No schema to display.</p>"
     
-    positions = get_entity_positions(schema.entities)
+    if saved_positions is None:
+        positions = get_entity_positions(schema.entities)
+    else:
+        positions = {
+            entity.name: {**saved_positions[entity.name], "color": COLORS[i % len(COLORS)]}
+            for i, entity in enumerate(schema.entities)
+        }
     
     entity_svgs = []
     entity_heights = {}
     
     for i, entity in enumerate(schema.entities):
-        svg, width, height = generate_entity_svg(entity, positions[entity.name], i)
+        marks = indexes.get(entity.name) if indexes else None
+        svg, width, height = generate_entity_svg(entity, positions[entity.name], i, marks)
         entity_svgs.append(svg)
         entity_heights[entity.name] = height
     
+    # Orthogonal routes around the other entities, labels kept apart
+    with span("route_edges"):
+        routes = route_relationships(schema.relationships, positions, entity_heights)
+    
     relationship_svgs = []
-    for rel in schema.relationships:
-        svg = generate_relationship_svg(rel, positions, entity_heights)
+    for rel, route in zip(schema.relationships, routes):
+        svg = generate_relationship_svg(rel, route)
         relationship_svgs.append(svg)
     
     # Much larger canvas for more room to move entities
@@ -488,7 +521,7 @@ def schema_to_interactive_html() -> str:
                     entityPositions[name].y = newY;
                     
                     draggedEntity.setAttribute('transform', `translate(${{newX}}, ${{newY}})`);
-                    updateRelationships();
+                    updateRelationships(name);
                     return;
                 }}
                 
@@ -503,6 +536,13 @@ def schema_to_interactive_html() -> str:
                 if (isDraggingEntity && draggedEntity) {{
                     draggedEntity.classList.remove('dragging');
                     container.classList.remove('dragging-entity');
+                    
+                    // Let the embedding page save the new position
+                    const name = draggedEntity.dataset.entity;
+                    window.parent.postMessage({{
+                        type: 'schemaforge:layout',
+                        positions: {{ [name]: entityPositions[name] }}
+                    }}, '*');
                 }}
                 isDraggingEntity = false;
                 draggedEntity = null;
@@ -510,11 +550,15 @@ def schema_to_interactive_html() -> str:
                 container.style.cursor = 'grab';
             }});
             
-            function updateRelationships() {{
+            function updateRelationships(movedName) {{
+                // Only edges touching the dragged entity are re-routed (as a simple
+                // orthogonal elbow); the server-side routes of the rest stay put
                 document.querySelectorAll('.relationship').forEach(rel => {{
                     const fromName = rel.dataset.from;
                     const toName = rel.dataset.to;
                     
+                    if (movedName && fromName !== movedName && toName !== movedName) return;
+                    
                     const fromPos = entityPositions[fromName];
                     const toPos = entityPositions[toName];
                     
@@ -527,58 +571,71 @@ def schema_to_interactive_html() -> str:
                     const fromHeight = fromEntity ? fromEntity.getBBox().height : 150;
                     const toHeight = toEntity ? toEntity.getBBox().height : 150;
                     
-                    let fromX = fromPos.x + boxWidth / 2;
-                    let fromY = fromPos.y + fromHeight;
-                    let toX = toPos.x + boxWidth / 2;
-                    let toY = toPos.y;
+                    let points;
+                    let fromDir, toDir;
                     
-                    if (Math.abs(fromPos.y - toPos.y) < 50) {{
-                        if (fromPos.x < toPos.x) {{
-                            fromX = fromPos.x + boxWidth;
-                            toX = toPos.x;
-                        }} else {{
-                            fromX = fromPos.x;
-                            toX = toPos.x + boxWidth;
-                        }}
-                        fromY = fromPos.y + fromHeight / 2;
-                        toY = toPos.y + toHeight / 2;
+                    if (fromPos.y + fromHeight < toPos.y || toPos.y + toHeight < fromPos.y) {{
+                        // Vertically separated: leave bottom/top, elbow at mid height
+                        const down = fromPos.y < toPos.y;
+                        const fromX = fromPos.x + boxWidth / 2;
+                        const toX = toPos.x + boxWidth / 2;
+                        const fromY = down ? fromPos.y + fromHeight : fromPos.y;
+                        const toY = down ? toPos.y : toPos.y + toHeight;
+                        const midY = (fromY + toY) / 2;
+                        points = [[fromX, fromY], [fromX, midY], [toX, midY], [toX, toY]];
+                        fromDir = [0, down ? 1 : -1];
+                        toDir = [0, down ? -1 : 1];
+                    }} else {{
+                        // Side by side: leave right/left, elbow at mid width
+                        const right = fromPos.x < toPos.x;
+                        const fromX = right ? fromPos.x + boxWidth : fromPos.x;
+                        const toX = right ? toPos.x : toPos.x + boxWidth;
+                        const fromY = fromPos.y + fromHeight / 2;
+                        const toY = toPos.y + toHeight / 2;
+                        const midX = (fromX + toX) / 2;
+                        points = [[fromX, fromY], [midX, fromY], [midX, toY], [toX, toY]];
+                        fromDir = [right ? 1 : -1, 0];
+                        toDir = [right ? -1 : 1, 0];
                     }}
                     
-                    const midY = (fromY + toY) / 2;
-                    
                     const path = rel.querySelector('.rel-path');
                     if (path) {{
-                        path.setAttribute('d', `M ${{fromX}} ${{fromY}} C ${{fromX}} ${{midY}}, ${{toX}} ${{midY}}, ${{toX}} ${{toY}}`);
+                        path.setAttribute('d', 'M ' + points.map(p => `${{p[0]}} ${{p[1]}}`).join(' L '));
                     }}
                     
+                    const labelX = (points[1][0] + points[2][0]) / 2;
+                    const labelY = (points[1][1] + points[2][1]) / 2;
+                    const [fromX, fromY] = points[0];
+                    const [toX, toY] = points[3];
+                    
                     // Update label position
                     const rects = rel.querySelectorAll('rect');
                     const texts = rel.querySelectorAll('text');
                     
                     if (rects.length >= 1) {{
-                        rects[0].setAttribute('x', (fromX + toX) / 2 - 45);
-                        rects[0].setAttribute('y', midY - 14);
+                        rects[0].setAttribute('x', labelX - 45);
+                        rects[0].setAttribute('y', labelY - 14);
                     }}
                     
                     if (texts.length >= 1) {{
-                        texts[0].setAttribute('x', (fromX + toX) / 2);
-                        texts[0].setAttribute('y', midY + 5);
+                        texts[0].setAttribute('x', labelX);
+                        texts[0].setAttribute('y', labelY + 5);
                     }}
                     
                     // Update cardinality circles
                     const circles = rel.querySelectorAll('circle');
                     if (circles.length >= 2) {{
-                        circles[0].setAttribute('cx', fromX);
-                        circles[0].setAttribute('cy', fromY + 20);
-                        circles[1].setAttribute('cx', toX);
-                        circles[1].setAttribute('cy', toY - 20);
+                        circles[0].setAttribute('cx', fromX + fromDir[0] * 20);
+                        circles[0].setAttribute('cy', fromY + fromDir[1] * 20);
+                        circles[1].setAttribute('cx', toX + toDir[0] * 20);
+                        circles[1].setAttribute('cy', toY + toDir[1] * 20);
                     }}
                     
                     if (texts.length >= 3) {{
-                        texts[1].setAttribute('x', fromX);
-                        texts[1].setAttribute('y', fromY + 25);
-                        texts[2].setAttribute('x', toX);
-                        texts[2].setAttribute('y', toY - 15);
+                        texts[1].setAttribute('x', fromX + fromDir[0] * 20);
+                        texts[1].setAttribute('y', fromY + fromDir[1] * 20 + 5);
+                        texts[2].setAttribute('x', toX + toDir[0] * 20);
+                        texts[2].setAttribute('y', toY + toDir[1] * 20 + 5);
                     }}
                 }});
             }}
@@ -0,0 +1,148 @@
+import os
+import re
+
+import metrics
+from fk_inference import relationship_name
+
+# On by default: simple edits are applied locally instead of asking the LLM
+FAST_PATH_ENABLED = os.getenv("FAST_PATH", "1") == "1"
+
+# SQL types accepted in "add <column> <type> to <table>"
+TYPE_PATTERN = r"(?:int|integer|bigint|smallint|text|date|datetime|timestamp|time|boolean|bool|float|double|uuid|json|blob|varchar\s*\(\s*\d+\s*\)|char\s*\(\s*\d+\s*\)|decimal\s*\(\s*\d+\s*,\s*\d+\s*\)|decimal|numeric)"
+
+TYPE_ALIASES = {"INTEGER": "INT", "BOOL": "BOOLEAN"}
+
+FINALIZE_RE = re.compile(
+    r"^(?:(?:ok|okay|great|perfect|looks good|that'?s good|all good)[,.! ]+)?"
+    r"(?:finali[sz]e|finish)(?: (?:it|the schema|schema|the design))?$",
+    re.IGNORECASE
+)
+
+REMOVE_ENTITY_RE = re.compile(
+    r"^(?:remove|delete|drop) (?:the )?(?:(?:table|entity) )?(\w+)(?: (?:table|entity))?$",
+    re.IGNORECASE
+)
+
+REMOVE_ATTRIBUTE_RE = re.compile(
+    r"^(?:remove|delete|drop) (?:the )?(?:(?:column|attribute|field) )?(\w+)"
+    r"(?: (?:column|attribute|field))? from (?:the )?(\w+)(?: (?:table|entity))?$",
+    re.IGNORECASE
+)
+
+ADD_ATTRIBUTE_RE = re.compile(
+    r"^add (?:an? |the )?(?:(?:column|attribute|field) )?(\w+)(?: (?:column|attribute|field))?"
+    r"(?: as)? (?:an? )?(" + TYPE_PATTERN + r")((?: (?:unique|not null|required|nullable|primary key))*)"
+    r" (?:to|on|in) (?:the )?(\w+)(?: (?:table|entity))?$",
+    re.IGNORECASE
+)
+
+# The one-click options offered for inferred relationships use this form
+CONNECT_RE = re.compile(
+    r"^connect (?:the )?(\w+) (?:to|with|and) (?:the )?(\w+)"
+    r"(?: \((one-to-one|one-to-many|many-to-one|many-to-many)\))?$",
+    re.IGNORECASE
+)
+
+# Hit/miss counts since startup (hit rate = hit / (hit + miss))
+stats = {"hit": 0, "miss": 0}
+
+
+def normalize(text: str) -> str:
+    """Drop politeness and trailing punctuation, collapse spaces.
+
+    Case is kept, so a new column is named as typed (createdAt); the patterns
+    ignore case instead.
+    """
+    text = " ".join(text.strip().split())
+    text = re.sub(r"^(?:please|pls|can you|could you)[, ]+", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"[, ]+(?:please|pls|thanks|thank you)$", "", text, flags=re.IGNORECASE)
+    return text.rstrip(".!? ")
+
+
+def find_entity(schema, name: str):
+    """The entity whose name matches case-insensitively, or None if none or several do"""
+    matches = [e for e in schema.entities if e.name.lower() == name.lower()]
+    return matches[0] if len(matches) == 1 else None
+
+
+def find_attribute(entity, name: str):
+    matches = [a for a in entity.attributes if a.name.lower() == name.lower()]
+    return matches[0] if len(matches) == 1 else None
+
+
+def sql_type(text: str) -> str:
+    text = re.sub(r"\s+", "", text.upper())
+    return TYPE_ALIASES.get(text, text)
+
+
+def parse_command(text: str, schema):
+    """Map a simple edit command to (tool_name, tool_args), or None to ask the LLM.
+
+    Only unambiguous commands against the current schema are recognized: every
+    entity/attribute named must exist (or, for additions, must not exist yet).
+    """
+    if schema is None:
+        return None
+    text = normalize(text)
+
+    if FINALIZE_RE.match(text):
+        return "finalize_schema", {"confirmation_message": f"Schema '{schema.schema_name}' is complete."}
+
+    match = REMOVE_ATTRIBUTE_RE.match(text)
+    if match:
+        entity = find_entity(schema, match.group(2))
+        attribute = find_attribute(entity, match.group(1)) if entity else None
+        if attribute is None:
+            return None
+        return "modify_schema", {"action": "remove_attribute", "target_entity": entity.name,
+                                 "data": {"name": attribute.name}}
+
+    match = REMOVE_ENTITY_RE.match(text)
+    if match:
+        entity = find_entity(schema, match.group(1))
+        if entity is None:
+            return None
+        return "modify_schema", {"action": "remove_entity", "data": {"name": entity.name}}
+
+    match = ADD_ATTRIBUTE_RE.match(text)
+    if match:
+        name, type_text, flags, entity_name = match.groups()
+        flags = flags.lower()
+        entity = find_entity(schema, entity_name)
+        if entity is None or find_attribute(entity, name):
+            return None
+        data = {"name": name, "type": sql_type(type_text)}
+        if "unique" in flags:
+            data["unique"] = True
+        if "not null" in flags or "required" in flags:
+            data["nullable"] = False
+        if "primary key" in flags:
+            data["primary_key"] = True
+            data["nullable"] = False
+        return "modify_schema", {"action": "add_attribute", "target_entity": entity.name, "data": data}
+
+    match = CONNECT_RE.match(text)
+    if match:
+        parent = find_entity(schema, match.group(1))
+        child = find_entity(schema, match.group(2))
+        if parent is None or child is None:
+            return None
+        name = relationship_name({r.name for r in schema.relationships}, parent.name, child.name)
+        return "modify_schema", {"action": "add_relationship", "data": {
+            "name": name, "from_entity": parent.name, "to_entity": child.name,
+            "type": (match.group(3) or "one-to-many").lower()
+        }}
+
+    return None
+
+
+def try_fast_path(text: str, schema):
+    """parse_command when enabled, counting hits and misses"""
+    if not FAST_PATH_ENABLED:
+        return None
+    with metrics.span("fast_path"):
+        command = parse_command(text, schema)
+    result = "hit" if command else "miss"
+    stats[result] += 1
+    metrics.inc("schemaforge_fast_path_total", result=result)
+    return command
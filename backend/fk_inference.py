@@ -0,0 +1,151 @@
+import os
+import re
+
+from ddl_export import snake
+from handlers import get_current_schema, apply_modifications
+
+# Opt-in: apply inferred relationships right away instead of offering them as options
+AUTO_CONNECT = os.getenv("FK_AUTO_CONNECT", "0") == "1"
+
+# Inferred relationships offered as one-click options after a proposal
+MAX_OPTIONS = 3
+
+# user_id, userId, UserID, user_fk, user_ref
+KEY_NAME_RE = re.compile(r"^(.+?)(?:_id|Id|ID|_fk|_ref)$")
+
+# Columns of the same family can reference each other
+TYPE_FAMILIES = {
+    "int": {"INT", "INTEGER", "BIGINT", "SMALLINT", "TINYINT", "MEDIUMINT", "SERIAL", "BIGSERIAL", "SMALLSERIAL", "NUMBER"},
+    "text": {"VARCHAR", "CHAR", "TEXT", "STRING", "NVARCHAR", "CHARACTER VARYING", "CHARACTER", "UUID"},
+}
+
+
+def singular(word: str) -> str:
+    """categories -> category, addresses -> address, users -> user"""
+    if word.endswith("ies") and len(word) > 3:
+        return word[:-3] + "y"
+    if re.search(r"(?:ss|x|ch|sh)es$", word):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def name_keys(name: str) -> set:
+    """Spellings a reference to this name may use: order_item, orderitem, and their singulars"""
+    base = snake(name)
+    keys = {base, base.replace("_", "")}
+    keys |= {singular(k) for k in keys}
+    return keys
+
+
+def type_family(sql_type: str) -> str:
+    base = re.sub(r"\s*\(.*$", "", sql_type.strip().upper())
+    base = re.sub(r"\s+(?:UNSIGNED|AUTO_INCREMENT|AUTOINCREMENT)\b", "", base)
+    for family, members in TYPE_FAMILIES.items():
+        if base in members:
+            return family
+    return base
+
+
+def build_index(schema) -> dict:
+    """Every spelling of every entity name -> entity, or None when two entities share it"""
+    index = {}
+    for entity in schema.entities:
+        for key in name_keys(entity.name):
+            index[key] = None if key in index and index[key] is not entity else entity
+    return index
+
+
+def relationship_name(names: set, parent: str, child: str) -> str:
+    name = f"{snake(parent)}_{snake(child)}"
+    candidate, n = name, 2
+    while candidate in names:
+        candidate, n = f"{name}_{n}", n + 1
+    names.add(candidate)
+    return candidate
+
+
+def suggest_relationships(schema=None) -> list:
+    """Relationships that would connect orphan entities, inferred from names and types.
+
+    An attribute like user_id whose type fits the primary key of a User
+    entity becomes User -> owner (one-to-one if the attribute is unique or the
+    owner's whole key). An orphan named like two entities (student_course)
+    without such attributes is taken for their junction table. One pass over
+    the attributes with a precomputed name index, so linear in schema size.
+    """
+    if schema is None:
+        schema = get_current_schema()
+    if schema is None:
+        return []
+
+    connected = set()
+    linked = set()
+    for rel in schema.relationships:
+        connected.update((rel.from_entity, rel.to_entity))
+        linked.add(frozenset((rel.from_entity, rel.to_entity)))
+    orphans = {e.name for e in schema.entities} - connected
+    if not orphans:
+        return []
+
+    index = build_index(schema)
+    names = {r.name for r in schema.relationships}
+    primary_keys = {e.name: [a for a in e.attributes if a.primary_key] for e in schema.entities}
+    suggestions = []
+
+    def suggest(parent: str, child: str, rel_type: str, reason: str):
+        pair = frozenset((parent, child))
+        if pair in linked:
+            return
+        linked.add(pair)
+        suggestions.append({"name": relationship_name(names, parent, child), "from_entity": parent,
+                            "to_entity": child, "type": rel_type, "reason": reason})
+
+    for child in schema.entities:
+        found = False
+        for attr in child.attributes:
+            match = KEY_NAME_RE.match(attr.name)
+            parent = index.get(snake(match.group(1))) if match else None
+            if parent is None or parent is child or (child.name not in orphans and parent.name not in orphans):
+                continue
+            keys = primary_keys[parent.name]
+            if len(keys) != 1 or type_family(keys[0].type) != type_family(attr.type):
+                continue
+            own_key = [a.name for a in primary_keys[child.name]] == [attr.name]
+            rel_type = "one-to-one" if attr.unique or own_key else "one-to-many"
+            suggest(parent.name, child.name, rel_type, f"{child.name}.{attr.name} matches {parent.name}.{keys[0].name}")
+            found = True
+
+        # student_course / StudentCourse with no key columns of its own: a junction of two entities
+        if not found and child.name in orphans:
+            parts = snake(child.name).split("_")
+            for i in range(1, len(parts)):
+                left = index.get("_".join(parts[:i]))
+                right = index.get("_".join(parts[i:]))
+                if left and right and child not in (left, right):
+                    reason = f"{child.name} looks like a junction of {left.name} and {right.name}"
+                    suggest(left.name, child.name, "one-to-many", reason)
+                    suggest(right.name, child.name, "one-to-many", reason)
+                    break
+    return suggestions
+
+
+def option_text(suggestion: dict) -> str:
+    """A one-click option; fast_path applies it without the LLM"""
+    return f"Connect {suggestion['from_entity']} to {suggestion['to_entity']} ({suggestion['type']})"
+
+
+def connect_orphans() -> tuple:
+    """After a proposal: (messages for links applied, suggestions to offer as options)"""
+    suggestions = suggest_relationships()
+    if not suggestions or not AUTO_CONNECT:
+        return [], suggestions
+    operations = [
+        {"action": "add_relationship", "data": {k: s[k] for k in ("name", "from_entity", "to_entity", "type")}}
+        for s in suggestions
+    ]
+    result = apply_modifications(operations)
+    if not result["success"]:
+        return [], suggestions
+    return [f"{m} ({s['reason']})" for m, s in zip(result["messages"], suggestions)], []
@@ -0,0 +1,83 @@
+from models import Schema
+from handlers import get_current_schema, get_schema_version
+
+# Adjacency index for the current schema, rebuilt only when the version changes
+_index = {"version": None, "schema_id": None, "neighbours": {}, "relationships": {}, "entities": {}}
+
+
+def build_index(schema) -> dict:
+    """Index entities and relationships by entity name"""
+    entities = {e.name: e for e in schema.entities}
+    # Dicts as ordered sets, so the focus view keeps a stable order
+    neighbours = {name: {} for name in entities}
+    relationships = {name: [] for name in entities}
+
+    for rel in schema.relationships:
+        for name in (rel.from_entity, rel.to_entity):
+            if name in relationships:
+                relationships[name].append(rel)
+        if rel.from_entity in neighbours and rel.to_entity in neighbours:
+            neighbours[rel.from_entity][rel.to_entity] = True
+            neighbours[rel.to_entity][rel.from_entity] = True
+
+    return {"neighbours": neighbours, "relationships": relationships, "entities": entities}
+
+
+def get_index(schema=None) -> dict:
+    """Return the adjacency index, rebuilding it if the schema changed"""
+    if schema is not None and schema is not get_current_schema():
+        return build_index(schema)
+
+    schema = get_current_schema()
+    version = get_schema_version()
+    if _index["version"] != version or _index["schema_id"] != id(schema):
+        _index.update(build_index(schema))
+        _index["version"] = version
+        _index["schema_id"] = id(schema)
+    return _index
+
+
+def focus_schema(entity_name: str, hops: int = 1, schema=None):
+    """Return the sub-schema within `hops` relationships of an entity.
+
+    Returns None if there is no schema or the entity does not exist. Only
+    relationships between two entities of the neighbourhood are kept.
+    """
+    if schema is None:
+        schema = get_current_schema()
+    if schema is None:
+        return None
+
+    index = get_index(schema)
+    if entity_name not in index["entities"]:
+        return None
+
+    # Breadth-first search, one ring at a time
+    selected = {entity_name: 0}
+    frontier = [entity_name]
+    for depth in range(1, hops + 1):
+        next_frontier = []
+        for name in frontier:
+            for neighbour in index["neighbours"][name]:
+                if neighbour not in selected:
+                    selected[neighbour] = depth
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+        if not frontier:
+            break
+
+    relationships = []
+    seen = set()
+    for name in selected:
+        for rel in index["relationships"][name]:
+            if id(rel) in seen:
+                continue
+            if rel.from_entity in selected and rel.to_entity in selected:
+                seen.add(id(rel))
+                relationships.append(rel)
+
+    return Schema(
+        schema_name=schema.schema_name,
+        entities=[index["entities"][name] for name in selected],
+        relationships=relationships
+    )
@@ -1,56 +1,51 @@
 import json
-from models import Schema, Entity, Attribute, Relationship
+from models import Schema
+from metrics import span, timed
+from validation import validate_propose, validate_modify
+from compact_schema import CompactSchema
+from schema_check import (
+    SCHEMA_GATE, CHECKED_ACTIONS, check_schema, check_entities, affected_entities, new_problems, format_problems
+)
 
 # This will hold the current schema during conversation
 current_schema = None
 
+# Bumped on every change to current_schema, so caches know when to rebuild
+schema_version = 0
 
-def handle_propose_schema(args: dict) -> dict:
-    """Create a new schema from LLM output"""
+
+def bump_schema_version():
+    """Mark the current schema as changed"""
+    global schema_version
+    schema_version += 1
+
+
+@timed("handle_propose_schema")
+def handle_propose_schema(args: dict, check: bool = True) -> dict:
+    """Create a new schema from LLM output (check=False skips the SQLite gate, e.g. for imports)"""
     global current_schema
     
-    try:
-        # Build entities
-        entities = []
-        for e in args["entities"]:
-            attributes = [
-                Attribute(
-                    name=a["name"],
-                    type=a["type"],
-                    primary_key=a.get("primary_key", False),
-                    nullable=a.get("nullable", True),
-                    unique=a.get("unique", False)
-                )
-                for a in e["attributes"]
-            ]
-            entities.append(Entity(name=e["name"], attributes=attributes))
-        
-        # Build relationships
-        relationships = [
-            Relationship(
-                name=r["name"],
-                from_entity=r["from_entity"],
-                to_entity=r["to_entity"],
-                type=r["type"]
-            )
-            for r in args.get("relationships", [])
-        ]
-        
-        # Create schema
-        current_schema = Schema(
-            schema_name=args["schema_name"],
-            entities=entities,
-            relationships=relationships
-        )
-        
-        return {
-            "success": True,
-            "message": f"Schema '{args['schema_name']}' created with {len(entities)} entities and {len(relationships)} relationships.",
-            "schema": current_schema.model_dump()
-        }
-    
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    # Validate the whole payload in one pass
+    with span("validation"):
+        schema, error = validate_propose(args)
+    if error:
+        return {"success": False, "error": error}
+    
+    # Compile to SQLite DDL and execute it; structural mistakes go back to the caller
+    if check and SCHEMA_GATE:
+        with span("schema_check"):
+            problems = check_schema(schema)
+        if problems:
+            return {"success": False, "error": format_problems(problems), "problems": problems}
+    
+    current_schema = schema
+    bump_schema_version()
+    
+    return {
+        "success": True,
+        "message": f"Schema '{schema.schema_name}' created with {len(schema.entities)} entities and {len(schema.relationships)} relationships.",
+        "schema": current_schema.model_dump()
+    }
 
 
 def handle_ask_clarification(args: dict) -> dict:
@@ -62,6 +57,7 @@ def handle_ask_clarification(args: dict) -> dict:
     }
 
 
+@timed("handle_modify_schema")
 def handle_modify_schema(args: dict) -> dict:
     """Modify the current schema"""
     global current_schema
@@ -69,77 +65,78 @@ def handle_modify_schema(args: dict) -> dict:
     if current_schema is None:
         return {"success": False, "error": "No schema exists yet. Propose a schema first."}
     
-    action = args["action"]
-    data = args["data"]
-    target_entity = args.get("target_entity")
+    op, error = validate_modify(args)
+    if error:
+        return {"success": False, "error": error}
+    if not SCHEMA_GATE or op.action not in CHECKED_ACTIONS:
+        return apply_operation(op)
+    
+    # Check only the entities the operation touches, and only blame it for new problems
+    names = affected_entities(op)
+    with span("schema_check"):
+        before = check_entities(current_schema, names)
+    entities, relationships = list(current_schema.entities), list(current_schema.relationships)
+    attributes = {e.name: list(e.attributes) for e in entities if e.name.lower() in names}
+    
+    result = apply_operation(op)
+    if not result.get("success"):
+        return result
+    with span("schema_check"):
+        problems = new_problems(before, check_entities(current_schema, names))
+    if problems:
+        current_schema.entities, current_schema.relationships = entities, relationships
+        for entity in entities:
+            if entity.name in attributes:
+                entity.attributes = attributes[entity.name]
+        bump_schema_version()
+        return {"success": False, "error": format_problems(problems), "problems": problems}
+    return result
+
+
+def apply_operation(op) -> dict:
+    """Apply one validated modify_schema operation to the current schema"""
+    data = op.data
+    
+    if op.action == "add_entity":
+        current_schema.entities.append(data)
+        bump_schema_version()
+        return {"success": True, "message": f"Added entity '{data.name}'"}
+    
+    elif op.action == "remove_entity":
+        current_schema.entities = [e for e in current_schema.entities if e.name != data.name]
+        # Also remove relationships involving this entity
+        current_schema.relationships = [
+            r for r in current_schema.relationships 
+            if r.from_entity != data.name and r.to_entity != data.name
+        ]
+        bump_schema_version()
+        return {"success": True, "message": f"Removed entity '{data.name}'"}
+    
+    elif op.action == "add_attribute":
+        for entity in current_schema.entities:
+            if entity.name == op.target_entity:
+                entity.attributes.append(data)
+                bump_schema_version()
+                return {"success": True, "message": f"Added attribute '{data.name}' to '{op.target_entity}'"}
+        return {"success": False, "error": f"Entity '{op.target_entity}' not found"}
     
-    try:
-        if action == "add_entity":
-            attributes = [
-                Attribute(
-                    name=a["name"],
-                    type=a["type"],
-                    primary_key=a.get("primary_key", False),
-                    nullable=a.get("nullable", True),
-                    unique=a.get("unique", False)
-                )
-                for a in data["attributes"]
-            ]
-            new_entity = Entity(name=data["name"], attributes=attributes)
-            current_schema.entities.append(new_entity)
-            return {"success": True, "message": f"Added entity '{data['name']}'"}
-        
-        elif action == "remove_entity":
-            entity_name = data["name"]
-            current_schema.entities = [e for e in current_schema.entities if e.name != entity_name]
-            # Also remove relationships involving this entity
-            current_schema.relationships = [
-                r for r in current_schema.relationships 
-                if r.from_entity != entity_name and r.to_entity != entity_name
-            ]
-            return {"success": True, "message": f"Removed entity '{entity_name}'"}
-        
-        elif action == "add_attribute":
-            for entity in current_schema.entities:
-                if entity.name == target_entity:
-                    new_attr = Attribute(
-                        name=data["name"],
-                        type=data["type"],
-                        primary_key=data.get("primary_key", False),
-                        nullable=data.get("nullable", True),
-                        unique=data.get("unique", False)
-                    )
-                    entity.attributes.append(new_attr)
-                    return {"success": True, "message": f"Added attribute '{data['name']}' to '{target_entity}'"}
-            return {"success": False, "error": f"Entity '{target_entity}' not found"}
-        
-        elif action == "remove_attribute":
-            for entity in current_schema.entities:
-                if entity.name == target_entity:
-                    entity.attributes = [a for a in entity.attributes if a.name != data["name"]]
-                    return {"success": True, "message": f"Removed attribute '{data['name']}' from '{target_entity}'"}
-            return {"success": False, "error": f"Entity '{target_entity}' not found"}
-        
-        elif action == "add_relationship":
-            new_rel = Relationship(
-                name=data["name"],
-                from_entity=data["from_entity"],
-                to_entity=data["to_entity"],
-                type=data["type"]
-            )
-            current_schema.relationships.append(new_rel)
-            return {"success": True, "message": f"Added relationship '{data['name']}'"}
-        
-        elif action == "remove_relationship":
-            rel_name = data["name"]
-            current_schema.relationships = [r for r in current_schema.relationships if r.name != rel_name]
-            return {"success": True, "message": f"Removed relationship '{rel_name}'"}
-        
-        else:
-            return {"success": False, "error": f"Unknown action: {action}"}
-    
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    elif op.action == "remove_attribute":
+        for entity in current_schema.entities:
+            if entity.name == op.target_entity:
+                entity.attributes = [a for a in entity.attributes if a.name != data.name]
+                bump_schema_version()
+                return {"success": True, "message": f"Removed attribute '{data.name}' from '{op.target_entity}'"}
+        return {"success": False, "error": f"Entity '{op.target_entity}' not found"}
+    
+    elif op.action == "add_relationship":
+        current_schema.relationships.append(data)
+        bump_schema_version()
+        return {"success": True, "message": f"Added relationship '{data.name}'"}
+    
+    else:
+        current_schema.relationships = [r for r in current_schema.relationships if r.name != data.name]
+        bump_schema_version()
+        return {"success": True, "message": f"Removed relationship '{data.name}'"}
 
 
 def handle_finalize_schema(args: dict) -> dict:
@@ -161,7 +158,95 @@ def get_current_schema():
     return current_schema
 
 
+def get_schema_version() -> int:
+    """Return the version number of the current schema"""
+    return schema_version
+
+
 def reset_schema():
     """Clear the current schema"""
     global current_schema
-    current_schema = None
\ No newline at end of file
+    current_schema = None
+    bump_schema_version()
+
+
+def check_proposal(args: dict):
+    """Return why a propose_schema call would build an inconsistent schema, or None"""
+    entity_names = set()
+    for e in args["entities"]:
+        if e["name"] in entity_names:
+            return f"Entity '{e['name']}' is defined twice"
+        entity_names.add(e["name"])
+    for r in args.get("relationships", []):
+        for end in ("from_entity", "to_entity"):
+            if r[end] not in entity_names:
+                return f"Relationship '{r['name']}' refers to unknown entity '{r[end]}'"
+    return None
+
+
+def check_modification(schema: Schema, args: dict):
+    """Return why a modify_schema call would not apply cleanly, or None"""
+    action = args.get("action")
+    data = args.get("data") or {}
+    target_entity = args.get("target_entity")
+    entity_names = {e.name for e in schema.entities}
+    
+    if action == "add_entity":
+        if data.get("name") in entity_names:
+            return f"Entity '{data.get('name')}' already exists"
+    elif action == "remove_entity":
+        if data.get("name") not in entity_names:
+            return f"Entity '{data.get('name')}' not found"
+    elif action in ("add_attribute", "remove_attribute"):
+        entity = next((e for e in schema.entities if e.name == target_entity), None)
+        if entity is None:
+            return f"Entity '{target_entity}' not found"
+        exists = any(a.name == data.get("name") for a in entity.attributes)
+        if action == "add_attribute" and exists:
+            return f"Attribute '{data.get('name')}' already exists in '{target_entity}'"
+        if action == "remove_attribute" and not exists:
+            return f"Attribute '{data.get('name')}' not found in '{target_entity}'"
+    elif action == "add_relationship":
+        for end in ("from_entity", "to_entity"):
+            if data.get(end) not in entity_names:
+                return f"Entity '{data.get(end)}' not found"
+        if any(r.name == data.get("name") for r in schema.relationships):
+            return f"Relationship '{data.get('name')}' already exists"
+    elif action == "remove_relationship":
+        if not any(r.name == data.get("name") for r in schema.relationships):
+            return f"Relationship '{data.get('name')}' not found"
+    return None
+
+
+def apply_modifications(operations: list, expected_version: int = None) -> dict:
+    """Apply a batch of modify_schema calls all-or-nothing.
+
+    If expected_version is given and the schema has moved on since, nothing is
+    applied. On the first failing operation the schema is rolled back and the
+    result carries its index.
+    """
+    global current_schema
+    
+    if expected_version is not None and expected_version != schema_version:
+        return {"success": False, "conflict": True,
+                "error": f"Schema is at version {schema_version}, not {expected_version}"}
+    if current_schema is None:
+        return {"success": False, "error": "No schema exists yet. Propose a schema first."}
+    
+    # Columnar snapshot: far cheaper than a deep copy, expanded only on rollback
+    snapshot = CompactSchema(current_schema)
+    messages = []
+    for index, args in enumerate(operations):
+        error = check_modification(current_schema, args)
+        if error is None:
+            result = handle_modify_schema(args)
+            error = None if result.get("success") else result.get("error")
+        if error is not None:
+            if messages:
+                # Intermediate versions may be cached, so roll back to a fresh version
+                current_schema = snapshot.to_schema()
+                bump_schema_version()
+            return {"success": False, "index": index, "error": error}
+        messages.append(result["message"])
+    
+    return {"success": True, "messages": messages, "schema_version": schema_version}
@@ -0,0 +1,151 @@
+import re
+
+from models import Schema, AccessPattern
+from ddl_export import plan_tables, snake, quote, MAX_IDENTIFIER
+
+# Declared query shapes; bumping the version invalidates cached DDL
+access_patterns = []
+patterns_version = 0
+
+# Bytes an index entry costs besides its key (tuple header and row pointer)
+ENTRY_OVERHEAD = 16
+
+# Rough key widths in bytes by base type; VARCHAR(n)/CHAR(n) use about half of n, at most 64
+TYPE_WIDTHS = {
+    "BOOLEAN": 1, "BOOL": 1, "TINYINT": 1, "SMALLINT": 2, "SMALLSERIAL": 2, "INT": 4, "INTEGER": 4, "SERIAL": 4,
+    "MEDIUMINT": 4, "DATE": 4, "REAL": 4, "FLOAT": 8, "BIGINT": 8, "BIGSERIAL": 8, "TIMESTAMP": 8, "DATETIME": 8,
+    "TIMESTAMPTZ": 8, "DOUBLE": 8, "DOUBLE PRECISION": 8, "DECIMAL": 8, "NUMERIC": 8, "MONEY": 8, "UUID": 16,
+    "TEXT": 32
+}
+LOW_SELECTIVITY_TYPES = {"BOOLEAN", "BOOL", "BIT"}
+
+
+def set_access_patterns(patterns: list):
+    """Replace the declared access patterns (AccessPattern models or dicts)"""
+    global access_patterns, patterns_version
+    access_patterns = [p if isinstance(p, AccessPattern) else AccessPattern.model_validate(p) for p in patterns]
+    patterns_version += 1
+
+
+def base_type(sql_type: str) -> str:
+    return re.sub(r"\s*\(.*$", "", sql_type.strip().upper())
+
+
+def type_width(sql_type: str) -> int:
+    base = base_type(sql_type)
+    if base in ("VARCHAR", "CHAR", "NVARCHAR", "CHARACTER VARYING"):
+        length = re.search(r"\((\d+)", sql_type)
+        return min(int(length.group(1)) // 2 + 1, 64) if length else 32
+    return TYPE_WIDTHS.get(base, 16)
+
+
+def is_prefix(columns: list, index: list) -> bool:
+    """Whether an index on `index` also serves lookups by `columns`"""
+    return len(columns) <= len(index) and [c.lower() for c in index[:len(columns)]] == [c.lower() for c in columns]
+
+
+def pattern_columns(pattern: AccessPattern, types: dict) -> list:
+    """Key order for a pattern: selective equality columns, then one range or the sort columns"""
+    equals = sorted(pattern.equals, key=lambda c: base_type(types.get(c.lower(), "")) in LOW_SELECTIVITY_TYPES)
+    if pattern.range:
+        return equals + pattern.range[:1]
+    return equals + [c for c in pattern.order_by if c not in equals]
+
+
+def describe(pattern: AccessPattern) -> str:
+    parts = [f"{c} = ?" for c in pattern.equals] + [f"{c} range" for c in pattern.range]
+    text = f"{pattern.entity} where {' and '.join(parts)}" if parts else pattern.entity
+    return text + (f" order by {', '.join(pattern.order_by)}" if pattern.order_by else "")
+
+
+def recommend_for_tables(tables: list, patterns: list = None) -> list:
+    """Secondary indexes for planned tables (see ddl_export.plan_tables).
+
+    Access patterns are served first, so a composite (user_id, status) also
+    covers the plain foreign key lookup on user_id. Every foreign key then
+    needs an index led by its columns: joins from the parent and deletes of
+    a parent row look rows up by it. Primary keys and UNIQUE constraints
+    already are indexes and are never duplicated.
+    """
+    patterns = access_patterns if patterns is None else patterns
+    by_entity = {}
+    for pattern in patterns:
+        by_entity.setdefault(pattern.entity.lower(), []).append(pattern)
+
+    recommendations = []
+    used_names = set()
+    for table in tables:
+        columns = {c["name"].lower(): c for c in table["columns"]}
+        types = {name: c["type"] for name, c in columns.items()}
+        existing = [table["primary_key"]] if table["primary_key"] else []
+        existing += [[c["name"]] for c in table["columns"] if c["unique"]]
+        existing += table["unique"]
+        recommended = []
+
+        def add(key: list, reason: str, where: bool = False):
+            for rec in recommended:
+                if is_prefix(key, rec["columns"]):
+                    rec["reasons"].append(reason)
+                    return
+            if any(is_prefix(key, index) for index in existing):
+                return
+            base = f"idx_{snake(table['name'])}_{'_'.join(snake(c) for c in key)}"[:MAX_IDENTIFIER]
+            name, n = base, 2
+            while name in used_names:
+                name, n = f"{base[:MAX_IDENTIFIER - 4]}_{n}", n + 1
+            used_names.add(name)
+            recommended.append({"name": name, "table": table["name"], "columns": key, "where": where,
+                                "reasons": [reason]})
+
+        for pattern in by_entity.get(table["name"].lower(), []):
+            key = [columns[c.lower()]["name"] for c in pattern_columns(pattern, types) if c.lower() in columns]
+            if key:
+                add(key, f"access pattern: {describe(pattern)}")
+
+        for fk in table["foreign_keys"]:
+            # Rows without a parent never need this lookup, so a nullable key only indexes the rest
+            nullable = all(columns[c.lower()]["nullable"] for c in fk["columns"])
+            add(list(fk["columns"]), f"foreign key to {fk['parent']}: joins and {fk['parent']} deletes look up rows by it",
+                where=nullable)
+
+        # Write amplification: each index adds one B-tree to every INSERT/DELETE;
+        # the table total (table, existing indexes, all recommended) is given once per table
+        before = 1 + len(existing)
+        for rec in recommended:
+            rec["write_cost"] = {
+                "btrees_per_insert": 1,
+                "extra_writes": f"+1 index write per INSERT/DELETE on {table['name']} "
+                                f"and per UPDATE of {', '.join(rec['columns'])}",
+                "bytes_per_row": ENTRY_OVERHEAD + sum(type_width(types.get(c.lower(), "")) for c in rec["columns"]),
+                "table_btrees_per_insert": [before, before + len(recommended)]
+            }
+        recommendations += recommended
+    return recommendations
+
+
+def recommend_indexes(schema: Schema, patterns: list = None) -> list:
+    """Recommended indexes for a schema, FK columns and junction tables included"""
+    tables, _ = plan_tables(schema)
+    return recommend_for_tables(tables, patterns)
+
+
+def index_sql(rec: dict, dialect: str) -> str:
+    """CREATE INDEX for a recommendation; MySQL has no partial indexes, so it indexes every row.
+
+    `where` marks a nullable foreign key: only rows with the key set are indexed.
+    """
+    columns = ", ".join(quote(c, dialect) for c in rec["columns"])
+    sql = f"CREATE INDEX {quote(rec['name'], dialect)} ON {quote(rec['table'], dialect)} ({columns})"
+    if rec["where"] and dialect != "mysql":
+        sql += " WHERE " + " AND ".join(f"{quote(c, dialect)} IS NOT NULL" for c in rec["columns"])
+    return sql + ";\n"
+
+
+def overlay(recommendations: list) -> dict:
+    """{entity name: {lower-cased column: reasons}} for the diagram"""
+    marks = {}
+    for rec in recommendations:
+        columns = marks.setdefault(rec["table"], {})
+        for column in rec["columns"]:
+            columns.setdefault(column.lower(), []).extend(rec["reasons"])
+    return marks
@@ -0,0 +1,147 @@
+from routing import SpatialGrid, BOX_WIDTH, MARGIN
+from diagram_html import get_entity_positions, entity_height
+from focus import get_index
+from handlers import get_schema_version
+
+# Space kept between an entity and the neighbour it is placed next to
+GAP = 80
+START_X = 150
+START_Y = 150
+
+# How many rings of spots to try around a neighbour before giving up on it
+MAX_RINGS = 4
+
+# Saved layouts per session:
+# {"version": int, "positions": {name: {"x", "y"}}, "heights": {name: int}, "grid": SpatialGrid, "bottom": float}
+layouts = {}
+
+
+def new_layout() -> dict:
+    return {"version": None, "positions": {}, "heights": {}, "grid": SpatialGrid(), "bottom": START_Y}
+
+
+def get_layout(session_id: str) -> dict:
+    """Return the saved layout for a session, creating an empty one"""
+    if session_id not in layouts:
+        layouts[session_id] = new_layout()
+    return layouts[session_id]
+
+
+def reset_layout(session_id: str):
+    """Forget every saved position of a session"""
+    layouts.pop(session_id, None)
+
+
+def _box(x: float, y: float, height: int) -> tuple:
+    return (x - MARGIN, y - MARGIN, x + BOX_WIDTH + MARGIN, y + height + MARGIN)
+
+
+def _set_position(layout: dict, name: str, x: float, y: float, height: int):
+    layout["positions"][name] = {"x": x, "y": y}
+    layout["heights"][name] = height
+    layout["grid"].remove(name)
+    layout["grid"].insert(name, _box(x, y, height))
+    layout["bottom"] = max(layout["bottom"], y + height)
+
+
+def _is_free(layout: dict, x: float, y: float, height: int) -> bool:
+    return not layout["grid"].query(_box(x, y, height))
+
+
+def _spot_near(layout: dict, anchor: dict, anchor_height: int, height: int):
+    """First free spot around an anchor: right, below, left, above, then wider rings"""
+    step_x = BOX_WIDTH + GAP
+    for ring in range(1, MAX_RINGS + 1):
+        candidates = [
+            (anchor["x"] + ring * step_x, anchor["y"]),
+            (anchor["x"], anchor["y"] + anchor_height + GAP + (ring - 1) * (height + GAP)),
+            (anchor["x"] - ring * step_x, anchor["y"]),
+            (anchor["x"], anchor["y"] - ring * (height + GAP)),
+            (anchor["x"] + ring * step_x, anchor["y"] + anchor_height + GAP),
+            (anchor["x"] - ring * step_x, anchor["y"] + anchor_height + GAP),
+        ]
+        for x, y in candidates:
+            if x >= 0 and y >= 0 and _is_free(layout, x, y, height):
+                return x, y
+    return None
+
+
+def place_entity(layout: dict, name: str, height: int, neighbours) -> dict:
+    """Place one new entity next to an already placed neighbour.
+
+    Entities without a placed neighbour go on a new row below the layout.
+    """
+    positions = layout["positions"]
+    for neighbour in neighbours:
+        anchor = positions.get(neighbour)
+        if anchor is None:
+            continue
+        spot = _spot_near(layout, anchor, layout["heights"][neighbour], height)
+        if spot:
+            _set_position(layout, name, spot[0], spot[1], height)
+            return positions[name]
+
+    # No room next to a neighbour: start scanning the row under everything
+    y = layout["bottom"] + GAP
+    x = START_X
+    while not _is_free(layout, x, y, height):
+        x += BOX_WIDTH + GAP
+    _set_position(layout, name, x, y, height)
+    return positions[name]
+
+
+def layout_positions(session_id: str, schema) -> dict:
+    """Positions for every entity, keeping saved ones and placing only new ones.
+
+    The first render of a session seeds the store with the default grid so it
+    looks the same as before; later renders never move an existing entity.
+    """
+    layout = get_layout(session_id)
+    positions = layout["positions"]
+
+    # Forget entities removed since the last render so they stop blocking space
+    version = get_schema_version()
+    if layout["version"] != version:
+        names = {e.name for e in schema.entities}
+        for name in [n for n in positions if n not in names]:
+            del positions[name]
+            layout["heights"].pop(name, None)
+            layout["grid"].remove(name)
+
+    if not positions:
+        for name, pos in get_entity_positions(schema.entities).items():
+            positions[name] = {"x": pos["x"], "y": pos["y"]}
+
+    new_entities = []
+    for entity in schema.entities:
+        height = entity_height(entity)
+        if entity.name not in positions:
+            new_entities.append((entity, height))
+        elif layout["heights"].get(entity.name) != height:
+            pos = positions[entity.name]
+            _set_position(layout, entity.name, pos["x"], pos["y"], height)
+
+    if new_entities:
+        neighbours = get_index(schema)["neighbours"]
+        for entity, height in new_entities:
+            place_entity(layout, entity.name, height, neighbours.get(entity.name, ()))
+
+    layout["version"] = version
+    return positions
+
+
+def save_positions(session_id: str, positions: dict) -> int:
+    """Store positions dragged by the user. Returns how many were saved.
+
+    Only entities the session has already rendered are accepted, so a stale
+    page cannot bring back a removed table.
+    """
+    layout = get_layout(session_id)
+    saved = 0
+    for name, pos in positions.items():
+        height = layout["heights"].get(name)
+        if height is None:
+            continue
+        _set_position(layout, name, pos["x"], pos["y"], height)
+        saved += 1
+    return saved
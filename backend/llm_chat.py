@@ -0,0 +1,229 @@
+import asyncio
+import os
+import time
+from functools import partial
+
+import llm_replay
+import router
+import speculative
+import token_budget
+from handlers import get_current_schema
+from prompt_cache import PromptCache, PROMPT_CACHE_ENABLED, is_cache_error
+from schema_text import schema_to_text
+from scheduler import scheduler, PRIORITIES
+
+MODEL_ID = "gemini-2.5-flash"
+
+COMPACTED_NOTE = "(Earlier conversation was shortened to save tokens.)"
+
+
+# ============== PROMPT STATE ==============
+
+def schema_state():
+    """Current schema in compact text for the prompt, or None"""
+    schema = get_current_schema()
+    return f"Current schema:\n{schema_to_text(schema)}" if schema else None
+
+
+def compacted_note() -> str:
+    """Stand-in text for the part of a compacted history that was dropped"""
+    schema = get_current_schema()
+    text = COMPACTED_NOTE
+    if schema:
+        text += f" Current schema:\n{schema_to_text(schema)}"
+    return text
+
+
+# ============== GEMINI HISTORY ==============
+
+def user_content(text: str):
+    from google.genai import types
+
+    return types.Content(role="user", parts=[types.Part.from_text(text=text)])
+
+
+def with_schema_state(contents: list) -> list:
+    """Prompt contents with the current schema on the last user turn.
+
+    Old propose_schema calls are replaced by a one-line note instead of being
+    replayed in full, since the state block already carries the schema.
+    """
+    from google.genai import types
+
+    state = schema_state()
+    if state is None:
+        return contents
+
+    prompt = []
+    for content in contents:
+        if content.role == "model" and any(p.function_call and p.function_call.name == "propose_schema" for p in content.parts or []):
+            prompt.append(types.Content(role="model", parts=[types.Part.from_text(text="(Proposed a schema, see the current schema.)")]))
+        else:
+            prompt.append(content)
+    if prompt and prompt[-1].role == "user":
+        prompt[-1] = types.Content(role="user", parts=[types.Part.from_text(text=state)] + list(prompt[-1].parts))
+    return prompt
+
+
+def schema_note():
+    """Stand-in for the part of a compacted history that was dropped"""
+    return user_content(compacted_note())
+
+
+def local_response(tool_name: str, tool_args: dict):
+    """A model reply calling one tool, for commands handled without the LLM"""
+    from google.genai import types
+
+    part = types.Part.from_function_call(name=tool_name, args=tool_args)
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))]
+    )
+
+
+# ============== GROQ HISTORY ==============
+
+def with_schema_state_messages(messages: list) -> list:
+    """Messages with the current schema prepended to the last user message"""
+    state = schema_state()
+    if state is None or not messages or messages[-1]["role"] != "user":
+        return messages
+    return messages[:-1] + [{"role": "user", "content": f"{state}\n\n{messages[-1]['content']}"}]
+
+
+def schema_note_message() -> dict:
+    """Stand-in for the part of a compacted history that was dropped"""
+    return {"role": "user", "content": compacted_note()}
+
+
+# ============== MODEL CALLS ==============
+
+def record_usage(session_id: str, provider: str, response, source: str = "chat"):
+    """Record a routed call's tokens in the usage format of the provider that served it"""
+    if provider == "groq":
+        token_budget.record_groq(session_id, response, source)
+    else:
+        token_budget.record_gemini(session_id, response, source)
+
+
+class GeminiChat:
+    """Model calls for one Gemini front end (its system prompt and tools).
+
+    Holds the prompt cache and, with LLM_ROUTER=1, the latency router that
+    spreads turns across Gemini and Groq.
+    """
+
+    def __init__(self, client, system_prompt: str, tools: list, model: str = MODEL_ID):
+        self.client = client
+        self.system_prompt = system_prompt
+        self.tools = tools
+        self.model = model
+        self.prompt_cache = PromptCache(self.create_prompt_cache)
+        self.router = self.build_router() if router.ROUTER_ENABLED else None
+
+    def create_prompt_cache(self, ttl: int):
+        """Upload the system prompt and tool declarations to Gemini's context cache"""
+        from google.genai import types
+
+        cache = self.client.caches.create(
+            model=self.model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=self.system_prompt,
+                tools=self.tools,
+                ttl=f"{ttl}s"
+            )
+        )
+        expires_at = cache.expire_time.timestamp() if cache.expire_time else time.time() + ttl
+        return cache.name, expires_at
+
+    def config(self, handle=None):
+        """Request config: the cached prefix if there is a handle, else the prompt and tools inline"""
+        from google.genai import types
+
+        if handle:
+            return types.GenerateContentConfig(cached_content=handle)
+        return types.GenerateContentConfig(system_instruction=self.system_prompt, tools=self.tools)
+
+    def generate(self, contents: list):
+        """Call Gemini with the system prompt and tools (from the context cache when enabled)"""
+        contents = with_schema_state(contents)
+        if PROMPT_CACHE_ENABLED:
+            handle = self.prompt_cache.get()
+            if handle:
+                try:
+                    return self.client.models.generate_content(model=self.model, contents=contents, config=self.config(handle))
+                except Exception as e:
+                    if not is_cache_error(e, handle):
+                        raise
+                    # Cache expired or was evicted early: send inline, re-register next time
+                    self.prompt_cache.invalidate()
+
+        return self.client.models.generate_content(model=self.model, contents=contents, config=self.config())
+
+    async def agenerate(self, contents: list):
+        """generate() on the async client, so cancelling the task aborts the request"""
+        contents = with_schema_state(contents)
+        if PROMPT_CACHE_ENABLED:
+            # May upload the prefix, which blocks
+            handle = await asyncio.to_thread(self.prompt_cache.get)
+            if handle:
+                try:
+                    return await self.client.aio.models.generate_content(model=self.model, contents=contents, config=self.config(handle))
+                except Exception as e:
+                    if not is_cache_error(e, handle):
+                        raise
+                    self.prompt_cache.invalidate()
+
+        return await self.client.aio.models.generate_content(model=self.model, contents=contents, config=self.config())
+
+    async def generate_speculative(self, session_id: str, tenant: str, contents: list):
+        """Speculative branch call in the lowest scheduler class; its tokens count against the session even if unused.
+
+        With the router on, a branch is routed and hedged like a real turn, so
+        a prefetched reply comes from the same provider choice. A routed call
+        that has started runs to the end even if the branch is cancelled.
+        """
+        slot = partial(scheduler.slot, tenant, PRIORITIES["speculative"], speculative.estimate_tokens(contents))
+        if self.router is not None:
+            messages = router.from_gemini(contents)
+            kind = router.turn_kind(messages, get_current_schema() is not None)
+            return await self.route(session_id, messages, kind, slot, source="speculative")
+
+        async with slot():
+            response = await self.agenerate(contents)
+        token_budget.record_gemini(session_id, response, source="speculative")
+        return response
+
+    def build_router(self):
+        """Gemini plus Groq behind the latency router (LLM_ROUTER=1)"""
+        from groq import Groq
+        from tools import TOOLS
+        groq_client = llm_replay.groq_client(lambda: Groq(api_key=os.getenv("GROQ_API_KEY")))
+        return router.Router([
+            router.gemini_provider(self.generate),
+            router.groq_provider(groq_client, self.system_prompt, TOOLS, context=schema_state)
+        ])
+
+    async def complete(self, session_id: str, history: list, tenant: str = None):
+        """Next model turn for a history, from Gemini or routed across providers.
+
+        Every provider call, a hedge included, holds a scheduler slot of
+        `tenant` (the session by default): a fair share of the model per
+        tenant, clarifications ahead of big proposals.
+        """
+        messages = router.from_gemini(history)
+        kind = router.turn_kind(messages, get_current_schema() is not None)
+        slot = partial(scheduler.slot, tenant or session_id, PRIORITIES[kind], speculative.estimate_tokens(history))
+
+        if self.router is None:
+            async with slot():
+                # Off the event loop: a slow call (or a replayed latency) must not stall every other session
+                response = await asyncio.to_thread(self.generate, history)
+            token_budget.record_gemini(session_id, response)
+            return response
+
+        return await self.route(session_id, messages, kind, slot)
+
+    async def route(self, session_id: str, messages: list, kind: str, slot, source: str = "chat"):
+        """Router reply as a Gemini response; every provider call holds a `slot()`"""
+        reply = await self.router.complete(messages, kind, record=partial(record_usage, session_id, source=source), slot=slot)
+        return router.to_gemini_response(reply)
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+# "record": call the real provider and append each exchange to LLM_REPLAY_FILE
+# "replay": serve recorded responses from LLM_REPLAY_FILE, no network needed
+LLM_REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "").lower()
+LLM_REPLAY_FILE = os.getenv("LLM_REPLAY_FILE", "llm_corpus.jsonl")
+
+# "recorded" replays each response after its recorded latency, a number of
+# seconds uses that fixed latency instead, "0" answers immediately
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "recorded")
+
+
+def request_key(provider: str, model: str, messages: list) -> str:
+    """Stable digest of a request (the static prompt and tools are left out)"""
+    payload = json.dumps([provider, model, messages], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def last_user_text(messages: list) -> str:
+    """Text of the last user message, used as a fallback match and for readability"""
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        if isinstance(message.get("content"), str):
+            return message["content"]
+        for part in message.get("parts") or []:
+            if part.get("text"):
+                return part["text"]
+    return ""
+
+
+class Recorder:
+    """Appends request/response pairs to a JSONL corpus, one line per call"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, provider: str, model: str, messages: list, response: dict, latency: float):
+        line = json.dumps({
+            "provider": provider,
+            "key": request_key(provider, model, messages),
+            "user": last_user_text(messages),
+            "latency": round(latency, 4),
+            "response": response
+        }, separators=(",", ":"), default=str)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Corpus:
+    """Recorded exchanges indexed by request key and by last user message"""
+
+    def __init__(self, path: str):
+        self.by_key = {}
+        self.by_user = {}
+        self.turns = {}
+        self.lock = threading.Lock()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.by_key.setdefault((entry["provider"], entry["key"]), []).append(entry)
+                self.by_user.setdefault((entry["provider"], entry["user"]), []).append(entry)
+
+    def lookup(self, provider: str, model: str, messages: list) -> dict:
+        """Find the recorded response; repeated requests cycle through their recordings"""
+        key = (provider, request_key(provider, model, messages))
+        entries = self.by_key.get(key)
+        if not entries:
+            key = (provider, last_user_text(messages))
+            entries = self.by_user.get(key)
+        if not entries:
+            raise LookupError(f"No recorded {provider} response for: {last_user_text(messages)[:60]!r}")
+        with self.lock:
+            turn = self.turns.get(key, 0)
+            self.turns[key] = turn + 1
+        return entries[turn % len(entries)]
+
+
+def replay_seconds(entry: dict) -> float:
+    if LLM_REPLAY_LATENCY == "recorded":
+        return entry.get("latency", 0)
+    return float(LLM_REPLAY_LATENCY)
+
+
+def replay_delay(entry: dict):
+    delay = replay_seconds(entry)
+    if delay > 0:
+        time.sleep(delay)
+
+
+_corpus = None
+_recorder = None
+
+
+def get_corpus() -> Corpus:
+    global _corpus
+    if _corpus is None:
+        _corpus = Corpus(LLM_REPLAY_FILE)
+    return _corpus
+
+
+def get_recorder() -> Recorder:
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder(LLM_REPLAY_FILE)
+    return _recorder
+
+
+# ============== GEMINI ==============
+
+class _GeminiModels:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        from google.genai import types
+
+        messages = [c.model_dump(mode="json", exclude_none=True) for c in contents]
+
+        if LLM_REPLAY_MODE == "replay":
+            entry = get_corpus().lookup("gemini", model, messages)
+            replay_delay(entry)
+            return types.GenerateContentResponse.model_validate(entry["response"])
+
+        start = time.perf_counter()
+        response = self.client.models.generate_content(model=model, contents=contents, config=config)
+        latency = time.perf_counter() - start
+        get_recorder().write("gemini", model, messages, response.model_dump(mode="json", exclude_none=True), latency)
+        return response
+
+
+class _AsyncGeminiModels:
+    """client.aio.models: the replayed latency is awaited, so cancelling a call ends it"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def generate_content(self, model, contents, config=None):
+        from google.genai import types
+
+        messages = [c.model_dump(mode="json", exclude_none=True) for c in contents]
+
+        if LLM_REPLAY_MODE == "replay":
+            entry = get_corpus().lookup("gemini", model, messages)
+            await asyncio.sleep(max(replay_seconds(entry), 0))
+            return types.GenerateContentResponse.model_validate(entry["response"])
+
+        start = time.perf_counter()
+        response = await self.client.aio.models.generate_content(model=model, contents=contents, config=config)
+        latency = time.perf_counter() - start
+        get_recorder().write("gemini", model, messages, response.model_dump(mode="json", exclude_none=True), latency)
+        return response
+
+
+def gemini_client(factory):
+    """Gemini client honouring LLM_REPLAY_MODE; `factory()` builds the real one.
+
+    In replay mode the real client is never built, so no API key is needed.
+    Only models.generate_content (sync and aio) is recorded; other attributes
+    pass through.
+    """
+    if LLM_REPLAY_MODE == "replay":
+        return SimpleNamespace(models=_GeminiModels(None), aio=SimpleNamespace(models=_AsyncGeminiModels(None)))
+    client = factory()
+    if LLM_REPLAY_MODE == "record":
+        return SimpleNamespace(models=_GeminiModels(client), aio=SimpleNamespace(models=_AsyncGeminiModels(client)),
+                               caches=client.caches)
+    return client
+
+
+# ============== GROQ ==============
+
+class _GroqCompletions:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model, messages, **kwargs):
+        if LLM_REPLAY_MODE == "replay":
+            from groq.types.chat import ChatCompletion
+
+            entry = get_corpus().lookup("groq", model, messages)
+            replay_delay(entry)
+            return ChatCompletion.model_validate(entry["response"])
+
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        latency = time.perf_counter() - start
+        get_recorder().write("groq", model, messages, response.model_dump(mode="json", exclude_none=True), latency)
+        return response
+
+
+def groq_client(factory):
+    """Groq client honouring LLM_REPLAY_MODE; `factory()` builds the real one"""
+    if LLM_REPLAY_MODE == "replay":
+        return SimpleNamespace(chat=SimpleNamespace(completions=_GroqCompletions(None)))
+    client = factory()
+    if LLM_REPLAY_MODE == "record":
+        return SimpleNamespace(chat=SimpleNamespace(completions=_GroqCompletions(client)))
+    return client
@@ -0,0 +1,499 @@
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from models import Schema
+from ddl_export import plan_tables, topological_order, create_table_sql, map_type, quote, snake
+import index_advisor
+from index_advisor import recommend_for_tables, index_sql, base_type, pattern_columns
+
+# Rows per entity when no count is given
+DEFAULT_ROWS = 1000
+
+# Cap on the rows generated for one request through the API
+MAX_ROWS = int(os.getenv("LOAD_TEST_MAX_ROWS", "1000000"))
+
+# A benchmarked query is interrupted after this many seconds
+QUERY_TIMEOUT = float(os.getenv("LOAD_TEST_QUERY_TIMEOUT", "10"))
+
+# Zipf exponent for foreign keys: a few parents own most children (0 = uniform)
+DEFAULT_SKEW = 1.1
+
+# Share of NULLs in nullable columns
+NULL_RATE = 0.05
+
+# Distinct values of a non-unique text column, drawn with the same skew
+TEXT_CARDINALITY = 200
+
+# Rows per executemany call
+INSERT_BATCH = 50_000
+
+MAX_DERIVED_QUERIES = 20
+
+# The only statement parts a benchmarked query may prepare; PRAGMA, ATTACH and every write are denied
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+SELECT_RE = re.compile(r"^\s*(?:select|with)\b", re.I)
+
+# A plan step reading a whole table (or one of its indexes); the name is the alias if there is one
+SCAN_RE = re.compile(r"^SCAN (.+?)(?: USING (?:COVERING )?INDEX .*)?$")
+NAME = r'("(?:[^"]|"")+"|\w+)'
+# "table alias" or "table AS alias" after FROM, JOIN or a comma
+TABLE_REF_RE = re.compile(rf"(?:\bFROM|\bJOIN|,)\s*{NAME}\s+(?:AS\s+)?{NAME}", re.I)
+# A common table expression, which hides a table of the same name
+CTE_RE = re.compile(rf"(?:\bWITH(?:\s+RECURSIVE)?|,)\s*{NAME}\s*(?:\([^)]*\)\s*)?AS\s*(?:NOT\s+)?(?:MATERIALIZED\s*)?\(", re.I)
+
+INT_RANGES = {"TINYINT": 128, "SMALLINT": 32768, "BOOLEAN": 2, "BOOL": 2, "BIT": 2}
+EPOCH_DAY = np.datetime64("2015-01-01")
+EPOCH_SECOND = np.datetime64("2015-01-01T00:00:00")
+TEN_YEARS_DAYS = 3652
+LENGTH_RE = re.compile(r"\((\d+)")
+
+
+def row_count(rows, name: str) -> int:
+    """Rows wanted for a table: one count for every table, or {name: count} with "*" (or DEFAULT_ROWS) for the rest"""
+    if isinstance(rows, dict):
+        return rows.get(name, rows.get(name.lower(), rows.get("*", DEFAULT_ROWS)))
+    return rows
+
+
+def skewed_sampler(rng, size: int, skew: float):
+    """draw(n) -> n row numbers in range(size), Zipf-distributed; the hot rows are spread at random"""
+    if skew <= 0:
+        return lambda n: rng.integers(0, size, n)
+    cdf = np.cumsum(np.arange(1, size + 1, dtype=np.float64) ** -skew)
+    cdf /= cdf[-1]
+    hot_order = rng.permutation(size)
+    return lambda n: hot_order[np.minimum(np.searchsorted(cdf, rng.random(n), side="right"), size - 1)]
+
+
+def unique_rows(rng, draws: list, sizes: list, n: int) -> list:
+    """n distinct combinations of parent rows (a junction table's key), drawn with the samplers' skew.
+
+    Draws in rounds and keeps first occurrences, so the result may be short
+    when the skew leaves too few distinct combinations to pick from.
+    """
+    if len(draws) == 1 and n <= sizes[0]:
+        # A one-to-one key: every parent at most once
+        return [rng.permutation(sizes[0])[:n]]
+    limit = math.prod(sizes)
+    n = min(n, limit)
+    codes = np.empty(0, dtype=np.int64)
+    for _ in range(8):
+        need = n - len(codes)
+        if need <= 0:
+            break
+        drawn = np.ravel_multi_index([draw(need * 2) for draw in draws], sizes)
+        codes = np.concatenate([codes, drawn])
+        _, first = np.unique(codes, return_index=True)
+        codes = codes[np.sort(first)]
+    return list(np.unravel_index(codes[:n], sizes))
+
+
+def column_values(rng, column: dict, n: int, unique: bool) -> np.ndarray:
+    """n values for a column, vectorized per type; unique columns count up from 1"""
+    declared = column["type"].upper()
+    sql_type = map_type(column["type"], "sqlite")
+    base = base_type(sql_type)
+    ids = np.arange(1, n + 1)
+    if not n:
+        return np.empty(0, dtype=object)
+
+    if declared.endswith("[]") or "JSON" in declared:
+        return np.full(n, "[]" if declared.endswith("[]") else "{}", dtype=object)
+    if "UUID" in declared:
+        parts = [np.char.mod(f"%0{width}x", rng.integers(0, 16 ** width, n)) for width in (8, 4, 4, 4)]
+        parts.append(np.char.mod("%012x", ids if unique else rng.integers(0, 16 ** 12, n)))
+        values = parts[0]
+        for part in parts[1:]:
+            values = np.char.add(np.char.add(values, "-"), part)
+        return values
+    if base in ("DATE",):
+        return (EPOCH_DAY + (ids if unique else rng.integers(0, TEN_YEARS_DAYS, n))).astype(str)
+    if "TIME" in base or base == "DATETIME":
+        seconds = ids if unique else rng.integers(0, TEN_YEARS_DAYS * 86400, n)
+        return np.char.replace((EPOCH_SECOND + seconds).astype(str), "T", " ")
+    # SQLite's own affinity rules decide between integer, real and text
+    if "INT" in base or base in INT_RANGES:
+        return ids if unique else rng.integers(0, INT_RANGES.get(base, 1_000_000), n)
+    if any(word in base for word in ("REAL", "FLOA", "DOUB", "DEC", "NUM", "MONEY")):
+        return ids + 0.5 if unique else np.round(rng.lognormal(3, 1, n), 2)
+
+    # Text: a unique value per row, or a small skewed vocabulary
+    length = LENGTH_RE.search(sql_type)
+    prefix = snake(column["name"]) + "_"
+    if unique:
+        values = np.char.add(prefix, ids.astype(str))
+        if length and len(prefix) + len(str(n)) > int(length.group(1)):
+            values = np.char.mod("%x", ids)
+    else:
+        values = np.char.add(prefix, skewed_sampler(rng, TEXT_CARDINALITY, 1.0)(n).astype(str))
+    return values.astype(f"<U{length.group(1)}") if length else values
+
+
+def with_nulls(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    if not mask.any():
+        return values
+    values = values.astype(object)
+    values[mask] = None
+    return values
+
+
+def generate_database(schema: Schema, rows=DEFAULT_ROWS, path: str = ":memory:", skew: float = DEFAULT_SKEW,
+                      seed: int = 0, with_indexes: bool = True) -> tuple:
+    """Fill a SQLite database with synthetic rows for a schema; returns (connection, report).
+
+    Tables are created from the SQLite DDL export and filled parents first.
+    Every foreign key value is a key of a generated parent row, drawn with a
+    Zipf skew shared by all children of that parent. Recommended indexes are
+    created after the load and ANALYZE runs, so query plans are realistic.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    tables, notes = plan_tables(schema)
+    ordered, _ = topological_order(tables)
+    notes = [f"Relationship {name}: {problem}" for name, problem in notes]
+
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    # Cycles and self references are loaded before their parents exist; checked once at the end
+    connection.execute("PRAGMA foreign_keys = OFF")
+    for table in ordered:
+        connection.execute(f"DROP TABLE IF EXISTS {quote(table['name'], 'sqlite')}")
+        connection.execute(create_table_sql(table, "sqlite", set()))
+
+    sizes = {t["name"]: row_count(rows, t["name"]) for t in tables}
+    fk_columns = {t["name"]: {c.lower() for fk in t["foreign_keys"] for c in fk["columns"]} for t in tables}
+
+    # Keys that do not come from a parent are known up front, so a cycle can reference them
+    generated = {}
+    for table in tables:
+        own = [c for c in table["primary_key"] if c.lower() not in fk_columns[table["name"]]]
+        if own and len(own) == len(table["primary_key"]):
+            columns = {c["name"].lower(): c for c in table["columns"]}
+            generated[table["name"]] = {c.lower(): column_values(rng, columns[c.lower()], sizes[table["name"]], True)
+                                        for c in own}
+
+    samplers = {}
+
+    def sampler(parent: str):
+        if parent not in samplers:
+            samplers[parent] = skewed_sampler(rng, sizes[parent], skew)
+        return samplers[parent]
+
+    counts = {}
+    for table in ordered:
+        name = table["name"]
+        n = sizes[name]
+        values = generated.get(name, {})
+        parents = {fk["parent"] for fk in table["foreign_keys"]} - {name}
+        missing = sorted(p for p in parents if p not in generated or sizes[p] == 0)
+        if missing and n:
+            notes.append(f"{name}: not filled, it references {', '.join(missing)} which has no rows")
+            n = 0
+
+        # Foreign keys that together make up the primary key or a UNIQUE constraint are drawn without repeats
+        keys = {c.lower() for c in table["primary_key"]}
+        unique_sets = [table["primary_key"]] + table["unique"] + [[c["name"]] for c in table["columns"] if c["unique"]]
+        picked = {}
+        for columns in unique_sets:
+            wanted = {c.lower() for c in columns}
+            fks = [fk for fk in table["foreign_keys"]
+                   if {c.lower() for c in fk["columns"]} <= wanted and fk["name"] not in picked]
+            if not n or not fks or wanted != {c.lower() for fk in fks for c in fk["columns"]}:
+                continue
+            drawn = unique_rows(rng, [sampler(fk["parent"]) for fk in fks], [sizes[fk["parent"]] for fk in fks], n)
+            picked.update(zip((fk["name"] for fk in fks), drawn))
+            n = len(drawn[0])
+        if n < sizes[name] and not missing:
+            notes.append(f"{name}: {n} of {sizes[name]} rows, there are no more distinct key combinations")
+        # Children drawn later only see the rows that exist
+        sizes[name] = n
+        picked = {fk_name: rows_drawn[:n] for fk_name, rows_drawn in picked.items()}
+        values = {column: array[:n] for column, array in values.items()}
+
+        # Plain columns first: a self reference draws from this table's own keys
+        for column in table["columns"]:
+            key = column["name"].lower()
+            if key in values or key in fk_columns[name]:
+                continue
+            unique = column["unique"] or key in keys or any(key in {c.lower() for c in u} for u in table["unique"])
+            array = column_values(rng, column, n, unique)
+            values[key] = with_nulls(array, rng.random(n) < NULL_RATE) if column["nullable"] and not unique else array
+
+        columns = {c["name"].lower(): c for c in table["columns"]}
+        for fk in table["foreign_keys"]:
+            parent_keys = values if fk["parent"] == name else generated.get(fk["parent"], {})
+            rows_drawn = picked.get(fk["name"])
+            if rows_drawn is None:
+                rows_drawn = sampler(fk["parent"])(n) if n else np.empty(0, dtype=np.int64)
+            # A nullable key is NULL in all its columns at once
+            nullable = all(columns[c.lower()]["nullable"] for c in fk["columns"])
+            mask = rng.random(n) < NULL_RATE if nullable else np.zeros(n, dtype=bool)
+            for column, ref in zip(fk["columns"], fk["ref_columns"]):
+                array = parent_keys[ref.lower()][rows_drawn] if n else np.empty(0)
+                values[column.lower()] = with_nulls(array, mask)
+        generated[name] = {c.lower(): values[c.lower()] for c in table["primary_key"]}
+
+        names = [c["name"] for c in table["columns"]]
+        sql = (f"INSERT INTO {quote(name, 'sqlite')} ({', '.join(quote(c, 'sqlite') for c in names)}) "
+               f"VALUES ({', '.join('?' * len(names))})")
+        arrays = [values[c.lower()] for c in names]
+        for offset in range(0, n, INSERT_BATCH):
+            connection.executemany(sql, zip(*(a[offset:offset + INSERT_BATCH].tolist() for a in arrays)))
+        counts[name] = n
+    connection.commit()
+    load_seconds = time.perf_counter() - start
+
+    violations = len(connection.execute("PRAGMA foreign_key_check").fetchall())
+    connection.execute("PRAGMA foreign_keys = ON")
+
+    indexes = []
+    if with_indexes:
+        for rec in recommend_for_tables(tables):
+            connection.execute(index_sql(rec, "sqlite"))
+            indexes.append(rec["name"])
+    connection.execute("ANALYZE")
+    connection.commit()
+
+    return connection, {
+        "rows": counts,
+        "notes": notes,
+        "fk_violations": violations,
+        "indexes": indexes,
+        "load_ms": round(load_seconds * 1000, 1),
+        "total_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def join_condition(fk: dict, child: str, parent: str) -> str:
+    return " AND ".join(f"{child}.{quote(c, 'sqlite')} = {parent}.{quote(r, 'sqlite')}"
+                        for c, r in zip(fk["columns"], fk["ref_columns"]))
+
+
+def hottest_parent(connection: sqlite3.Connection, table: dict, fk: dict) -> list:
+    """Key values of the parent with the most children, the worst case for a lookup"""
+    columns = ", ".join(quote(c, "sqlite") for c in fk["columns"])
+    not_null = " AND ".join(f"{quote(c, 'sqlite')} IS NOT NULL" for c in fk["columns"])
+    row = connection.execute(f"SELECT {columns} FROM {quote(table['name'], 'sqlite')} WHERE {not_null} "
+                             f"GROUP BY {columns} ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    return list(row) if row else None
+
+
+def derive_queries(connection: sqlite3.Connection, schema: Schema, limit: int = MAX_DERIVED_QUERIES) -> list:
+    """Join queries implied by the schema, as {"name", "sql", "params"} dicts.
+
+    For every foreign key: the children of its busiest parent and the top
+    parents by child count; through every junction table, the rows linked to
+    its busiest left-hand row; and one query per declared access pattern.
+    """
+    tables, _ = plan_tables(schema)
+    queries = []
+    for table in tables:
+        child = quote(table["name"], "sqlite")
+        fks = table["foreign_keys"]
+        if "relationship" in table and len(fks) == 2:
+            left, right = fks
+            params = hottest_parent(connection, table, left)
+            if params:
+                where = " AND ".join(f"l.{quote(c, 'sqlite')} = ?" for c in left["ref_columns"])
+                queries.append({
+                    "name": f"{right['parent']} linked to one {left['parent']} through {table['name']}",
+                    "sql": f"SELECT r.* FROM {quote(left['parent'], 'sqlite')} AS l "
+                           f"JOIN {child} AS j ON {join_condition(left, 'j', 'l')} "
+                           f"JOIN {quote(right['parent'], 'sqlite')} AS r ON {join_condition(right, 'j', 'r')} "
+                           f"WHERE {where}",
+                    "params": params
+                })
+            continue
+        for fk in fks:
+            parent = quote(fk["parent"], "sqlite")
+            params = hottest_parent(connection, table, fk)
+            if params:
+                where = " AND ".join(f"p.{quote(c, 'sqlite')} = ?" for c in fk["ref_columns"])
+                queries.append({
+                    "name": f"{table['name']} of the busiest {fk['parent']}",
+                    "sql": f"SELECT c.* FROM {parent} AS p JOIN {child} AS c ON {join_condition(fk, 'c', 'p')} "
+                           f"WHERE {where}",
+                    "params": params
+                })
+            keys = ", ".join(f"p.{quote(c, 'sqlite')}" for c in fk["ref_columns"])
+            queries.append({
+                "name": f"{fk['parent']} with the most {table['name']}",
+                "sql": f"SELECT {keys}, COUNT(*) AS n FROM {parent} AS p JOIN {child} AS c "
+                       f"ON {join_condition(fk, 'c', 'p')} GROUP BY {keys} ORDER BY n DESC LIMIT 10",
+                "params": []
+            })
+
+    by_name = {t["name"].lower(): t for t in tables}
+    for pattern in index_advisor.access_patterns:
+        table = by_name.get(pattern.entity.lower())
+        if table is None:
+            continue
+        types = {c["name"].lower(): c["type"] for c in table["columns"]}
+        equals = [c for c in pattern.equals if c.lower() in types]
+        ranges = [c for c in pattern.range[:1] if c.lower() in types]
+        if not equals and not ranges:
+            continue
+        # Filter values taken from a row in the middle of the table
+        sample = connection.execute(
+            f"SELECT {', '.join(quote(c, 'sqlite') for c in equals + ranges)} FROM {quote(table['name'], 'sqlite')} "
+            f"LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM {quote(table['name'], 'sqlite')})").fetchone()
+        if sample is None:
+            continue
+        where = [f"{quote(c, 'sqlite')} = ?" for c in equals] + [f"{quote(c, 'sqlite')} >= ?" for c in ranges]
+        order = [c for c in pattern_columns(pattern, types) if c not in equals and c.lower() in types]
+        sql = f"SELECT * FROM {quote(table['name'], 'sqlite')} WHERE {' AND '.join(where)}"
+        if pattern.order_by:
+            sql += f" ORDER BY {', '.join(quote(c, 'sqlite') for c in order or pattern.order_by)}"
+        queries.append({"name": f"access pattern on {table['name']}", "sql": sql + " LIMIT 100",
+                        "params": list(sample)})
+    return queries[:limit]
+
+
+def query_plan(connection: sqlite3.Connection, sql: str, params: list) -> list:
+    """EXPLAIN QUERY PLAN as lines indented by depth"""
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in connection.execute("EXPLAIN QUERY PLAN " + sql, params):
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def time_query(connection: sqlite3.Connection, sql: str, params: list, repeat: int) -> dict:
+    """Run a query `repeat` times, fetching every row, and summarize in ms"""
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(connection.execute(sql, params).fetchall())
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "rows": rows,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(samples[-1], 3)
+    }
+
+
+def read_only_authorizer(action: int, *_) -> int:
+    return sqlite3.SQLITE_OK if action in READ_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def unquote(name: str) -> str:
+    return name[1:-1].replace('""', '"').lower() if name.startswith('"') else name.lower()
+
+
+def full_scans(plan: list, sql: str, tables: set) -> list:
+    """Plan steps that read a whole table of the database.
+
+    SCAN steps over a constant row, a subquery or a CTE are left out. The
+    plan names a table by its alias, so aliases are resolved from the SQL.
+    """
+    tables = tables - {unquote(name) for name in CTE_RE.findall(sql)}
+    names = tables | {unquote(alias) for table, alias in TABLE_REF_RE.findall(sql) if unquote(table) in tables}
+    scans = []
+    for line in plan:
+        match = SCAN_RE.match(line.strip())
+        if match and match.group(1).lower() in names:
+            scans.append(line.strip())
+    return scans
+
+
+def benchmark_queries(connection: sqlite3.Connection, queries: list, repeat: int = 5) -> list:
+    """Time queries (SQL strings or {"name", "sql", "params"} dicts) and report their plans.
+
+    Queries must be a single SELECT or WITH statement and are prepared under
+    an authorizer that only allows reads, so they cannot write, ATTACH a
+    file or change a PRAGMA. Each run is interrupted after QUERY_TIMEOUT
+    seconds. "full_scans" lists the plan steps that read a
+    whole table, which is usually where an index is missing.
+    """
+    tables = {name.lower() for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    connection.execute("PRAGMA query_only = ON")
+    connection.set_authorizer(read_only_authorizer)
+    results = []
+    try:
+        for i, query in enumerate(queries):
+            if isinstance(query, str):
+                query = {"name": f"query {i + 1}", "sql": query, "params": []}
+            result = {"name": query["name"], "sql": query["sql"], "params": query.get("params", [])}
+            # sqlite3 itself refuses more than one statement per execute
+            if not SELECT_RE.match(query["sql"]):
+                result["error"] = "only a single SELECT or WITH statement can be benchmarked"
+                results.append(result)
+                continue
+            deadline = time.perf_counter() + QUERY_TIMEOUT
+            connection.set_progress_handler(lambda: time.perf_counter() > deadline, 10_000)
+            try:
+                result["plan"] = query_plan(connection, query["sql"], result["params"])
+                result["full_scans"] = full_scans(result["plan"], query["sql"], tables)
+                result.update(time_query(connection, query["sql"], result["params"], repeat))
+            except sqlite3.Error as e:
+                result["error"] = "timed out" if "interrupted" in str(e) else str(e)
+            results.append(result)
+    finally:
+        connection.set_progress_handler(None, 0)
+        connection.set_authorizer(None)
+        connection.execute("PRAGMA query_only = OFF")
+    return results
+
+
+def load_test(schema: Schema, rows=DEFAULT_ROWS, queries: list = None, skew: float = DEFAULT_SKEW, repeat: int = 5,
+              path: str = ":memory:", seed: int = 0, with_indexes: bool = True) -> dict:
+    """Generate data for a schema, then time the given queries (default: derived ones) against it"""
+    connection, report = generate_database(schema, rows, path, skew, seed, with_indexes)
+    try:
+        report["queries"] = benchmark_queries(connection, queries or derive_queries(connection, schema), repeat)
+    finally:
+        connection.close()
+    return report
+
+
+# Usage: python load_bench.py schema.json [--rows 10000] [--rows-for Order=100000] [--query "SELECT ..."]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill SQLite with synthetic data for a schema and time join queries")
+    parser.add_argument("schema", help="Schema JSON file")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows per table")
+    parser.add_argument("--rows-for", action="append", default=[], metavar="TABLE=N", help="Rows for one table")
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW, help="Zipf exponent of foreign keys (0 = uniform)")
+    parser.add_argument("--query", action="append", default=[], help="SQL to time instead of the derived joins")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default=":memory:", help="Keep the generated database in this file")
+    parser.add_argument("--no-indexes", action="store_true", help="Skip the recommended indexes")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.schema) as f:
+        schema = Schema.model_validate_json(f.read())
+    rows = {name: int(n) for name, n in (item.split("=", 1) for item in args.rows_for)}
+    rows = {"*": args.rows, **rows} if rows else args.rows
+    report = load_test(schema, rows, args.query, args.skew, args.repeat, args.db, with_indexes=not args.no_indexes)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+    print(f"Loaded {sum(report['rows'].values())} rows in {report['load_ms']} ms "
+          f"({len(report['indexes'])} indexes, {report['fk_violations']} foreign key violations)")
+    for table, count in report["rows"].items():
+        print(f"  {table:<40} {count:>10}")
+    for note in report["notes"]:
+        print(f"  note: {note}")
+    for result in report["queries"]:
+        print(f"\n{result['name']}\n  {result['sql']}")
+        if "error" in result:
+            print(f"  error: {result['error']}")
+            continue
+        print(f"  {result['rows']} rows, median {result['median_ms']} ms (min {result['min_ms']}, max {result['max_ms']})")
+        for line in result["plan"]:
+            print(f"    {line}")
@@ -1,9 +1,15 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import json
 import os
+import sqlite3
+import tempfile
+import time
+from functools import partial
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
@@ -14,10 +20,31 @@ from handlers import (
     handle_modify_schema,
     handle_finalize_schema,
     get_current_schema,
+    get_schema_version,
+    apply_modifications,
+    check_proposal,
     reset_schema
 )
-from diagram import schema_to_mermaid
+from models import Entity, Attribute, Relationship, SchemaOperation, AccessPattern
+from diagram import schema_to_mermaid, schema_to_mermaid_parts, SPLIT_THRESHOLD
+from partition import MAX_CLUSTER_SIZE
 from diagram_html import schema_to_interactive_html
+from focus import focus_schema
+from layout import layout_positions, save_positions, reset_layout
+import speculative
+import metrics
+import token_budget
+import fast_path
+from validation import to_native
+import admission
+import llm_replay
+from llm_chat import GeminiChat, user_content, local_response, schema_note
+import ddl_import
+import sqlite_import
+import ddl_export
+import schema_check
+import fk_inference
+import index_advisor
 
 load_dotenv()
 
@@ -30,11 +57,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
-# Gemini setup
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-MODEL_ID = "gemini-2.5-flash"
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    if not metrics.METRICS_ENABLED:
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    # The route template, not the URL, so entity names and 404 probes do not each add a series
+    route = request.scope.get("route")
+    metrics.observe("schemaforge_http_request_seconds", time.perf_counter() - start, path=route.path if route else "unmatched")
+    return response
+
+
+# /admin endpoints need an X-Admin-Token header matching ADMIN_TOKEN; unset, they are closed
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Largest SQL dump or SQLite file accepted by /schema/import/*
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Gemini setup (LLM_REPLAY_MODE=record|replay captures or serves a JSONL corpus)
+client = llm_replay.gemini_client(lambda: genai.Client(api_key=os.getenv("GEMINI_API_KEY")))
 
 SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant. Your job is to help users design database schemas through conversation.
 
@@ -56,6 +101,12 @@ SYSTEM_PROMPT = """You are SchemaForge, an expert database architect assistant.
 ## Important:
 - Always use the provided functions to interact
 - Options must be SHORT like: "yes", "no", "students", "one-to-many"
+
+## Current schema:
+- Once a schema exists, the latest user message starts with "Current schema:" in a compact form
+- One table per line: Table(column TYPE PK NN UQ, ...) where PK = primary key, NN = not null, UQ = unique
+- Relationships: name: FromTable 1:N ToTable (1:1, 1:N, N:1, N:N)
+- Treat it as the source of truth over earlier messages
 """
 
 GEMINI_TOOLS = [
@@ -171,6 +222,10 @@ def process_tool_call(tool_name: str, tool_args: dict) -> dict:
     return {"error": f"Unknown tool: {tool_name}"}
 
 
+# Model calls with this front end's prompt and tools (prompt cache, router)
+gemini = GeminiChat(client, SYSTEM_PROMPT, GEMINI_TOOLS)
+
+
 def clean_options(options: list) -> list:
     if not options:
         return []
@@ -192,6 +247,38 @@ class ChatRequest(BaseModel):
     session_id: Optional[str] = "default"
 
 
+class EntityPosition(BaseModel):
+    x: float
+    y: float
+
+
+class LayoutRequest(BaseModel):
+    positions: dict[str, EntityPosition]
+    session_id: Optional[str] = "default"
+
+
+class OperationsRequest(BaseModel):
+    operations: list[SchemaOperation]
+    expected_version: Optional[int] = None
+    session_id: Optional[str] = "default"
+
+
+class ProposeRequest(BaseModel):
+    schema_name: str
+    entities: list[Entity]
+    relationships: list[Relationship] = []
+    expected_version: Optional[int] = None
+    session_id: Optional[str] = "default"
+
+
+class LoadTestRequest(BaseModel):
+    rows: int = 1000
+    rows_per_entity: dict[str, int] = {}
+    skew: float = 1.1
+    queries: list[str] = []
+    repeat: int = 5
+
+
 class ChatResponse(BaseModel):
     response: str
     options: list[str] = []
@@ -202,45 +289,96 @@ class ChatResponse(BaseModel):
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, x_api_key: Optional[str] = Header(default=None)):
+    # One turn per session at a time, identical in-flight messages answered once
+    tenant = x_api_key or request.session_id
+    try:
+        return await admission.run(request.session_id, request.message, partial(chat_turn, request, tenant))
+    except admission.QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+async def chat_turn(request: ChatRequest, tenant: str) -> ChatResponse:
     session_id = request.session_id
     
     if session_id not in conversations:
         conversations[session_id] = []
+        metrics.set_gauge("schemaforge_sessions", len(conversations))
+    
+    # Refuse tenants and sessions that used up their token budget (/reset restores only the latter)
+    token_budget.set_tenant(session_id, tenant)
+    if token_budget.over_tenant_budget(tenant):
+        return ChatResponse(response="⛔ This API key has used up its token budget.")
+    if token_budget.over_hard_budget(session_id):
+        return ChatResponse(response="⛔ This conversation has used up its token budget. Reset it to start a new one.")
     
     history = conversations[session_id]
-    history.append(types.Content(role="user", parts=[types.Part.from_text(text=request.message)]))
+    
+    # Over the soft budget: keep the first message, the current schema and the recent turns
+    if token_budget.over_soft_budget(session_id):
+        token_budget.compact_history(session_id, history, schema_note(), lambda c: c.role == "user")
+    
+    history.append(user_content(request.message))
     
     try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=history,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=GEMINI_TOOLS
-            )
-        )
+        # Simple edits ("add created_at DATETIME to Order") are parsed locally
+        command = fast_path.try_fast_path(request.message, get_current_schema())
+        if command:
+            speculative.cancel(session_id)
+            response = local_response(*command)
+        else:
+            # Use the prefetched reply if the user picked a suggested option
+            with metrics.span("llm"):
+                response = await speculative.take(session_id, request.message, len(history) - 1)
+                if response is None:
+                    response = await gemini.complete(session_id, history, tenant)
         
-        if response.candidates and response.candidates[0].content.parts:
+        repairs = 0
+        while response.candidates and response.candidates[0].content.parts:
             for part in response.candidates[0].content.parts:
                 if part.function_call:
                     func_call = part.function_call
                     tool_name = func_call.name
-                    tool_args = dict(func_call.args)
+                    tool_args = to_native(func_call.args)
                     
-                    result = process_tool_call(tool_name, tool_args)
+                    metrics.inc("schemaforge_tool_calls_total", tool=tool_name)
+                    with metrics.span("tool"):
+                        result = process_tool_call(tool_name, tool_args)
                     history.append(types.Content(role="model", parts=[part]))
                     
+                    # A rejected schema change goes back to the model in this same request
+                    if schema_check.needs_repair(tool_name, result, repairs):
+                        repairs += 1
+                        metrics.inc("schemaforge_schema_repairs_total", tool=tool_name)
+                        history.append(user_content(schema_check.repair_note(tool_name, result)))
+                        with metrics.span("llm"):
+                            response = await gemini.complete(session_id, history, tenant)
+                        break
+                    
+                    # Entities left without relationships: link them locally or offer the links
+                    linked, suggestions = [], []
+                    if tool_name == "propose_schema" and result.get("success"):
+                        linked, suggestions = fk_inference.connect_orphans()
+                    
                     # Get current schema if exists
                     schema = get_current_schema()
-                    schema_data = schema.model_dump() if schema else None
-                    diagram_html = schema_to_interactive_html() if schema else None
+                    if schema:
+                        metrics.set_gauge("schemaforge_schema_entities", len(schema.entities))
+                        metrics.set_gauge("schemaforge_schema_relationships", len(schema.relationships))
+                    with metrics.span("serialize"):
+                        schema_data = schema.model_dump() if schema else None
+                    diagram_html = schema_to_interactive_html(saved_positions=layout_positions(session_id, schema)) if schema else None
                     mermaid_code = schema_to_mermaid() if schema else None
                     
                     if tool_name == "ask_clarification":
+                        options = clean_options(result.get("options", []))
+                        speculative.start(
+                            session_id, history, options, partial(gemini.generate_speculative, session_id, tenant), user_content,
+                            extra_tokens=len(SYSTEM_PROMPT) // 4
+                        )
                         return ChatResponse(
                             response=result.get("question", "Could you provide more details?"),
-                            options=clean_options(result.get("options", [])),
+                            options=options,
                             schema_data=schema_data,
                             diagram_html=diagram_html,
                             mermaid_code=mermaid_code
@@ -263,9 +401,15 @@ async def chat(request: ChatRequest):
                                 for rel in relationships:
                                     response_text += f"  • {rel['from_entity']} → {rel['to_entity']} ({rel['type']})\n"
                             
+                            if linked:
+                                response_text += "\n🧩 Connected orphan entities:\n"
+                                response_text += "".join(f"  • {m}\n" for m in linked)
+                            elif suggestions:
+                                response_text += "\n🧩 Some entities have no relationships yet, see the suggested links below.\n"
+                            
                             return ChatResponse(
                                 response=response_text,
-                                options=["Modify", "Finalize"],
+                                options=[fk_inference.option_text(s) for s in suggestions[:fk_inference.MAX_OPTIONS]] + ["Modify", "Finalize"],
                                 is_schema_proposed=True,
                                 schema_data=schema_data,
                                 diagram_html=diagram_html,
@@ -297,6 +441,8 @@ async def chat(request: ChatRequest):
                 elif part.text:
                     history.append(types.Content(role="model", parts=[part]))
                     return ChatResponse(response=part.text)
+            else:
+                break
         
         return ChatResponse(response="How can I help you design your database?")
     
@@ -306,26 +452,337 @@ async def chat(request: ChatRequest):
         return ChatResponse(response=f"Sorry, error: {str(e)[:100]}")
 
 
+@app.get("/admin/tokens")
+async def get_token_usage(x_admin_token: Optional[str] = Header(default=None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    return token_budget.report()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/reset")
 async def reset_conversation(session_id: str = "default"):
     if session_id in conversations:
         conversations[session_id] = []
+    speculative.cancel(session_id)
+    token_budget.reset_usage(session_id)
     reset_schema()
+    reset_layout(session_id)
     return {"status": "ok"}
 
 
+@app.post("/layout")
+async def update_layout(request: LayoutRequest):
+    positions = {name: pos.model_dump() for name, pos in request.positions.items()}
+    saved = save_positions(request.session_id, positions)
+    return {"status": "ok", "saved": saved, "schema_version": get_schema_version()}
+
+
+@app.get("/layout")
+async def get_layout(session_id: str = "default"):
+    schema = get_current_schema()
+    if schema is None:
+        return {"positions": {}, "schema_version": get_schema_version()}
+    return {"positions": layout_positions(session_id, schema), "schema_version": get_schema_version()}
+
+
 @app.get("/schema")
-async def get_schema():
+async def get_schema(session_id: str = "default"):
     schema = get_current_schema()
     if schema:
         return {
+            "schema_version": get_schema_version(),
             "schema_data": schema.model_dump(),
-            "diagram_html": schema_to_interactive_html(),
-            "mermaid_code": schema_to_mermaid()
+            "diagram_html": schema_to_interactive_html(saved_positions=layout_positions(session_id, schema)),
+            "mermaid_code": schema_to_mermaid(),
+            "mermaid_parts": schema_to_mermaid_parts() if len(schema.entities) > SPLIT_THRESHOLD else None
         }
     return {"schema_data": None}
 
 
+@app.get("/schema/ddl")
+async def get_schema_ddl(dialect: str = "postgresql"):
+    """CREATE TABLE script for the current schema, streamed and cached per version and dialect"""
+    dialect = dialect.lower()
+    if dialect not in ddl_export.DIALECTS:
+        raise HTTPException(status_code=422, detail=f"Unknown dialect {dialect!r}, expected one of {', '.join(ddl_export.DIALECTS)}")
+    schema = get_current_schema()
+    if schema is None:
+        raise HTTPException(status_code=404, detail="No schema yet")
+    
+    headers = {"Content-Disposition": f'attachment; filename="{ddl_export.snake(schema.schema_name)}_{dialect}.sql"'}
+    return StreamingResponse(ddl_export.stream_ddl(dialect), media_type="application/sql", headers=headers)
+
+
+@app.get("/schema/indexes")
+async def get_schema_indexes(session_id: str = "default", render: bool = False):
+    """Recommended secondary indexes with their reasons and write cost, optionally drawn on the diagram"""
+    schema = get_current_schema()
+    if schema is None:
+        raise HTTPException(status_code=404, detail="No schema yet")
+    
+    indexes = index_advisor.recommend_indexes(schema)
+    payload = {"schema_version": get_schema_version(), "indexes": indexes,
+               "access_patterns": [p.model_dump() for p in index_advisor.access_patterns]}
+    if render:
+        payload["diagram_html"] = schema_to_interactive_html(saved_positions=layout_positions(session_id, schema),
+                                                             indexes=index_advisor.overlay(indexes))
+    return payload
+
+
+@app.put("/schema/access-patterns")
+async def put_access_patterns(patterns: list[AccessPattern]):
+    """Declare the queries expected to run often; they shape the recommended indexes"""
+    index_advisor.set_access_patterns(patterns)
+    return {"status": "ok", "access_patterns": len(patterns)}
+
+
+@app.post("/schema/load-test")
+async def run_load_test(request: LoadTestRequest):
+    """Fill an in-memory SQLite database with synthetic rows for the current schema and time join queries"""
+    schema = get_current_schema()
+    if schema is None:
+        raise HTTPException(status_code=404, detail="No schema yet")
+    try:
+        import load_bench
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"Load tests need NumPy: {e}")
+    
+    rows = {"*": request.rows, **request.rows_per_entity}
+    total = request.rows * len(schema.entities) + sum(request.rows_per_entity.values())
+    if min(rows.values()) < 0 or total > load_bench.MAX_ROWS:
+        raise HTTPException(status_code=422, detail=f"Row counts must be 0 or more and add up to at most {load_bench.MAX_ROWS}")
+    if not 1 <= request.repeat <= 50:
+        raise HTTPException(status_code=422, detail="repeat must be between 1 and 50")
+    rejected = [q for q in request.queries if not load_bench.SELECT_RE.match(q)]
+    if rejected:
+        raise HTTPException(status_code=422, detail={"error": "Only SELECT or WITH queries can be benchmarked",
+                                                     "queries": rejected})
+    
+    # Generating and querying take seconds; keep them off the event loop
+    report = await asyncio.to_thread(load_bench.load_test, schema, rows, request.queries, request.skew, request.repeat)
+    return {"schema_version": get_schema_version(), **report}
+
+
+def schema_payload(session_id: str, render: bool = True) -> dict:
+    """Current schema with its version, plus the diagrams unless render is off"""
+    schema = get_current_schema()
+    payload = {"schema_version": get_schema_version(), "schema_data": schema.model_dump() if schema else None}
+    if render and schema:
+        payload["diagram_html"] = schema_to_interactive_html(saved_positions=layout_positions(session_id, schema))
+        payload["mermaid_code"] = schema_to_mermaid()
+    return payload
+
+
+def note_direct_edit(session_id: str, summary: str):
+    """Tell the model about an edit made outside the chat, so the next turn sees it.
+
+    Callers hold the session lock, so the note never lands in the middle of a turn.
+    """
+    speculative.cancel(session_id)
+    history = conversations.get(session_id)
+    if history:
+        history.append(user_content(f"(I edited the schema directly: {summary})"))
+
+
+async def run_operations(operations: list, expected_version: Optional[int], session_id: str, render: bool) -> dict:
+    """Apply modify_schema operations (all or nothing) and return the new schema"""
+    # Wait for the session's chat turn, which may be editing the schema and history
+    async with admission.session_lock(session_id):
+        result = apply_modifications(operations, expected_version)
+        if not result["success"]:
+            if result.get("conflict"):
+                raise HTTPException(status_code=409, detail=result["error"])
+            if get_current_schema() is None:
+                raise HTTPException(status_code=404, detail=result["error"])
+            raise HTTPException(status_code=422, detail={"index": result["index"], "error": result["error"]})
+        
+        for op in operations:
+            metrics.inc("schemaforge_direct_edits_total", action=op["action"])
+        note_direct_edit(session_id, " ".join(f"{m}." for m in result["messages"]))
+        return {"messages": result["messages"], **schema_payload(session_id, render)}
+
+
+@app.put("/schema")
+async def put_schema(request: ProposeRequest, render: bool = True):
+    async with admission.session_lock(request.session_id):
+        if request.expected_version is not None and request.expected_version != get_schema_version():
+            raise HTTPException(status_code=409, detail=f"Schema is at version {get_schema_version()}, not {request.expected_version}")
+        
+        args = request.model_dump(include={"schema_name", "entities", "relationships"})
+        error = check_proposal(args)
+        if error:
+            raise HTTPException(status_code=422, detail={"error": error})
+        result = handle_propose_schema(args)
+        if not result.get("success"):
+            raise HTTPException(status_code=422, detail={"error": result.get("error"), "problems": result.get("problems", [])})
+        
+        metrics.inc("schemaforge_direct_edits_total", action="propose_schema")
+        note_direct_edit(request.session_id, result["message"])
+        return {"messages": [result["message"]], **schema_payload(request.session_id, render)}
+
+
+async def spool_upload(request: Request, spool):
+    """Copy the raw request body to a file, so a large upload is never held in memory"""
+    too_large = HTTPException(status_code=413, detail=f"Uploads are limited to {IMPORT_MAX_BYTES} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > IMPORT_MAX_BYTES:
+        raise too_large
+    
+    # The header may be missing or wrong (chunked uploads), so count as well
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > IMPORT_MAX_BYTES:
+            raise too_large
+        spool.write(chunk)
+    spool.flush()
+    spool.seek(0)
+
+
+async def load_imported(args: dict, source: str, expected_version: Optional[int], session_id: str, render: bool) -> dict:
+    """Make imported propose_schema arguments the current schema"""
+    if not args["entities"]:
+        raise HTTPException(status_code=422, detail={"error": "No tables found"})
+    async with admission.session_lock(session_id):
+        # Checked again: the schema may have changed while the upload was parsed
+        if expected_version is not None and expected_version != get_schema_version():
+            raise HTTPException(status_code=409, detail=f"Schema is at version {get_schema_version()}, not {expected_version}")
+        result = handle_propose_schema(args, check=False)
+        if not result.get("success"):
+            raise HTTPException(status_code=422, detail={"error": result.get("error")})
+        
+        metrics.inc("schemaforge_direct_edits_total", action=f"import_{source}")
+        note_direct_edit(session_id, f"Imported from {source}. {result['message']}")
+        return {"messages": [result["message"]], **schema_payload(session_id, render)}
+
+
+@app.post("/schema/import/ddl")
+async def import_schema_ddl(request: Request, schema_name: str = "ImportedSchema", expected_version: Optional[int] = None,
+                            session_id: str = "default", render: bool = True):
+    """Replace the schema with one parsed from a SQL dump sent as the raw request body"""
+    if expected_version is not None and expected_version != get_schema_version():
+        raise HTTPException(status_code=409, detail=f"Schema is at version {get_schema_version()}, not {expected_version}")
+    
+    # Parse off the event loop, a large dump takes seconds
+    with tempfile.TemporaryFile() as spool:
+        await spool_upload(request, spool)
+        byte_chunks = iter(partial(spool.read, ddl_import.CHUNK_SIZE), b"")
+        try:
+            args = await asyncio.to_thread(ddl_import.parse_ddl, ddl_import.decode_chunks(byte_chunks), schema_name)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail={"error": f"Could not parse the dump: {e}"})
+    return await load_imported(args, "ddl", expected_version, session_id, render)
+
+
+@app.post("/schema/import/sqlite")
+async def import_schema_sqlite(request: Request, schema_name: str = "ImportedSchema", expected_version: Optional[int] = None,
+                               session_id: str = "default", render: bool = True):
+    """Replace the schema with the catalog of a SQLite database file sent as the raw request body"""
+    if expected_version is not None and expected_version != get_schema_version():
+        raise HTTPException(status_code=409, detail=f"Schema is at version {get_schema_version()}, not {expected_version}")
+    
+    # SQLite needs a real file to open; it is only ever opened read-only
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "upload.db")
+        with open(path, "wb") as spool:
+            await spool_upload(request, spool)
+        try:
+            args = await asyncio.to_thread(sqlite_import.sqlite_schema_args, path, schema_name)
+        except sqlite3.DatabaseError as e:
+            raise HTTPException(status_code=422, detail={"error": f"Not a readable SQLite database: {e}"})
+    return await load_imported(args, "sqlite", expected_version, session_id, render)
+
+
+@app.delete("/schema")
+async def delete_schema(session_id: str = "default", expected_version: Optional[int] = None):
+    async with admission.session_lock(session_id):
+        if expected_version is not None and expected_version != get_schema_version():
+            raise HTTPException(status_code=409, detail=f"Schema is at version {get_schema_version()}, not {expected_version}")
+        reset_schema()
+        metrics.inc("schemaforge_direct_edits_total", action="reset_schema")
+        note_direct_edit(session_id, "Cleared the whole schema.")
+        return {"schema_version": get_schema_version(), "schema_data": None}
+
+
+@app.post("/schema/operations")
+async def post_schema_operations(request: OperationsRequest, render: bool = True):
+    operations = [op.model_dump(exclude_none=True) for op in request.operations]
+    return await run_operations(operations, request.expected_version, request.session_id, render)
+
+
+@app.post("/schema/entities")
+async def post_entity(entity: Entity, expected_version: Optional[int] = None, session_id: str = "default", render: bool = True):
+    operations = [{"action": "add_entity", "data": entity.model_dump()}]
+    return await run_operations(operations, expected_version, session_id, render)
+
+
+@app.delete("/schema/entities/{name}")
+async def delete_entity(name: str, expected_version: Optional[int] = None, session_id: str = "default", render: bool = True):
+    operations = [{"action": "remove_entity", "data": {"name": name}}]
+    return await run_operations(operations, expected_version, session_id, render)
+
+
+@app.post("/schema/entities/{name}/attributes")
+async def post_attribute(name: str, attribute: Attribute, expected_version: Optional[int] = None, session_id: str = "default", render: bool = True):
+    operations = [{"action": "add_attribute", "target_entity": name, "data": attribute.model_dump()}]
+    return await run_operations(operations, expected_version, session_id, render)
+
+
+@app.delete("/schema/entities/{name}/attributes/{attribute}")
+async def delete_attribute(name: str, attribute: str, expected_version: Optional[int] = None, session_id: str = "default", render: bool = True):
+    operations = [{"action": "remove_attribute", "target_entity": name, "data": {"name": attribute}}]
+    return await run_operations(operations, expected_version, session_id, render)
+
+
+@app.post("/schema/relationships")
+async def post_relationship(relationship: Relationship, expected_version: Optional[int] = None, session_id: str = "default", render: bool = True):
+    operations = [{"action": "add_relationship", "data": relationship.model_dump()}]
+    return await run_operations(operations, expected_version, session_id, render)
+
+
+@app.delete("/schema/relationships/{name}")
+async def delete_relationship(name: str, expected_version: Optional[int] = None, session_id: str = "default", render: bool = True):
+    operations = [{"action": "remove_relationship", "data": {"name": name}}]
+    return await run_operations(operations, expected_version, session_id, render)
+
+
+@app.get("/schema/focus")
+async def get_schema_focus(entity: str, hops: int = 1):
+    if hops < 0:
+        raise HTTPException(status_code=400, detail="hops must be 0 or more")
+    if get_current_schema() is None:
+        raise HTTPException(status_code=404, detail="No schema exists yet")
+    
+    focused = focus_schema(entity, hops)
+    if focused is None:
+        raise HTTPException(status_code=404, detail=f"Entity '{entity}' not found")
+    
+    return {
+        "entity": entity,
+        "hops": hops,
+        "schema_data": focused.model_dump(),
+        "diagram_html": schema_to_interactive_html(focused),
+        "mermaid_code": schema_to_mermaid(focused)
+    }
+
+
+@app.get("/schema/mermaid_parts")
+async def get_schema_mermaid_parts(max_tables: int = MAX_CLUSTER_SIZE):
+    if max_tables < 1:
+        raise HTTPException(status_code=400, detail="max_tables must be at least 1")
+    schema = get_current_schema()
+    if schema is None:
+        raise HTTPException(status_code=404, detail="No schema exists yet")
+    return schema_to_mermaid_parts(max_tables=max_tables)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,153 @@
+import functools
+import os
+import threading
+import time
+
+# Opt-in: with metrics off every call below is a cheap no-op
+METRICS_ENABLED = os.getenv("METRICS", "0") == "1"
+
+# Histogram buckets in seconds (Prometheus client defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "schemaforge_phase_seconds": ("histogram", "Time spent per phase of a request"),
+    "schemaforge_http_request_seconds": ("histogram", "Total HTTP request time, including serialization"),
+    "schemaforge_tool_calls_total": ("counter", "Tool calls made by the model, per tool"),
+    "schemaforge_fast_path_total": ("counter", "Chat messages handled by the local command parser (hit) or sent to the LLM (miss)"),
+    "schemaforge_llm_requests_total": ("counter", "Routed model calls completed, per provider"),
+    "schemaforge_llm_hedges_total": ("counter", "Hedged requests fired after the first provider passed its p95"),
+    "schemaforge_chat_deduplicated_total": ("counter", "Chat requests answered by an identical turn already in flight"),
+    "schemaforge_chat_rejected_total": ("counter", "Chat requests refused with 429 because the queue was full"),
+    "schemaforge_llm_queue_depth": ("gauge", "Model calls waiting for a scheduler slot, per priority class"),
+    "schemaforge_llm_queue_wait_seconds": ("histogram", "Time model calls waited for a scheduler slot, per priority class"),
+    "schemaforge_ddl_exports_total": ("counter", "DDL downloads, per dialect and whether the per-version cache had them"),
+    "schemaforge_schema_repairs_total": ("counter", "Rejected propose/modify calls sent back to the model for a fix, per tool"),
+    "schemaforge_direct_edits_total": ("counter", "Schema edits made through the REST API, per action"),
+    "schemaforge_schema_entities": ("gauge", "Entities in the current schema"),
+    "schemaforge_schema_relationships": ("gauge", "Relationships in the current schema"),
+    "schemaforge_sessions": ("gauge", "Conversation sessions held in memory"),
+}
+
+# {name: {labels tuple: value}}; histograms hold [bucket counts..., sum, count]
+counters = {}
+gauges = {}
+histograms = {}
+_lock = threading.Lock()
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Increase a counter"""
+    if not METRICS_ENABLED:
+        return
+    key = _key(labels)
+    with _lock:
+        series = counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels):
+    """Set a gauge to a value"""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        gauges.setdefault(name, {})[_key(labels)] = value
+
+
+def observe(name: str, seconds: float, **labels):
+    """Record one observation in a histogram"""
+    if not METRICS_ENABLED:
+        return
+    key = _key(labels)
+    with _lock:
+        series = histograms.setdefault(name, {})
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                values[i] += 1
+        values[-2] += seconds
+        values[-1] += 1
+
+
+class _Span:
+    """Times a block into schemaforge_phase_seconds{phase=...}"""
+
+    __slots__ = ("phase", "start")
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("schemaforge_phase_seconds", time.perf_counter() - self.start, phase=self.phase)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(phase: str):
+    """Context manager timing one phase; a shared no-op when metrics are off"""
+    if not METRICS_ENABLED:
+        return _NO_SPAN
+    return _Span(phase)
+
+
+def timed(phase: str):
+    """Decorator timing every call of a function as one phase"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return func(*args, **kwargs)
+            with _Span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _labels_text(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for store in (counters, gauges, histograms):
+            for name, series in store.items():
+                kind, help_text = HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in series.items():
+                    if store is histograms:
+                        for bound, count in zip(BUCKETS, value):
+                            lines.append(f"{name}_bucket{_labels_text(key, (('le', str(bound)),))} {count}")
+                        lines.append(f"{name}_bucket{_labels_text(key, (('le', '+Inf'),))} {value[-1]}")
+                        lines.append(f"{name}_sum{_labels_text(key)} {value[-2]}")
+                        lines.append(f"{name}_count{_labels_text(key)} {value[-1]}")
+                    else:
+                        lines.append(f"{name}{_labels_text(key)} {value}")
+    return "\n".join(lines) + "\n"
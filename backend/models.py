@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import Optional, Literal, Union, Annotated
+from pydantic import BaseModel, Field
 
 # A single column in a table
 class Attribute(BaseModel):
@@ -25,4 +25,51 @@ class Relationship(BaseModel):
 class Schema(BaseModel):
     schema_name: str
     entities: list[Entity]
-    relationships: list[Relationship]
\ No newline at end of file
+    relationships: list[Relationship]
+
+
+# modify_schema operations, one model per action
+
+# A reference to something by name
+class NameRef(BaseModel):
+    name: str
+
+class AddEntityOp(BaseModel):
+    action: Literal["add_entity"]
+    data: Entity
+
+class RemoveEntityOp(BaseModel):
+    action: Literal["remove_entity"]
+    data: NameRef
+
+class AddAttributeOp(BaseModel):
+    action: Literal["add_attribute"]
+    target_entity: str
+    data: Attribute
+
+class RemoveAttributeOp(BaseModel):
+    action: Literal["remove_attribute"]
+    target_entity: str
+    data: NameRef
+
+class AddRelationshipOp(BaseModel):
+    action: Literal["add_relationship"]
+    data: Relationship
+
+class RemoveRelationshipOp(BaseModel):
+    action: Literal["remove_relationship"]
+    data: NameRef
+
+# One modify_schema call, picked by its "action"
+SchemaOperation = Annotated[
+    Union[AddEntityOp, RemoveEntityOp, AddAttributeOp, RemoveAttributeOp, AddRelationshipOp, RemoveRelationshipOp],
+    Field(discriminator="action")
+]
+
+
+# A query shape the user expects to run often, for the index advisor
+class AccessPattern(BaseModel):
+    entity: str
+    equals: list[str] = []    # columns compared with =
+    range: list[str] = []     # columns compared with <, >, BETWEEN
+    order_by: list[str] = []
@@ -0,0 +1,121 @@
+import heapq
+
+# Mermaid gets slow past this many tables in one erDiagram
+MAX_CLUSTER_SIZE = 40
+
+
+def build_adjacency(schema) -> dict:
+    """Build an undirected entity adjacency index from the relationships"""
+    # Dicts as ordered sets, so clusters come out the same on every run
+    adjacency = {entity.name: {} for entity in schema.entities}
+
+    for rel in schema.relationships:
+        if rel.from_entity not in adjacency or rel.to_entity not in adjacency:
+            continue
+        if rel.from_entity == rel.to_entity:
+            continue
+        adjacency[rel.from_entity][rel.to_entity] = True
+        adjacency[rel.to_entity][rel.from_entity] = True
+
+    return adjacency
+
+
+def connected_components(adjacency: dict) -> list:
+    """Split the entity graph into connected components (keeps schema order)"""
+    seen = set()
+    components = []
+
+    for start in adjacency:
+        if start in seen:
+            continue
+        seen.add(start)
+        component = []
+        queue = [start]
+        while queue:
+            name = queue.pop()
+            component.append(name)
+            for neighbour in adjacency[name]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        components.append(component)
+
+    return components
+
+
+def split_component(component: list, adjacency: dict, max_size: int) -> list:
+    """Greedily grow clusters of at most max_size tables inside one component.
+
+    Each cluster starts from the best-connected unassigned table and keeps
+    absorbing the neighbour with the most links into the cluster, which keeps
+    densely connected tables together and cuts few relationships.
+    """
+    if len(component) <= max_size:
+        return [component]
+
+    order = {name: i for i, name in enumerate(component)}
+    unassigned = set(component)
+    clusters = []
+
+    # Seeds in order of degree, highest first
+    seeds = sorted(component, key=lambda n: (-len(adjacency[n]), order[n]))
+
+    for seed in seeds:
+        if seed not in unassigned:
+            continue
+        unassigned.discard(seed)
+        cluster = [seed]
+        links = {}
+        heap = []
+
+        def push_neighbours(name):
+            for neighbour in adjacency[name]:
+                if neighbour in unassigned:
+                    links[neighbour] = links.get(neighbour, 0) + 1
+                    heapq.heappush(heap, (-links[neighbour], order[neighbour], neighbour))
+
+        push_neighbours(seed)
+        while heap and len(cluster) < max_size:
+            count, _, name = heapq.heappop(heap)
+            # Skip stale heap entries
+            if name not in unassigned or -count != links[name]:
+                continue
+            unassigned.discard(name)
+            cluster.append(name)
+            push_neighbours(name)
+
+        clusters.append(cluster)
+
+    return clusters
+
+
+def partition_schema(schema, max_size: int = MAX_CLUSTER_SIZE) -> list:
+    """Partition schema entities into clusters of at most max_size tables.
+
+    Large connected components are split, small ones (including isolated
+    tables and split leftovers) are packed together so we don't emit dozens
+    of tiny diagrams.
+    """
+    adjacency = build_adjacency(schema)
+
+    clusters = []
+    small = []
+    for component in connected_components(adjacency):
+        for cluster in split_component(component, adjacency, max_size):
+            if len(cluster) * 2 > max_size:
+                clusters.append(cluster)
+            else:
+                small.append(cluster)
+
+    # Pack small components and split leftovers, largest first, into bins of max_size
+    small.sort(key=len, reverse=True)
+    bins = []
+    for component in small:
+        for bin_ in bins:
+            if len(bin_) + len(component) <= max_size:
+                bin_.extend(component)
+                break
+        else:
+            bins.append(list(component))
+
+    return clusters + bins
@@ -0,0 +1,75 @@
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: register the system prompt + tool declarations with the provider once
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE", "0") == "1"
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "3600"))
+
+# Refresh this long before the provider would expire the cache
+REFRESH_MARGIN = 60
+
+# After a failed registration, send the prefix inline for this long before retrying
+RETRY_AFTER = 300
+
+
+class PromptCache:
+    """Holds a provider cache handle for a static prompt prefix.
+
+    `create(ttl)` uploads the prefix and returns (handle, expires_at). The
+    handle is reused until shortly before it expires, then re-created on the
+    next call. If the provider refuses (e.g. prefix below its minimum size),
+    get() returns None and callers send the prefix inline.
+    """
+
+    def __init__(self, create, ttl: int = PROMPT_CACHE_TTL):
+        self.create = create
+        self.ttl = ttl
+        self.handle = None
+        self.expires_at = 0
+        self.retry_at = 0
+        self.uploads = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        now = time.time()
+        with self.lock:
+            if self.handle is not None and now < self.expires_at - REFRESH_MARGIN:
+                return self.handle
+            if now < self.retry_at:
+                return None
+            try:
+                self.handle, self.expires_at = self.create(self.ttl)
+                self.uploads += 1
+            except Exception as e:
+                logger.warning("Prompt cache unavailable, sending the prefix inline for %ss: %s", RETRY_AFTER, str(e)[:200])
+                metrics.inc("schemaforge_prompt_cache_failures_total")
+                self.handle = None
+                self.retry_at = now + RETRY_AFTER
+            return self.handle
+
+    def invalidate(self):
+        """Forget the handle, e.g. after the provider reported it missing"""
+        with self.lock:
+            self.handle = None
+            self.expires_at = 0
+
+
+def is_cache_error(error: Exception, handle: str = None) -> bool:
+    """Whether a provider error means the cache handle is gone or invalid.
+
+    Gemini answers a request naming a missing, expired or foreign cache with a
+    400/403/404 APIError about the cached content; anything else (quota, bad
+    request, a model that is not found) is a real error and not retried inline.
+    """
+    if getattr(error, "code", None) not in (400, 403, 404):
+        return False
+    text = str(getattr(error, "message", None) or error).lower()
+    if handle and handle.lower() in text:
+        return True
+    return "cachedcontent" in text or "cached content" in text or "cached_content" in text
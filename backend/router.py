@@ -0,0 +1,301 @@
+import asyncio
+import contextlib
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import deque
+
+import metrics
+from validation import to_native
+
+# Opt-in: route turns across Gemini and Groq instead of always using Gemini
+ROUTER_ENABLED = os.getenv("LLM_ROUTER", "0") == "1"
+
+# Fire a second request to the other provider once the first passes its p95
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "1") == "1"
+
+# Provider trusted with propose_schema and schema edits
+STRONG_PROVIDER = os.getenv("LLM_STRONG_PROVIDER", "gemini")
+
+# Hedge delay in seconds until a provider has MIN_SAMPLES latencies recorded
+DEFAULT_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "3.0"))
+MIN_SAMPLES = 20
+
+# Latencies kept per provider for the median/p95 estimates
+WINDOW = 200
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+
+
+# ============== MESSAGES ==============
+# Provider-neutral history: {"role": "user" | "assistant", "text": str | None,
+# "tool_call": {"name": str, "args": dict} | None}
+
+def from_gemini(contents: list) -> list:
+    """Neutral messages from a Gemini history"""
+    messages = []
+    for content in contents:
+        role = "user" if content.role == "user" else "assistant"
+        for part in content.parts or []:
+            if part.function_call:
+                messages.append({"role": role, "text": None, "tool_call": {
+                    "name": part.function_call.name, "args": to_native(part.function_call.args or {})}})
+            elif part.text:
+                messages.append({"role": role, "text": part.text, "tool_call": None})
+    return messages
+
+
+def to_gemini(messages: list) -> list:
+    from google.genai import types
+
+    contents = []
+    for m in messages:
+        if m["tool_call"]:
+            part = types.Part.from_function_call(name=m["tool_call"]["name"], args=m["tool_call"]["args"])
+        else:
+            part = types.Part.from_text(text=m["text"])
+        contents.append(types.Content(role="user" if m["role"] == "user" else "model", parts=[part]))
+    return contents
+
+
+def describe_tool_call(call: dict) -> str:
+    """Tool call as assistant text, the way the Groq entry points keep history"""
+    if call["name"] == "ask_clarification":
+        options = call["args"].get("options") or []
+        text = call["args"].get("question", "")
+        return text + ("\n\nOptions:\n" + "\n".join(f"  - {o}" for o in options) if options else "")
+    if call["name"] == "propose_schema":
+        return "(Proposed a schema, see the current schema.)"
+    return f"Called {call['name']} with {json.dumps(call['args'])}"
+
+
+def to_groq(messages: list) -> list:
+    return [
+        {"role": m["role"], "content": describe_tool_call(m["tool_call"]) if m["tool_call"] else m["text"]}
+        for m in messages
+    ]
+
+
+def to_gemini_response(reply: dict):
+    """Wrap a routed reply as a Gemini response, so chat handlers treat it like any other"""
+    from google.genai import types
+
+    if reply["tool_name"]:
+        part = types.Part.from_function_call(name=reply["tool_name"], args=reply["tool_args"])
+    else:
+        part = types.Part.from_text(text=reply["text"] or "")
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))]
+    )
+
+
+# ============== PROVIDERS ==============
+
+class Provider:
+    """One LLM backend; `call(messages)` returns (reply dict, raw response).
+
+    A reply is {"tool_name", "tool_args", "text"}, the same for every provider.
+    """
+
+    def __init__(self, name: str, call):
+        self.name = name
+        self.call = call
+        self.latencies = deque(maxlen=WINDOW)
+        self.lock = threading.Lock()
+
+    def add_latency(self, seconds: float):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def median(self):
+        """Median latency, or None while there are too few samples"""
+        with self.lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return None
+            return statistics.median(self.latencies)
+
+    def p95(self) -> float:
+        with self.lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return DEFAULT_HEDGE_DELAY
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def gemini_provider(generate) -> Provider:
+    """Gemini through `generate(contents)` (system prompt and tools included)"""
+    def call(messages):
+        response = generate(to_gemini(messages))
+        reply = {"tool_name": None, "tool_args": None, "text": None}
+        if response.candidates and response.candidates[0].content.parts:
+            for part in response.candidates[0].content.parts:
+                if part.function_call:
+                    reply.update(tool_name=part.function_call.name, tool_args=to_native(part.function_call.args or {}))
+                    break
+                if part.text:
+                    reply["text"] = part.text
+                    break
+        return reply, response
+    return Provider("gemini", call)
+
+
+def groq_provider(client, system_prompt: str, tools: list, model: str = GROQ_MODEL, context=None) -> Provider:
+    """Groq chat completions with the OpenAI-style TOOLS.
+
+    `context()` may return text (e.g. the current schema) put in front of the
+    last user message, as the Gemini entry points do.
+    """
+    def call(messages):
+        groq_messages = to_groq(messages)
+        state = context() if context else None
+        if state and groq_messages and groq_messages[-1]["role"] == "user":
+            groq_messages[-1] = {"role": "user", "content": f"{state}\n\n{groq_messages[-1]['content']}"}
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": system_prompt}] + groq_messages,
+            tools=tools,
+            tool_choice="auto"
+        )
+        message = response.choices[0].message
+        if message.tool_calls:
+            function = message.tool_calls[0].function
+            return {"tool_name": function.name, "tool_args": json.loads(function.arguments), "text": None}, response
+        return {"tool_name": None, "tool_args": None, "text": message.content}, response
+    return Provider("groq", call)
+
+
+class FakeProvider(Provider):
+    """Local stand-in with a configurable latency distribution, for testing routing.
+
+    Latency is lognormal around `median` seconds; with probability `tail_rate`
+    a call takes `tail` seconds instead (a slow replica, a queueing spike...).
+    """
+
+    def __init__(self, name: str, median: float, sigma: float = 0.3, tail_rate: float = 0.0,
+                 tail: float = 0.0, seed: int = 0):
+        super().__init__(name, self.fake_call)
+        self.median_latency = median
+        self.sigma = sigma
+        self.tail_rate = tail_rate
+        self.tail = tail
+        self.rng = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        if self.rng.random() < self.tail_rate:
+            return self.tail
+        return self.rng.lognormvariate(0, self.sigma) * self.median_latency
+
+    def fake_call(self, messages):
+        time.sleep(self.sample_latency())
+        return {"tool_name": "ask_clarification", "tool_args": {"question": self.name}, "text": None}, None
+
+
+# ============== ROUTING ==============
+
+def turn_kind(messages: list, has_schema: bool) -> str:
+    """Guess the next model turn: "clarify", "propose" or "edit".
+
+    The system prompt asks for clarifying questions before a proposal, so once
+    one has been answered the next turn may well be the (expensive) proposal.
+    """
+    if has_schema:
+        return "edit"
+    asked = any(m["tool_call"] and m["tool_call"]["name"] == "ask_clarification" for m in messages)
+    return "propose" if asked else "clarify"
+
+
+class Router:
+    """Sends each turn to one provider and hedges to the other past its p95"""
+
+    def __init__(self, providers: list, strong: str = STRONG_PROVIDER, hedge: bool = HEDGE_ENABLED):
+        self.providers = providers
+        self.strong = next((p for p in providers if p.name == strong), providers[0])
+        self.hedge = hedge
+
+    def pick(self, kind: str) -> list:
+        """Providers in the order to try them for this kind of turn"""
+        if kind == "clarify":
+            # Fastest observed median first; until measured, the non-strong one
+            def speed(p):
+                median = p.median()
+                return (median is None, median or 0, p is self.strong)
+            return sorted(self.providers, key=speed)
+        return [self.strong] + [p for p in self.providers if p is not self.strong]
+
+    def run(self, provider: Provider, messages: list, record):
+        start = time.perf_counter()
+        try:
+            reply, raw = provider.call(messages)
+        finally:
+            # Losing hedges are timed too, or the p95 would only see fast calls
+            provider.add_latency(time.perf_counter() - start)
+        if record:
+            record(provider.name, raw)
+        metrics.inc("schemaforge_llm_requests_total", provider=provider.name)
+        return dict(reply, provider=provider.name)
+
+    async def leg(self, provider: Provider, messages: list, record, slot, settled: asyncio.Event):
+        """One provider call, holding a slot from `slot()` until the call returns.
+
+        A leg still queued for its slot when the turn is settled makes no call.
+        A running one is left to finish (its thread cannot be stopped), so the
+        slot stays taken while the provider is still working on it.
+        """
+        async with slot():
+            if settled.is_set():
+                return None
+            reply = await asyncio.to_thread(self.run, provider, messages, record)
+            # Before the slot is released, which may hand it to this turn's queued hedge
+            settled.set()
+            return reply
+
+    async def complete(self, messages: list, kind: str, record=None, slot=None) -> dict:
+        """Reply to the conversation, adding {"provider": name}.
+
+        `record(provider_name, raw_response)` is called for every finished call,
+        including a hedge that lost, so token usage stays accurate. `slot()`
+        returns an async context manager (e.g. a scheduler slot) held by each
+        call, hedges included.
+        """
+        stats["requests"] += 1
+        settled = asyncio.Event()
+        try:
+            return await self.race(messages, kind, record, slot or contextlib.nullcontext, settled)
+        finally:
+            settled.set()
+
+    async def race(self, messages: list, kind: str, record, slot, settled: asyncio.Event) -> dict:
+        """The primary call, hedged or failed over to the next provider"""
+        order = self.pick(kind)
+        primary = asyncio.ensure_future(self.leg(order[0], messages, record, slot, settled))
+        if len(order) == 1:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=order[0].p95() if self.hedge else None)
+        if primary in done and primary.exception() is None:
+            return primary.result()
+
+        if primary in done:
+            stats["failovers"] += 1
+        else:
+            stats["hedges"] += 1
+            metrics.inc("schemaforge_llm_hedges_total", provider=order[1].name)
+        backup = asyncio.ensure_future(self.leg(order[1], messages, record, slot, settled))
+
+        running = {primary, backup} - {t for t in done if t.exception() is not None}
+        error = primary.exception() if primary in done else None
+        while running:
+            finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif task.result() is not None:
+                    if task is backup and primary not in done:
+                        stats["hedge_wins"] += 1
+                    return task.result()
+        raise error
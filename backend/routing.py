@@ -0,0 +1,245 @@
+BOX_WIDTH = 240
+CELL_SIZE = 200
+
+# Clearance kept around entity boxes, and length of the first/last segment
+MARGIN = 12
+STUB = 24
+
+# Detour channels tried per axis when the direct routes are blocked
+MAX_CHANNELS = 4
+
+# Candidate routes evaluated per edge before settling for the least bad one
+MAX_ATTEMPTS = 24
+
+LABEL_WIDTH = 90
+LABEL_HEIGHT = 28
+
+# Unit vectors pointing out of each side of a box
+SIDES = {
+    "top": (0, -1),
+    "bottom": (0, 1),
+    "left": (-1, 0),
+    "right": (1, 0),
+}
+
+
+class SpatialGrid:
+    """Uniform grid over axis-aligned rectangles for fast overlap queries"""
+
+    def __init__(self, cell_size: int = CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rects = {}
+
+    def _cells_for(self, rect):
+        x1, y1, x2, y2 = rect
+        size = self.cell_size
+        for cx in range(int(x1 // size), int(x2 // size) + 1):
+            for cy in range(int(y1 // size), int(y2 // size) + 1):
+                yield (cx, cy)
+
+    def insert(self, key, rect):
+        self.rects[key] = rect
+        for cell in self._cells_for(rect):
+            self.cells.setdefault(cell, []).append(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        for cell in self._cells_for(rect):
+            keys = self.cells.get(cell)
+            if keys and key in keys:
+                keys.remove(key)
+
+    def query(self, rect, ignore=()) -> list:
+        """Return keys whose rectangles overlap rect"""
+        x1, y1, x2, y2 = rect
+        found = []
+        seen = set(ignore)
+        for cell in self._cells_for(rect):
+            for key in self.cells.get(cell, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                rx1, ry1, rx2, ry2 = self.rects[key]
+                if x1 < rx2 and rx1 < x2 and y1 < ry2 and ry1 < y2:
+                    found.append(key)
+        return found
+
+
+def entity_boxes(positions: dict, entity_heights: dict) -> dict:
+    """Rectangles (x1, y1, x2, y2) of every positioned entity"""
+    return {
+        name: (pos["x"], pos["y"], pos["x"] + BOX_WIDTH, pos["y"] + entity_heights.get(name, 100))
+        for name, pos in positions.items()
+    }
+
+
+def port(rect, side: str) -> tuple:
+    """Middle point of one side of a box"""
+    x1, y1, x2, y2 = rect
+    if side == "top":
+        return ((x1 + x2) / 2, y1)
+    if side == "bottom":
+        return ((x1 + x2) / 2, y2)
+    if side == "left":
+        return (x1, (y1 + y2) / 2)
+    return (x2, (y1 + y2) / 2)
+
+
+def segment_rect(a, b) -> tuple:
+    """Bounding rectangle of an axis-aligned segment"""
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]) + 0.01, max(a[1], b[1]) + 0.01)
+
+
+def simplify(points: list) -> list:
+    """Drop repeated and collinear points"""
+    result = []
+    for p in points:
+        if result and p == result[-1]:
+            continue
+        if len(result) >= 2:
+            a, b = result[-2], result[-1]
+            if (a[0] == b[0] == p[0]) or (a[1] == b[1] == p[1]):
+                result[-1] = p
+                continue
+        result.append(p)
+    return result
+
+
+def middle_paths(s0, s1, channels_x, channels_y) -> list:
+    """Orthogonal connections between two stub ends (L, Z and U shapes)"""
+    (x0, y0), (x1, y1) = s0, s1
+    paths = [
+        [s0, (x1, y0), s1],
+        [s0, (x0, y1), s1],
+    ]
+    for cx in channels_x:
+        paths.append([s0, (cx, y0), (cx, y1), s1])
+    for cy in channels_y:
+        paths.append([s0, (x0, cy), (x1, cy), s1])
+    return paths
+
+
+def collisions(points: list, grid: SpatialGrid, own: tuple, limit: float = float("inf")) -> list:
+    """Obstacles hit by a route. The stubs may touch their own entity.
+
+    Stops counting once more than `limit` obstacles were hit, since the
+    caller already has a better candidate.
+    """
+    hits = []
+    last = len(points) - 2
+    for i in range(len(points) - 1):
+        ignore = own if i == 0 or i == last else ()
+        hits.extend(grid.query(segment_rect(points[i], points[i + 1]), ignore))
+        if len(hits) > limit:
+            break
+    return hits
+
+
+def route_length(points: list) -> float:
+    return sum(abs(a[0] - b[0]) + abs(a[1] - b[1]) for a, b in zip(points, points[1:]))
+
+
+def side_pairs(from_rect, to_rect) -> list:
+    """The four most promising (from side, to side) pairs, closest ports first"""
+    pairs = []
+    for from_side in SIDES:
+        for to_side in SIDES:
+            a = port(from_rect, from_side)
+            b = port(to_rect, to_side)
+            pairs.append((abs(a[0] - b[0]) + abs(a[1] - b[1]), from_side, to_side))
+    pairs.sort()
+    return [(f, t) for _, f, t in pairs[:4]]
+
+
+def route_edge(from_name: str, to_name: str, boxes: dict, grid: SpatialGrid) -> list:
+    """Find an orthogonal path between two entities avoiding other boxes.
+
+    Tries L/Z/U shaped candidates per side pair, at most MAX_ATTEMPTS in all.
+    Channels start at the midpoints and are extended with the edges of
+    whatever obstacles the previous round hit, so cost stays bounded per edge.
+    """
+    from_rect, to_rect = boxes[from_name], boxes[to_name]
+    own = (from_name, to_name)
+    best = None
+    attempts = 0
+
+    for from_side, to_side in side_pairs(from_rect, to_rect):
+        p0, p1 = port(from_rect, from_side), port(to_rect, to_side)
+        d0, d1 = SIDES[from_side], SIDES[to_side]
+        s0 = (p0[0] + d0[0] * STUB, p0[1] + d0[1] * STUB)
+        s1 = (p1[0] + d1[0] * STUB, p1[1] + d1[1] * STUB)
+
+        channels_x = [(s0[0] + s1[0]) / 2]
+        channels_y = [(s0[1] + s1[1]) / 2]
+        for _ in range(2):
+            hit_rects = []
+            for middle in middle_paths(s0, s1, channels_x, channels_y):
+                if attempts >= MAX_ATTEMPTS:
+                    return best[1]
+                attempts += 1
+                points = simplify([p0] + middle + [p1])
+                hits = collisions(points, grid, own, best[0][0] if best else float("inf"))
+                score = (len(hits), len(points), route_length(points))
+                if best is None or score < best[0]:
+                    best = (score, points)
+                if not hits:
+                    break
+                hit_rects.extend(grid.rects[h] for h in hits)
+            if best[0][0] == 0 or not hit_rects:
+                break
+            # Retry through the free space just outside the obstacles we hit,
+            # keeping only the channels nearest the straight-line midpoint
+            mid_x, mid_y = channels_x[0], channels_y[0]
+            channels_x = {r[0] - MARGIN for r in hit_rects} | {r[2] + MARGIN for r in hit_rects}
+            channels_y = {r[1] - MARGIN for r in hit_rects} | {r[3] + MARGIN for r in hit_rects}
+            channels_x = sorted(channels_x, key=lambda c: abs(c - mid_x))[:MAX_CHANNELS]
+            channels_y = sorted(channels_y, key=lambda c: abs(c - mid_y))[:MAX_CHANNELS]
+        if best[0][0] == 0 and best[0][1] <= 4:
+            break
+
+    return best[1]
+
+
+def place_label(points: list, boxes_grid: SpatialGrid, labels_grid: SpatialGrid, key) -> tuple:
+    """Pick a label centre on the route that overlaps no box or earlier label"""
+    segments = sorted(zip(points, points[1:]), key=lambda s: -(abs(s[0][0] - s[1][0]) + abs(s[0][1] - s[1][1])))
+    fallback = None
+
+    for a, b in segments:
+        for t in (0.5, 0.3, 0.7, 0.15, 0.85):
+            cx = a[0] + (b[0] - a[0]) * t
+            cy = a[1] + (b[1] - a[1]) * t
+            rect = (cx - LABEL_WIDTH / 2, cy - LABEL_HEIGHT / 2, cx + LABEL_WIDTH / 2, cy + LABEL_HEIGHT / 2)
+            if fallback is None:
+                fallback = (cx, cy, rect)
+            if not boxes_grid.query(rect) and not labels_grid.query(rect):
+                labels_grid.insert(key, rect)
+                return (cx, cy)
+
+    cx, cy, rect = fallback
+    labels_grid.insert(key, rect)
+    return (cx, cy)
+
+
+def route_relationships(relationships: list, positions: dict, entity_heights: dict) -> list:
+    """Route every relationship. Returns one {"points", "label"} per relationship (None if unplaced)."""
+    boxes = entity_boxes(positions, entity_heights)
+
+    grid = SpatialGrid()
+    for name, (x1, y1, x2, y2) in boxes.items():
+        grid.insert(name, (x1 - MARGIN, y1 - MARGIN, x2 + MARGIN, y2 + MARGIN))
+    labels_grid = SpatialGrid()
+
+    routes = []
+    for i, rel in enumerate(relationships):
+        if rel.from_entity not in boxes or rel.to_entity not in boxes:
+            routes.append(None)
+            continue
+        points = route_edge(rel.from_entity, rel.to_entity, boxes, grid)
+        label = place_label(points, grid, labels_grid, i)
+        routes.append({"points": points, "label": label})
+
+    return routes
@@ -0,0 +1,113 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import time
+
+import metrics
+
+# Model calls running at once, overall and per tenant (session or API key)
+MAX_CONCURRENT = int(os.getenv("SCHED_MAX_CONCURRENT", "4"))
+TENANT_CONCURRENT = int(os.getenv("SCHED_TENANT_CONCURRENT", "2"))
+
+# Relative shares, e.g. "team-a=2,batch-key=0.5"; unlisted tenants weigh 1
+WEIGHTS = {
+    name.strip(): float(weight)
+    for name, _, weight in (item.partition("=") for item in os.getenv("SCHED_WEIGHTS", "").split(","))
+    if name.strip() and weight
+}
+
+# Priority classes: a lower class is always served first, WFQ applies within a class.
+# Speculative prefetches come last, so they never delay a turn someone is waiting on.
+PRIORITIES = {"clarify": 0, "edit": 1, "propose": 2, "speculative": 3}
+PRIORITY_NAMES = {v: k for k, v in PRIORITIES.items()}
+
+
+class Scheduler:
+    """Weighted fair queue for model calls with per-tenant and global caps.
+
+    Each request gets a virtual finish tag: start = max(virtual clock, the
+    tenant's previous finish), finish = start + cost / weight. Waiters are
+    served by (priority class, finish tag), skipping tenants at their cap,
+    so a tenant sending many large requests only gets its share.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, tenant_concurrent: int = TENANT_CONCURRENT,
+                 weights: dict = None):
+        self.max_concurrent = max_concurrent
+        self.tenant_concurrent = tenant_concurrent
+        self.weights = WEIGHTS if weights is None else weights
+        self.queue = []
+        self.seq = itertools.count()
+        self.virtual_time = 0.0
+        self.last_finish = {}
+        self.running = {}
+        self.running_total = 0
+
+    def depth(self, priority: int = None) -> int:
+        return sum(1 for entry in self.queue if not entry[4].done() and priority in (None, entry[0]))
+
+    def _dispatch(self):
+        """Grant slots to the best waiters while capacity is left"""
+        skipped = []
+        while self.queue and self.running_total < self.max_concurrent:
+            entry = heapq.heappop(self.queue)
+            priority, finish, _, tenant, future, start_tag = entry
+            if future.done():
+                continue
+            if self.running.get(tenant, 0) >= self.tenant_concurrent:
+                skipped.append(entry)
+                continue
+            self.running[tenant] = self.running.get(tenant, 0) + 1
+            self.running_total += 1
+            self.virtual_time = max(self.virtual_time, start_tag)
+            future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self.queue, entry)
+
+    async def acquire(self, tenant: str, priority: int = 1, cost: float = 1.0):
+        weight = self.weights.get(tenant, 1.0)
+        start_tag = max(self.virtual_time, self.last_finish.get(tenant, 0.0))
+        finish = start_tag + cost / weight
+        self.last_finish[tenant] = finish
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, finish, next(self.seq), tenant, future, start_tag))
+        self._dispatch()
+
+        label = PRIORITY_NAMES.get(priority, str(priority))
+        metrics.set_gauge("schemaforge_llm_queue_depth", self.depth(priority), priority=label)
+        waited = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted in the same tick we were cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release(tenant)
+            raise
+        finally:
+            metrics.set_gauge("schemaforge_llm_queue_depth", self.depth(priority), priority=label)
+        metrics.observe("schemaforge_llm_queue_wait_seconds", time.perf_counter() - waited, priority=label)
+
+    def release(self, tenant: str):
+        self.running[tenant] -= 1
+        self.running_total -= 1
+        if self.running[tenant] == 0:
+            del self.running[tenant]
+            # An idle tenant's old tags carry no credit forward, drop them
+            if self.last_finish.get(tenant, 0.0) <= self.virtual_time:
+                self.last_finish.pop(tenant, None)
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tenant: str, priority: int = 1, cost: float = 1.0):
+        """Hold one model-call slot for the duration of the block"""
+        await self.acquire(tenant, priority, cost)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+
+scheduler = Scheduler()
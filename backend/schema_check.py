@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+
+from models import Schema
+from ddl_export import plan_tables, topological_order, create_table_sql
+from validation import MAX_ERRORS_SHOWN
+
+# On by default: schema changes are compiled to SQLite DDL and executed before they are kept
+SCHEMA_GATE = os.getenv("SCHEMA_GATE", "1") == "1"
+
+# Times a rejected propose/modify call goes back to the model before the user sees the error
+REPAIR_ATTEMPTS = int(os.getenv("SCHEMA_REPAIR_ATTEMPTS", "2"))
+
+RELATIONSHIP_TYPES = {"one-to-one", "one-to-many", "many-to-one", "many-to-many"}
+
+# modify_schema actions that can introduce a problem (removals cannot)
+CHECKED_ACTIONS = {"add_entity", "add_attribute", "remove_attribute", "add_relationship"}
+
+# One warm in-memory database per thread. Each table is created alone in a
+# transaction that is rolled back: SQLite resolves references lazily, and a
+# catalog that grows with every table makes one big transaction quadratic.
+_local = threading.local()
+
+
+def connection() -> sqlite3.Connection:
+    conn = getattr(_local, "connection", None)
+    if conn is None:
+        conn = _local.connection = sqlite3.connect(":memory:", isolation_level=None)
+    return conn
+
+
+def check_schema(schema: Schema) -> list:
+    """Structural problems, as {"entity" or "relationship": name, "error": text} dicts.
+
+    Entities need a primary key, relationships a known type and existing
+    entities, and table names must be unique; everything else (duplicate
+    columns, broken keys...) is whatever SQLite refuses when the generated
+    DDL is executed. SQLite accepts any type name, so types are not checked.
+    """
+    problems = []
+    names = set()
+    for entity in schema.entities:
+        # Table names are case-insensitive in SQL
+        if entity.name.lower() in names:
+            problems.append({"entity": entity.name, "error": "defined more than once (names are case-insensitive)"})
+        names.add(entity.name.lower())
+        if not any(a.primary_key for a in entity.attributes):
+            problems.append({"entity": entity.name, "error": "no primary key"})
+    for rel in schema.relationships:
+        if rel.type not in RELATIONSHIP_TYPES:
+            problems.append({"relationship": rel.name,
+                             "error": f"type '{rel.type}' is not one of {', '.join(sorted(RELATIONSHIP_TYPES))}"})
+
+    tables, notes = plan_tables(schema)
+    for rel_name, problem in notes:
+        problems.append({"relationship": rel_name, "error": problem})
+
+    ordered, _ = topological_order(tables)
+    conn = connection()
+    for table in ordered:
+        conn.execute("BEGIN")
+        try:
+            conn.execute(create_table_sql(table, "sqlite", set()))
+        except sqlite3.Error as e:
+            if "relationship" in table:
+                problems.append({"relationship": table["relationship"], "error": f"junction table: {e}"})
+            else:
+                problems.append({"entity": table["name"], "error": str(e)})
+        finally:
+            conn.execute("ROLLBACK")
+    return problems
+
+
+def affected_entities(op) -> set:
+    """Lower-cased names of the entities a modify_schema operation touches"""
+    if op.action == "add_entity":
+        return {op.data.name.lower()}
+    if op.action in ("add_attribute", "remove_attribute"):
+        return {op.target_entity.lower()}
+    if op.action == "add_relationship":
+        return {op.data.from_entity.lower(), op.data.to_entity.lower()}
+    return set()
+
+
+def check_entities(schema: Schema, names: set) -> list:
+    """check_schema on just these entities, their relationships and the entities at the other end"""
+    relationships = [r for r in schema.relationships if r.from_entity.lower() in names or r.to_entity.lower() in names]
+    wanted = set(names)
+    for rel in relationships:
+        wanted.add(rel.from_entity.lower())
+        wanted.add(rel.to_entity.lower())
+    entities = [e for e in schema.entities if e.name.lower() in wanted]
+    return check_schema(Schema.model_construct(schema_name=schema.schema_name, entities=entities,
+                                               relationships=relationships))
+
+
+def new_problems(before: list, after: list) -> list:
+    """Problems in `after` that were not already there (an edit is not blamed for old ones)"""
+    seen = {tuple(sorted(p.items())) for p in before}
+    return [p for p in after if tuple(sorted(p.items())) not in seen]
+
+
+def format_problems(problems: list) -> str:
+    """One line per problem, in the style of the argument validation errors"""
+    lines = []
+    for p in problems[:MAX_ERRORS_SHOWN]:
+        where = f"entity '{p['entity']}'" if "entity" in p else f"relationship '{p['relationship']}'"
+        lines.append(f"{where}: {p['error']}")
+    if len(problems) > MAX_ERRORS_SHOWN:
+        lines.append(f"... and {len(problems) - MAX_ERRORS_SHOWN} more")
+    noun = "problem" if len(problems) == 1 else "problems"
+    return f"Schema check failed ({len(problems)} {noun}):\n" + "\n".join(lines)
+
+
+def repair_note(tool_name: str, result: dict) -> str:
+    """Message sending a rejected schema change back to the model"""
+    return (f"(Your {tool_name} call was rejected, nothing was changed.\n{result.get('error')}\n"
+            f"Fix these problems and call {tool_name} again.)")
+
+
+def needs_repair(tool_name: str, result: dict, attempts: int) -> bool:
+    return tool_name in ("propose_schema", "modify_schema") and not result.get("success") and attempts < REPAIR_ATTEMPTS
@@ -0,0 +1,117 @@
+import json
+import re
+from models import Schema, Attribute
+from validation import PROPOSE_ADAPTER
+
+# Compact, lossless text form of a Schema, one line per table:
+#
+#   schema ShopDB
+#   User(user_id INT PK NN, email VARCHAR(255) UQ, name TEXT)
+#   Order(order_id INT PK, user_id INT NN)
+#   places: User 1:N Order
+#
+# Flags: PK primary key, NN not null, UQ unique (absent flags are the model
+# defaults). Names that are not plain identifiers and types that would not
+# parse back are written as JSON strings.
+
+CARDINALITIES = {"one-to-one": "1:1", "one-to-many": "1:N", "many-to-one": "N:1", "many-to-many": "N:N"}
+RELATIONSHIP_TYPES = {v: k for k, v in CARDINALITIES.items()}
+
+_NAME = r'(?:[A-Za-z_][A-Za-z0-9_]*|"(?:[^"\\]|\\.)*")'
+_TYPE = r'(?:[^\s,()"]+(?:\([^()"]*\))?|"(?:[^"\\]|\\.)*")'
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+PLAIN_TYPE_RE = re.compile(r'[^\s,()"]+(?:\([^()"]*\))?')
+HEADER_RE = re.compile(rf"schema ({_NAME})")
+TABLE_RE = re.compile(rf"({_NAME})\((.*)\)")
+ATTRIBUTE_RE = re.compile(rf"\s*({_NAME}) ({_TYPE})((?: (?:PK|NN|UQ))*)\s*(,|$)")
+RELATIONSHIP_RE = re.compile(rf'({_NAME}): ({_NAME}) (1:1|1:N|N:1|N:N|"(?:[^"\\]|\\.)*") ({_NAME})')
+
+
+def quote_name(name: str) -> str:
+    return name if IDENTIFIER_RE.fullmatch(name) else json.dumps(name)
+
+
+def quote_type(sql_type: str) -> str:
+    return sql_type if PLAIN_TYPE_RE.fullmatch(sql_type) else json.dumps(sql_type)
+
+
+def unquote(token: str) -> str:
+    return json.loads(token) if token.startswith('"') else token
+
+
+def attribute_to_text(a: Attribute) -> str:
+    text = f"{quote_name(a.name)} {quote_type(a.type)}"
+    if a.primary_key:
+        text += " PK"
+    if not a.nullable:
+        text += " NN"
+    if a.unique:
+        text += " UQ"
+    return text
+
+
+def schema_to_text(schema: Schema) -> str:
+    """Encode a schema in the compact text form"""
+    lines = [f"schema {quote_name(schema.schema_name)}"]
+    for entity in schema.entities:
+        lines.append(f"{quote_name(entity.name)}({', '.join(attribute_to_text(a) for a in entity.attributes)})")
+    for rel in schema.relationships:
+        card = CARDINALITIES.get(rel.type) or json.dumps(rel.type)
+        lines.append(f"{quote_name(rel.name)}: {quote_name(rel.from_entity)} {card} {quote_name(rel.to_entity)}")
+    return "\n".join(lines)
+
+
+def parse_attributes(body: str, line_no: int) -> list:
+    attributes = []
+    pos = 0
+    while pos < len(body):
+        match = ATTRIBUTE_RE.match(body, pos)
+        if match is None:
+            raise ValueError(f"Line {line_no}: cannot parse attribute at {body[pos:pos + 30]!r}")
+        name, sql_type, flags, sep = match.groups()
+        attributes.append({
+            "name": unquote(name),
+            "type": unquote(sql_type),
+            "primary_key": "PK" in flags,
+            "nullable": "NN" not in flags,
+            "unique": "UQ" in flags
+        })
+        pos = match.end()
+        if not sep:
+            break
+    return attributes
+
+
+def text_to_schema(text: str) -> Schema:
+    """Parse the compact text form back into a Schema (raises ValueError)"""
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("Empty schema text")
+    header = HEADER_RE.fullmatch(lines[0].strip())
+    if header is None:
+        raise ValueError("Line 1: expected 'schema <name>'")
+
+    entities = []
+    relationships = []
+    for line_no, line in enumerate(lines[1:], start=2):
+        line = line.strip()
+        match = RELATIONSHIP_RE.fullmatch(line)
+        if match:
+            name, from_entity, card, to_entity = match.groups()
+            relationships.append({
+                "name": unquote(name),
+                "from_entity": unquote(from_entity),
+                "to_entity": unquote(to_entity),
+                "type": RELATIONSHIP_TYPES.get(card) or unquote(card)
+            })
+            continue
+        match = TABLE_RE.fullmatch(line)
+        if match is None:
+            raise ValueError(f"Line {line_no}: expected a table or a relationship")
+        entities.append({"name": unquote(match.group(1)), "attributes": parse_attributes(match.group(2), line_no)})
+
+    # Plain dicts first, then one compiled validation pass for the whole schema
+    return PROPOSE_ADAPTER.validate_python(
+        {"schema_name": unquote(header.group(1)), "entities": entities, "relationships": relationships}
+    )
@@ -0,0 +1,95 @@
+import asyncio
+import os
+
+# Opt-in: prefetch the model's reply to each suggested clarification option
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_PREFETCH", "0") == "1"
+
+# Max estimated prompt tokens spent on speculative requests per clarification turn
+SPECULATIVE_TOKEN_BUDGET = int(os.getenv("SPECULATIVE_TOKEN_BUDGET", "20000"))
+
+# In-flight branches per session: {"base": history length, "branches": {option: task}}
+pending = {}
+
+stats = {"started": 0, "hits": 0, "misses": 0, "cancelled": 0}
+
+
+def estimate_tokens(contents: list) -> int:
+    """Rough prompt size (4 characters per token) of a history"""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(str(part.function_call.args))
+    return chars // 4 + 1
+
+
+def cancel(session_id: str):
+    """Drop every pending branch of a session"""
+    entry = pending.pop(session_id, None)
+    if entry is None:
+        return
+    for task in entry["branches"].values():
+        if task.cancel():
+            stats["cancelled"] += 1
+
+
+def start(session_id: str, history: list, options: list, generate, user_content, extra_tokens: int = 0):
+    """Fire one background model call per option on a forked copy of the history.
+
+    `generate(contents)` is a coroutine function making the provider call, so
+    cancelling a branch aborts its request; `user_content(text)` builds a user
+    message. Branches are started in option order until the
+    token budget is used up. Nothing is written to the real history and no
+    tools are run; that only happens when the user picks an option.
+    """
+    cancel(session_id)
+    if not SPECULATIVE_ENABLED or not options:
+        return
+
+    cost = estimate_tokens(history) + extra_tokens
+    budget = SPECULATIVE_TOKEN_BUDGET
+    branches = {}
+    for option in options:
+        if cost > budget:
+            break
+        budget -= cost
+        forked = list(history) + [user_content(option)]
+        branches[option.strip().lower()] = asyncio.create_task(generate(forked))
+        stats["started"] += 1
+
+    if branches:
+        pending[session_id] = {"base": len(history), "branches": branches}
+
+
+async def take(session_id: str, message: str, base: int):
+    """Return the prefetched response for this message, or None.
+
+    `base` is the history length before the new user message; a branch forked
+    from a different history is never used. Losing branches are cancelled.
+    """
+    entry = pending.pop(session_id, None)
+    if entry is None:
+        return None
+
+    task = entry["branches"].pop(message.strip().lower(), None)
+    for other in entry["branches"].values():
+        if other.cancel():
+            stats["cancelled"] += 1
+
+    if task is None or entry["base"] != base:
+        if task is not None and task.cancel():
+            stats["cancelled"] += 1
+        stats["misses"] += 1
+        return None
+
+    try:
+        response = await task
+    except Exception:
+        # Fall back to a fresh call
+        stats["misses"] += 1
+        return None
+
+    stats["hits"] += 1
+    return response
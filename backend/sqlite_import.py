@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import sys
+import time
+
+from ddl_import import DDLImporter
+from handlers import handle_propose_schema
+from models import Schema
+from validation import PROPOSE_ADAPTER
+
+# One query per catalog, joined over every table through the table-valued
+# pragma functions, instead of three PRAGMA round trips per table
+COLUMNS_SQL = """
+    SELECT m.name, p.name, p.type, p."notnull", p.pk
+    FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'
+    ORDER BY m.rowid, p.cid
+"""
+FOREIGN_KEYS_SQL = """
+    SELECT m.name, f.id, f."table", f."from", f."to"
+    FROM sqlite_master AS m JOIN pragma_foreign_key_list(m.name) AS f
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'
+    ORDER BY m.rowid, f.id, f.seq
+"""
+UNIQUE_INDEXES_SQL = """
+    SELECT m.name, i.name, c.name
+    FROM sqlite_master AS m
+    JOIN pragma_index_list(m.name) AS i
+    JOIN pragma_index_info(i.name) AS c
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'
+      AND i."unique" = 1 AND i.partial = 0
+    ORDER BY m.rowid, i.seq, c.seqno
+"""
+
+
+def open_read_only(path: str) -> sqlite3.Connection:
+    """Open an existing database file without any chance of writing to it"""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(path)
+    uri = "file:" + os.path.abspath(path).replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+    connection = sqlite3.connect(uri, uri=True)
+    connection.execute("PRAGMA query_only = ON")
+    return connection
+
+
+def read_catalog(connection: sqlite3.Connection) -> DDLImporter:
+    """Fill a DDLImporter from the live catalog, so cardinality is inferred the same way as for dumps"""
+    importer = DDLImporter()
+
+    for table_name, name, sql_type, notnull, pk in connection.execute(COLUMNS_SQL):
+        table = importer.table(table_name)
+        if table is None:
+            table = {"name": table_name, "attributes": {}, "primary_key": [], "unique": []}
+            importer.tables[table_name.lower()] = table
+        table["attributes"][name.lower()] = {
+            "name": name,
+            "type": (sql_type or "TEXT").upper(),
+            "primary_key": pk > 0,
+            "nullable": not notnull and pk == 0,
+            "unique": False
+        }
+        if pk:
+            table["primary_key"].append((pk, name))
+    for table in importer.tables.values():
+        table["primary_key"] = [name for _, name in sorted(table["primary_key"])]
+
+    # Rows arrive grouped by (table, index) / (table, foreign key id)
+    indexes = {}
+    for table_name, index_name, column in connection.execute(UNIQUE_INDEXES_SQL):
+        # Expression columns have no name and cannot back a relationship
+        indexes.setdefault((table_name, index_name), []).append(column)
+    for (table_name, _), columns in indexes.items():
+        if None not in columns:
+            importer.add_unique(table_name, columns)
+
+    foreign_keys = {}
+    for table_name, fk_id, parent, column, ref_column in connection.execute(FOREIGN_KEYS_SQL):
+        fk = foreign_keys.setdefault((table_name, fk_id), {
+            "child": table_name, "columns": [], "table": parent, "ref_columns": [], "name": None
+        })
+        fk["columns"].append(column)
+        if ref_column is not None:
+            fk["ref_columns"].append(ref_column)
+    importer.foreign_keys = list(foreign_keys.values())
+    return importer
+
+
+def sqlite_schema_args(path: str, schema_name: str = None) -> dict:
+    """propose_schema arguments for a SQLite database file (opened read-only)"""
+    connection = open_read_only(path)
+    try:
+        importer = read_catalog(connection)
+    finally:
+        connection.close()
+    return importer.schema_args(schema_name or os.path.splitext(os.path.basename(path))[0])
+
+
+def introspect_sqlite(path: str, schema_name: str = None) -> Schema:
+    """Schema of a SQLite database file, ready for the diagram renderers"""
+    return PROPOSE_ADAPTER.validate_python(sqlite_schema_args(path, schema_name))
+
+
+def import_sqlite(path: str, schema_name: str = None) -> dict:
+    """Introspect a SQLite file and load it as the current schema (no LLM involved)"""
+    return handle_propose_schema(sqlite_schema_args(path, schema_name), check=False)
+
+
+# Usage: python sqlite_import.py app.db [SchemaName]
+if __name__ == "__main__":
+    from diagram import schema_to_mermaid
+
+    start = time.perf_counter()
+    schema = introspect_sqlite(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    elapsed = time.perf_counter() - start
+    print(schema_to_mermaid(schema))
+    print(f"{len(schema.entities)} tables, {len(schema.relationships)} relationships in {elapsed:.2f}s")
@@ -0,0 +1,37 @@
+import pytest
+
+from benchmark import make_schema_args
+from compact_schema import CompactSchema
+from models import Schema, Entity, Attribute, Relationship
+
+
+@pytest.mark.parametrize("size", [0, 10, 1000])
+def test_round_trip(size):
+    schema = Schema(**make_schema_args(size))
+    assert CompactSchema(schema).to_schema() == schema
+
+
+def test_round_trip_of_flags_and_types():
+    schema = Schema(
+        schema_name="Odd",
+        entities=[Entity(name="Order Item", attributes=[
+            Attribute(name="id", type="DECIMAL(10, 2)", primary_key=True, nullable=False),
+            Attribute(name="code", type="VARCHAR(8)", nullable=False, unique=True),
+            Attribute(name="note", type="TEXT")
+        ]), Entity(name="Empty", attributes=[])],
+        relationships=[Relationship(name="has", from_entity="Order Item", to_entity="Empty", type="one-to-one")]
+    )
+    compact = CompactSchema(schema)
+    assert compact.to_schema() == schema
+    assert compact.entity(1) == schema.entities[1]
+
+
+def test_type_table_belongs_to_the_schema():
+    first = CompactSchema(Schema(schema_name="A", entities=[
+        Entity(name="T", attributes=[Attribute(name="id", type="UPLOADED_TYPE_1", primary_key=True)])
+    ], relationships=[]))
+    second = CompactSchema(Schema(schema_name="B", entities=[
+        Entity(name="T", attributes=[Attribute(name="id", type="INT", primary_key=True)])
+    ], relationships=[]))
+    assert first.types == ["UPLOADED_TYPE_1"]
+    assert second.types == ["INT"]
@@ -0,0 +1,35 @@
+from ddl_import import parse_ddl, split_items, table_body
+
+
+def test_split_items_keeps_nested_and_quoted_commas():
+    body = "a numeric(10, 2) DEFAULT 'x,y', b int CHECK ((b > 0) AND (b < f(1, (2)))), c text, d char(1) DEFAULT ',"
+    assert split_items(body) == [
+        "a numeric(10, 2) DEFAULT 'x,y'", "b int CHECK ((b > 0) AND (b < f(1, (2))))", "c text", "d char(1) DEFAULT ',"
+    ]
+    statement = "CREATE TABLE t (a int CHECK (((a)) > 0), b text) WITH (fillfactor = 70)"
+    assert table_body(statement, statement.index("(")) == "a int CHECK (((a)) > 0), b text"
+
+
+def test_columns_types_and_keys():
+    args = parse_ddl([
+        "CREATE TABLE users (id bigint PRIMARY KEY, email varchar (255) NOT NULL UNIQUE,"
+        " name varchar(64) CHARACTER SET utf8);\n"
+        "CREATE TABLE orders (id bigint, user_id bigint NOT NULL REFERENCES users(id), PRIMARY KEY (id));\n"
+    ])
+    users, orders = args["entities"]
+    assert users["attributes"][1] == {"name": "email", "type": "VARCHAR(255)", "primary_key": False,
+                                      "nullable": False, "unique": True}
+    assert users["attributes"][2]["type"] == "VARCHAR(64)"
+    assert orders["attributes"][0]["primary_key"]
+    assert [(r["from_entity"], r["to_entity"], r["type"]) for r in args["relationships"]] == [
+        ("users", "orders", "one-to-many")
+    ]
+
+
+def test_foreign_key_declared_twice_is_one_relationship():
+    args = parse_ddl([
+        "CREATE TABLE users (id int PRIMARY KEY);\n"
+        "CREATE TABLE orders (id int PRIMARY KEY, user_id int REFERENCES users(id));\n"
+        "ALTER TABLE ONLY orders ADD CONSTRAINT fk_u FOREIGN KEY (user_id) REFERENCES users(id);\n"
+    ])
+    assert [r["name"] for r in args["relationships"]] == ["fk_u"]
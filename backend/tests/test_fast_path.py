@@ -0,0 +1,24 @@
+from fast_path import parse_command
+from models import Schema, Entity, Attribute
+
+SHOP = Schema(schema_name="Shop", entities=[
+    Entity(name="Order", attributes=[Attribute(name="orderId", type="INT", primary_key=True)]),
+    Entity(name="UserAccount", attributes=[Attribute(name="id", type="INT", primary_key=True)]),
+], relationships=[])
+
+
+def test_new_column_keeps_the_typed_case():
+    assert parse_command("Please add createdAt DATETIME NOT NULL to order.", SHOP) == (
+        "modify_schema",
+        {"action": "add_attribute", "target_entity": "Order",
+         "data": {"name": "createdAt", "type": "DATETIME", "nullable": False}}
+    )
+
+
+def test_existing_names_match_case_insensitively():
+    assert parse_command("Remove ORDERID from the order table", SHOP) == (
+        "modify_schema", {"action": "remove_attribute", "target_entity": "Order", "data": {"name": "orderId"}}
+    )
+    assert parse_command("add OrderId INT to Order", SHOP) is None
+    assert parse_command("Looks good, Finalize!", SHOP)[0] == "finalize_schema"
+    assert parse_command("Connect Order to useraccount (One-To-One)", SHOP)[1]["data"]["type"] == "one-to-one"
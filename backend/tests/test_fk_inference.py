@@ -0,0 +1,33 @@
+from fk_inference import suggest_relationships, option_text
+from models import Schema, Entity, Attribute
+
+
+def test_suggestions_from_names_and_types():
+    shop = Schema(schema_name="Shop", entities=[
+        Entity(name="User", attributes=[Attribute(name="id", type="SERIAL", primary_key=True)]),
+        Entity(name="Categories", attributes=[Attribute(name="category_id", type="INT", primary_key=True)]),
+        Entity(name="Product", attributes=[Attribute(name="sku", type="VARCHAR(20)", primary_key=True),
+                                           Attribute(name="categoryId", type="INTEGER")]),
+        Entity(name="Profile", attributes=[Attribute(name="user_id", type="INT", primary_key=True)]),
+        Entity(name="ProductUser", attributes=[Attribute(name="since", type="DATE")]),
+        # A UUID cannot reference User's integer key
+        Entity(name="Audit", attributes=[Attribute(name="user_id", type="UUID")]),
+    ], relationships=[])
+    assert [option_text(s) for s in suggest_relationships(shop)] == [
+        "Connect Categories to Product (one-to-many)",
+        "Connect User to Profile (one-to-one)",
+        "Connect Product to ProductUser (one-to-many)",
+        "Connect User to ProductUser (one-to-many)",
+    ]
+
+
+def test_every_other_orphan_is_linked():
+    entities = []
+    for i in range(10000):
+        attributes = [Attribute(name="id", type="INT", primary_key=True)]
+        if i % 2:
+            attributes.append(Attribute(name=f"table{i - 1}_id", type="INT"))
+        entities.append(Entity(name=f"Table{i}", attributes=attributes))
+    found = suggest_relationships(Schema(schema_name="Big", entities=entities, relationships=[]))
+    assert len(found) == 5000
+    assert found[0]["from_entity"] == "Table0" and found[0]["to_entity"] == "Table1"
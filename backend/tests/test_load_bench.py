@@ -0,0 +1,24 @@
+import sqlite3
+
+import pytest
+
+load_bench = pytest.importorskip("load_bench", exc_type=ImportError)
+
+
+def test_full_scans_are_real_tables_only():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.execute('CREATE TABLE "Order Items" (id INTEGER PRIMARY KEY, user_id INTEGER)')
+    queries = [
+        "WITH x AS (SELECT 1) SELECT * FROM x",
+        'SELECT * FROM users AS u JOIN "Order Items" AS o ON o.user_id = u.id + 1',
+        "SELECT * FROM (SELECT name FROM users GROUP BY name LIMIT 3)",
+        "WITH users AS (SELECT 1 AS a) SELECT * FROM users",
+        "SELECT * FROM users WHERE id = 1"
+    ]
+    scans = [result["full_scans"] for result in load_bench.benchmark_queries(connection, queries, repeat=1)]
+    assert scans[0] == []
+    assert scans[1] and all(scan.split()[1] in ("u", "o") for scan in scans[1])
+    assert scans[2] == ["SCAN users"]
+    assert scans[3] == []
+    assert scans[4] == []
@@ -0,0 +1,146 @@
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from prompt_cache import PromptCache, is_cache_error
+
+
+class FakeAPIError(Exception):
+    """Shaped like google.genai.errors.APIError (code and message)"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+
+def test_prefix_uploaded_once():
+    uploads = []
+
+    def create(ttl):
+        uploads.append(ttl)
+        return f"cachedContents/{len(uploads)}", time.time() + ttl
+
+    cache = PromptCache(create, ttl=3600)
+    assert {cache.get() for _ in range(1000)} == {"cachedContents/1"}
+    assert len(uploads) == 1
+
+    # Expired handles are refreshed transparently
+    cache.expires_at = time.time()
+    assert cache.get() == "cachedContents/2"
+    assert len(uploads) == 2
+
+
+def test_failed_upload_is_logged_and_retried_later(caplog):
+    calls = []
+
+    def create(ttl):
+        calls.append(ttl)
+        raise FakeAPIError(400, "Cached content is too small")
+
+    cache = PromptCache(create)
+    with caplog.at_level(logging.WARNING, logger="prompt_cache"):
+        assert cache.get() is None
+        assert cache.get() is None
+    assert len(calls) == 1
+    assert "Prompt cache unavailable" in caplog.text
+
+    cache.retry_at = 0
+    assert cache.get() is None
+    assert len(calls) == 2
+
+
+def test_is_cache_error():
+    assert is_cache_error(FakeAPIError(404, "CachedContent not found (or permission denied)"))
+    assert is_cache_error(FakeAPIError(403, "Permission denied on cachedContents/abc"), "cachedContents/abc")
+    assert is_cache_error(FakeAPIError(400, "Cached content has expired"))
+    # A missing model or an exhausted quota is not fixed by dropping the cache
+    assert not is_cache_error(FakeAPIError(404, "models/gemini-0 is not found"))
+    assert not is_cache_error(FakeAPIError(429, "Quota exceeded for cached content storage"))
+    assert not is_cache_error(ValueError("cache"))
+
+
+# ============== GeminiChat.generate ==============
+
+class FakeModels:
+    """client.models that fails requests naming a cache in `broken`"""
+
+    def __init__(self):
+        self.configs = []
+        self.broken = set()
+        self.error = None
+
+    def generate_content(self, model, contents, config=None):
+        self.configs.append(config)
+        if config.cached_content in self.broken:
+            raise self.error or FakeAPIError(404, "CachedContent not found (or permission denied)")
+        return SimpleNamespace(config=config)
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    pytest.importorskip("google.genai")
+    import handlers
+    import llm_chat
+
+    handlers.reset_schema()
+    monkeypatch.setattr(llm_chat, "PROMPT_CACHE_ENABLED", True)
+    uploads = []
+
+    def create(ttl):
+        uploads.append(ttl)
+        return f"cachedContents/{len(uploads)}", time.time() + ttl
+
+    models = FakeModels()
+    gemini = llm_chat.GeminiChat(SimpleNamespace(models=models), "system prompt", [])
+    gemini.prompt_cache = PromptCache(create)
+    return gemini, models, uploads
+
+
+def test_generate_uses_cached_prefix(chat):
+    import llm_chat
+
+    gemini, models, uploads = chat
+    for _ in range(3):
+        gemini.generate([llm_chat.user_content("hi")])
+    assert [c.cached_content for c in models.configs] == ["cachedContents/1"] * 3
+    assert all(c.system_instruction is None for c in models.configs)
+    assert len(uploads) == 1
+
+
+def test_generate_falls_back_inline_when_cache_is_gone(chat):
+    import llm_chat
+
+    gemini, models, uploads = chat
+    models.broken.add("cachedContents/1")
+    response = gemini.generate([llm_chat.user_content("hi")])
+    assert response.config.cached_content is None
+    assert response.config.system_instruction == "system prompt"
+
+    # The dead handle was dropped; the next call registers a new one
+    gemini.generate([llm_chat.user_content("hi")])
+    assert models.configs[-1].cached_content == "cachedContents/2"
+
+
+def test_generate_raises_other_errors(chat):
+    import llm_chat
+
+    gemini, models, uploads = chat
+    models.broken.add("cachedContents/1")
+    models.error = FakeAPIError(429, "Resource exhausted")
+    with pytest.raises(FakeAPIError):
+        gemini.generate([llm_chat.user_content("hi")])
+    assert len(models.configs) == 1
+    assert gemini.prompt_cache.handle == "cachedContents/1"
+
+
+def test_prompt_cache_off(chat, monkeypatch):
+    import llm_chat
+
+    gemini, models, uploads = chat
+    monkeypatch.setattr(llm_chat, "PROMPT_CACHE_ENABLED", False)
+    gemini.generate([llm_chat.user_content("hi")])
+    assert models.configs[0].cached_content is None
+    assert uploads == []
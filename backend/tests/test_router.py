@@ -0,0 +1,101 @@
+import asyncio
+import time
+from functools import partial
+
+import pytest
+
+import router
+from router import FakeProvider, Provider, Router, MIN_SAMPLES
+from scheduler import Scheduler
+
+
+def percentile(values: list, q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def simulate(hedge: bool, turns: int = 400) -> list:
+    providers = [
+        FakeProvider("gemini", median=0.010, tail_rate=0.03, tail=0.080, seed=1),
+        FakeProvider("groq", median=0.006, tail_rate=0.03, tail=0.080, seed=2)
+    ]
+    llm_router = Router(providers, strong="gemini", hedge=hedge)
+    latencies = []
+
+    async def drive():
+        for i in range(turns):
+            start = time.perf_counter()
+            await llm_router.complete([], "propose" if i % 2 else "clarify")
+            latencies.append(time.perf_counter() - start)
+
+    asyncio.run(drive())
+    return sorted(latencies[MIN_SAMPLES * 2:])
+
+
+def test_hedging_cuts_tail_latency():
+    plain = simulate(hedge=False)
+    hedged = simulate(hedge=True)
+    assert percentile(hedged, 0.99) < percentile(plain, 0.99)
+
+
+def test_failover_to_second_provider():
+    def broken(messages):
+        raise RuntimeError("provider down")
+
+    def working(messages):
+        return {"tool_name": None, "tool_args": None, "text": "hi"}, None
+
+    llm_router = Router([Provider("gemini", broken), Provider("groq", working)], strong="gemini", hedge=False)
+    recorded = []
+    reply = asyncio.run(llm_router.complete([], "propose", record=lambda name, raw: recorded.append(name)))
+    assert reply["provider"] == "groq"
+    assert recorded == ["groq"]
+
+
+def test_every_leg_holds_a_slot(monkeypatch):
+    monkeypatch.setattr(router, "DEFAULT_HEDGE_DELAY", 0.02)
+    slow = FakeProvider("gemini", median=0.2, sigma=0.0)
+    fast = FakeProvider("groq", median=0.01, sigma=0.0)
+    llm_router = Router([slow, fast], strong="gemini", hedge=True)
+
+    async def turn(sched: Scheduler):
+        reply = await llm_router.complete([], "propose", slot=partial(sched.slot, "tenant", 1, 1))
+        held = dict(sched.running)
+        await asyncio.sleep(0.3)
+        return reply, held, dict(sched.running)
+
+    # Room for both: the hedge runs next to the primary and wins; the losing
+    # primary keeps its slot until its call returns
+    reply, held, after = asyncio.run(turn(Scheduler(max_concurrent=4, tenant_concurrent=2)))
+    assert reply["provider"] == "groq"
+    assert held == {"tenant": 1}
+    assert after == {}
+
+    # One slot: the hedge waits for it and makes no call once the primary answered
+    calls = len(fast.latencies)
+    reply, held, after = asyncio.run(turn(Scheduler(max_concurrent=4, tenant_concurrent=1)))
+    assert reply["provider"] == "gemini"
+    assert len(fast.latencies) == calls
+    assert after == {}
+
+
+def test_speculative_branches_are_routed(monkeypatch):
+    pytest.importorskip("google.genai")
+    import handlers
+    import llm_chat
+    import token_budget
+
+    handlers.reset_schema()
+    recorded = []
+    monkeypatch.setattr(token_budget, "record_groq", lambda session_id, raw, source: recorded.append(source))
+
+    def down(messages):
+        raise RuntimeError("provider down")
+
+    def groq(messages):
+        return {"tool_name": "ask_clarification", "tool_args": {"question": "Which fields?"}, "text": None}, None
+
+    gemini = llm_chat.GeminiChat(None, "system prompt", [])
+    gemini.router = Router([Provider("gemini", down), Provider("groq", groq)], strong="gemini", hedge=False)
+    response = asyncio.run(gemini.generate_speculative("session", "tenant", [llm_chat.user_content("orders")]))
+    assert response.candidates[0].content.parts[0].function_call.name == "ask_clarification"
+    assert recorded == ["speculative"]
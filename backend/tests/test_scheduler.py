@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from scheduler import Scheduler, PRIORITIES
+
+
+def test_heavy_tenant_does_not_starve_light_ones():
+    async def simulate():
+        sched = Scheduler(max_concurrent=2, tenant_concurrent=2)
+        done = []
+
+        async def call(tenant, kind, cost, seconds):
+            queued = time.perf_counter()
+            async with sched.slot(tenant, PRIORITIES[kind], cost):
+                await asyncio.sleep(seconds)
+            done.append((tenant, kind, time.perf_counter() - queued))
+
+        tasks = [asyncio.create_task(call("heavy", "propose", 8, 0.02)) for _ in range(20)]
+        await asyncio.sleep(0.001)
+        tasks += [asyncio.create_task(call(f"light{i}", "clarify", 1, 0.005)) for i in range(5)]
+        tasks += [asyncio.create_task(call("medium", "edit", 2, 0.01)) for _ in range(3)]
+        await asyncio.gather(*tasks)
+        return done
+
+    order = [tenant for tenant, _, _ in asyncio.run(simulate())]
+    last_light = max(i for i, tenant in enumerate(order) if tenant.startswith("light"))
+    assert last_light < 8, order
+
+
+def test_speculative_calls_go_last():
+    async def simulate():
+        sched = Scheduler(max_concurrent=1, tenant_concurrent=1)
+        order = []
+
+        async def call(tenant, kind):
+            async with sched.slot(tenant, PRIORITIES[kind], 1):
+                order.append(kind)
+                await asyncio.sleep(0.001)
+
+        blocker = asyncio.create_task(call("a", "clarify"))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(call("b", "speculative")), asyncio.create_task(call("c", "propose"))]
+        await asyncio.gather(blocker, *tasks)
+        return order
+
+    assert asyncio.run(simulate()) == ["clarify", "propose", "speculative"]
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def simulate():
+        sched = Scheduler(max_concurrent=1, tenant_concurrent=1)
+        async with sched.slot("a"):
+            waiter = asyncio.create_task(sched.acquire("b"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        return sched.running_total, sched.depth()
+
+    assert asyncio.run(simulate()) == (0, 0)
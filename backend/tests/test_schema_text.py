@@ -0,0 +1,26 @@
+import pytest
+
+from benchmark import make_schema_args
+from models import Schema, Entity, Attribute, Relationship
+from schema_text import schema_to_text, text_to_schema
+
+
+def test_round_trip_of_awkward_names_and_types():
+    odd = Schema(
+        schema_name="Odd schema",
+        entities=[Entity(name="Order Item", attributes=[
+            Attribute(name="id", type="DECIMAL(10, 2)", primary_key=True),
+            Attribute(name='say "hi"', type="DOUBLE PRECISION", nullable=False, unique=True),
+            Attribute(name="PK", type="PK")
+        ]), Entity(name="Empty", attributes=[])],
+        relationships=[Relationship(name="has", from_entity="Order Item", to_entity="Empty", type="sometimes")]
+    )
+    assert text_to_schema(schema_to_text(odd)) == odd
+
+
+@pytest.mark.parametrize("size", [10, 100, 1000])
+def test_round_trip_is_smaller_than_json(size):
+    schema = Schema(**make_schema_args(size))
+    text = schema_to_text(schema)
+    assert text_to_schema(text) == schema
+    assert len(text) < len(schema.model_dump_json()) / 2
@@ -0,0 +1,163 @@
+import os
+import threading
+
+# Per-session budgets in tokens (prompt + completion); 0 disables a budget
+SOFT_BUDGET = int(os.getenv("TOKEN_SOFT_BUDGET", "200000"))
+HARD_BUDGET = int(os.getenv("TOKEN_HARD_BUDGET", "500000"))
+
+# Lifetime tokens per tenant (API key, or the session without one); reset_usage
+# does not clear it, so resetting a conversation never restores this budget
+TENANT_BUDGET = int(os.getenv("TOKEN_TENANT_BUDGET", "5000000"))
+
+# Messages kept verbatim when a session over the soft budget is compacted
+KEEP_MESSAGES = int(os.getenv("TOKEN_KEEP_MESSAGES", "6"))
+
+# Per-turn records kept per session for the admin report
+MAX_TURNS_KEPT = 100
+
+# {session_id: {"prompt", "completion", "cached", "compactions", "turns": [...]}}
+usage = {}
+
+# Totals across all sessions, kept when a session is reset
+totals = {"prompt": 0, "completion": 0, "cached": 0}
+
+# {tenant: prompt + completion tokens}, never cleared
+tenant_totals = {}
+
+# {session_id: tenant} for sessions billed to someone other than themselves
+tenants = {}
+
+_lock = threading.Lock()
+
+
+def new_usage() -> dict:
+    return {"prompt": 0, "completion": 0, "cached": 0, "compactions": 0, "turns": []}
+
+
+def get_usage(session_id: str) -> dict:
+    """Return the token usage of a session, creating an empty record"""
+    with _lock:
+        if session_id not in usage:
+            usage[session_id] = new_usage()
+        return usage[session_id]
+
+
+def set_tenant(session_id: str, tenant: str):
+    """Bill a session's calls to a tenant (by default a session is its own tenant)"""
+    with _lock:
+        tenants[session_id] = tenant
+
+
+def record(session_id: str, prompt: int, completion: int, cached: int = 0, source: str = "chat"):
+    """Add one model call to a session's usage and its tenant's lifetime total"""
+    entry = get_usage(session_id)
+    with _lock:
+        tenant = tenants.get(session_id, session_id)
+        tenant_totals[tenant] = tenant_totals.get(tenant, 0) + prompt + completion
+        entry["prompt"] += prompt
+        entry["completion"] += completion
+        entry["cached"] += cached
+        entry["turns"].append({"prompt": prompt, "completion": completion, "cached": cached, "source": source})
+        del entry["turns"][:-MAX_TURNS_KEPT]
+        totals["prompt"] += prompt
+        totals["completion"] += completion
+        totals["cached"] += cached
+
+
+def record_gemini(session_id: str, response, source: str = "chat"):
+    """Record the usage_metadata of a Gemini response"""
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return
+    record(
+        session_id,
+        prompt=meta.prompt_token_count or 0,
+        completion=meta.candidates_token_count or 0,
+        cached=meta.cached_content_token_count or 0,
+        source=source
+    )
+
+
+def record_groq(session_id: str, response, source: str = "chat"):
+    """Record the usage block of a Groq (OpenAI-style) response"""
+    meta = getattr(response, "usage", None)
+    if meta is None:
+        return
+    details = getattr(meta, "prompt_tokens_details", None)
+    record(
+        session_id,
+        prompt=meta.prompt_tokens or 0,
+        completion=meta.completion_tokens or 0,
+        cached=(getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        source=source
+    )
+
+
+def session_total(session_id: str) -> int:
+    entry = usage.get(session_id)
+    if entry is None:
+        return 0
+    return entry["prompt"] + entry["completion"]
+
+
+def over_soft_budget(session_id: str) -> bool:
+    return SOFT_BUDGET > 0 and session_total(session_id) >= SOFT_BUDGET
+
+
+def over_hard_budget(session_id: str) -> bool:
+    return HARD_BUDGET > 0 and session_total(session_id) >= HARD_BUDGET
+
+
+def over_tenant_budget(tenant: str) -> bool:
+    return TENANT_BUDGET > 0 and tenant_totals.get(tenant, 0) >= TENANT_BUDGET
+
+
+def compact_history(session_id: str, history: list, note, is_user) -> bool:
+    """Shrink a history in place to its first message, a note and the recent tail.
+
+    `note` is a message (e.g. the current schema) standing in for the dropped
+    middle; `is_user(message)` finds a user message to start the tail on.
+    Returns True if anything was dropped.
+    """
+    if len(history) <= KEEP_MESSAGES + 2:
+        return False
+
+    start = len(history) - KEEP_MESSAGES
+    while start < len(history) and not is_user(history[start]):
+        start += 1
+    if start >= len(history):
+        return False
+
+    history[:] = [history[0], note] + history[start:]
+    get_usage(session_id)["compactions"] += 1
+    return True
+
+
+def reset_usage(session_id: str):
+    """Forget a session's usage (global and tenant totals are kept)"""
+    with _lock:
+        usage.pop(session_id, None)
+
+
+def report() -> dict:
+    """Usage of every session plus global totals"""
+    with _lock:
+        sessions = {
+            session_id: {
+                "prompt": entry["prompt"],
+                "completion": entry["completion"],
+                "cached": entry["cached"],
+                "total": entry["prompt"] + entry["completion"],
+                "compactions": entry["compactions"],
+                "turns": list(entry["turns"])
+            }
+            for session_id, entry in usage.items()
+        }
+        return {
+            "soft_budget": SOFT_BUDGET,
+            "hard_budget": HARD_BUDGET,
+            "tenant_budget": TENANT_BUDGET,
+            "totals": dict(totals, total=totals["prompt"] + totals["completion"]),
+            "tenants": dict(tenant_totals),
+            "sessions": sessions
+        }
@@ -0,0 +1,101 @@
+from collections.abc import Mapping, Sequence
+from pydantic import TypeAdapter, ValidationError
+from models import Schema, SchemaOperation
+
+# Compiled once; each validates a whole tool payload in a single pass
+PROPOSE_ADAPTER = TypeAdapter(Schema)
+MODIFY_ADAPTER = TypeAdapter(SchemaOperation)
+
+# Errors listed in one message; the LLM gets the count of the rest
+MAX_ERRORS_SHOWN = 10
+
+SCALARS = frozenset((str, bytes, int, float, bool, type(None)))
+
+
+def to_native(value):
+    """Recursively turn provider containers (proto maps/lists) into dicts and lists.
+
+    Plain dicts and lists that hold only native values are returned as is, so
+    the common case (already-native arguments) costs one walk and no copies.
+    """
+    kind = type(value)
+    if kind is dict:
+        converted = None
+        for key, item in value.items():
+            if type(item) in SCALARS:
+                continue
+            native = to_native(item)
+            if native is not item:
+                if converted is None:
+                    converted = dict(value)
+                converted[key] = native
+        return value if converted is None else converted
+    if kind is list:
+        converted = None
+        for i, item in enumerate(value):
+            if type(item) in SCALARS:
+                continue
+            native = to_native(item)
+            if native is not item:
+                if converted is None:
+                    converted = list(value)
+                converted[i] = native
+        return value if converted is None else converted
+    if kind in SCALARS:
+        return value
+    if isinstance(value, Mapping) or hasattr(value, "items"):
+        return {str(k): to_native(v) for k, v in value.items()}
+    if hasattr(value, "__iter__"):
+        return [to_native(v) for v in value]
+    return value
+
+
+def error_path(loc: tuple, data) -> str:
+    """Readable path like entities[3](Order).attributes[2].type"""
+    path = ""
+    node = data
+    for step in loc:
+        if isinstance(step, int):
+            path += f"[{step}]"
+            node = node[step] if isinstance(node, Sequence) and step < len(node) else None
+            if isinstance(node, Mapping) and isinstance(node.get("name"), str):
+                path += f"({node['name']})"
+        else:
+            # Discriminated unions add the tag (e.g. "add_attribute") to the path
+            if isinstance(node, Mapping) and step not in node and node.get("action") == step:
+                continue
+            path += f".{step}" if path else str(step)
+            node = node.get(step) if isinstance(node, Mapping) else None
+    return path or "arguments"
+
+
+def format_errors(error: ValidationError, data) -> str:
+    """One line per problem, with paths into the tool arguments"""
+    problems = error.errors()
+    lines = [f"{error_path(p['loc'], data)}: {p['msg']}" for p in problems[:MAX_ERRORS_SHOWN]]
+    if len(problems) > MAX_ERRORS_SHOWN:
+        lines.append(f"... and {len(problems) - MAX_ERRORS_SHOWN} more")
+    noun = "error" if len(problems) == 1 else "errors"
+    return f"Invalid arguments ({len(problems)} {noun}):\n" + "\n".join(lines)
+
+
+def validate_propose(args: dict):
+    """Return (Schema, None) or (None, error message).
+
+    Pydantic accepts any Mapping/Sequence here, so proto containers need no
+    conversion first.
+    """
+    if isinstance(args, Mapping) and "relationships" not in args:
+        args = {**args, "relationships": []}
+    try:
+        return PROPOSE_ADAPTER.validate_python(args), None
+    except ValidationError as e:
+        return None, format_errors(e, args)
+
+
+def validate_modify(args: dict):
+    """Return (operation model, None) or (None, error message)"""
+    try:
+        return MODIFY_ADAPTER.validate_python(args), None
+    except ValidationError as e:
+        return None, format_errors(e, args)
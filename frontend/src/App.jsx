@@ -4,6 +4,7 @@ import {
   Trash2, 
   Download, 
   FileJson, 
+  FileCode, 
   PanelRightClose, 
   PanelRight,
   MessageSquare, 
@@ -34,6 +35,20 @@ function App() {
     chatEndRef.current?.scrollIntoView({ behavior: 'smooth' })
   }, [messages])
 
+  // Save positions dragged inside the diagram iframe so they survive re-renders
+  useEffect(() => {
+    const handleLayoutMessage = (e) => {
+      if (e.data?.type !== 'schemaforge:layout') return
+      fetch('http://localhost:8000/layout', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ positions: e.data.positions })
+      }).catch(() => {})
+    }
+    window.addEventListener('message', handleLayoutMessage)
+    return () => window.removeEventListener('message', handleLayoutMessage)
+  }, [])
+
   const sendMessage = async (text) => {
     if (!text.trim() || isLoading) return
 
@@ -52,6 +67,13 @@ function App() {
       
       const data = await response.json()
       
+      if (response.status === 429) {
+        const wait = response.headers.get('Retry-After') || 'a few'
+        setMessages(prev => [...prev, { role: 'assistant', content: `⏳ The server is busy. Please try again in ${wait} seconds.` }])
+        setIsLoading(false)
+        return
+      }
+      
       setMessages(prev => [...prev, { role: 'assistant', content: data.response }])
       setOptions(data.options || [])
       
@@ -130,6 +152,20 @@ function App() {
     a.click()
   }
 
+  const downloadSql = async () => {
+    if (!schemaData) return
+    try {
+      const response = await fetch('http://localhost:8000/schema/ddl?dialect=postgresql')
+      if (!response.ok) return
+      const blob = await response.blob()
+      const url = URL.createObjectURL(blob)
+      const a = document.createElement('a')
+      a.href = url
+      a.download = `${schemaData?.schema_name || 'schema'}.sql`
+      a.click()
+    } catch (e) {}
+  }
+
   return (
     <div className="app">
       {/* Header */}
@@ -153,6 +189,9 @@ function App() {
           <button onClick={downloadJson} title="Download JSON" disabled={!schemaData}>
             <FileJson size={20} color={schemaData ? "#a0a0b0" : "#444"} strokeWidth={2} />
           </button>
+          <button onClick={downloadSql} title="Download SQL (PostgreSQL)" disabled={!schemaData}>
+            <FileCode size={20} color={schemaData ? "#a0a0b0" : "#444"} strokeWidth={2} />
+          </button>
           <button 
             onClick={() => setShowDiagram(!showDiagram)} 
             title="Toggle Diagram" 